@@ -7,6 +7,9 @@ class CartItemInline(admin.TabularInline):
     extra = 0
     readonly_fields = ['id', 'unit_price', 'total_price']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product', 'variant')
+
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
@@ -16,6 +19,10 @@ class CartAdmin(admin.ModelAdmin):
     readonly_fields = ['id', 'created_at', 'updated_at']
     inlines = [CartItemInline]
 
+    def get_queryset(self, request):
+        # total_items/total_price read these annotations instead of querying per row
+        return super().get_queryset(request).select_related('user').with_totals()
+
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
@@ -26,3 +33,4 @@ class CartItemAdmin(admin.ModelAdmin):
     list_filter = ['created_at', 'updated_at']
     search_fields = ['cart__user__email', 'product__title']
     readonly_fields = ['id', 'unit_price', 'total_price']
+    list_select_related = ['cart__user', 'product', 'variant__product']
@@ -0,0 +1,151 @@
+"""
+Batch cart mutations.
+
+apply_cart_operations() applies many add/update/remove operations to a cart
+with a fixed number of queries: the cart's lines (locked for the duration of
+the transaction), then one query per model for the products and variants
+involved, then one DELETE, one bulk_create and one bulk_update. Operations are
+validated with the rules of AddToCartSerializer and UpdateCartItemSerializer,
+in order, against the cart as changed by the operations before them, with the
+rules of Cart.rules that the single-line serializers use; an operation that
+fails is reported and skipped while the others still apply.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_cart
+from .models import CartItem
+from .rules import CartRuleError, available_stock, check_line, check_quantity
+from Product.models import Product, Variant
+
+ADD, UPDATE, REMOVE = "add", "update", "remove"
+
+
+class OperationError(CartRuleError):
+    """An operation that cannot be applied; the message is returned to the client."""
+
+
+@dataclass
+class BatchResult:
+    errors: list = field(default_factory=list)  # [{"index": i, "error": message}]
+    adjusted: list = field(default_factory=list)  # [{"index": i, "requested": n, "quantity": m}]
+    created: int = 0
+    updated: int = 0
+    removed: int = 0
+
+    @property
+    def changed(self):
+        return bool(self.created or self.updated or self.removed)
+
+
+class _CartState:
+    """The cart's lines as changed by the operations applied so far."""
+
+    def __init__(self, cart, lines, products, variants):
+        self.cart = cart
+        self.products = products
+        self.variants = variants
+        self.by_id = {line.pk: line for line in lines}
+        self.by_key = {(line.product_id, line.variant_id): line for line in lines}
+        self.new, self.dirty, self.deleted = {}, {}, {}
+
+    def available(self, line):
+        return available_stock(self.products[line.product_id], self.variants.get(line.variant_id))
+
+    def add(self, product_id, variant_id, quantity, clamp=False):
+        product = self.products.get(product_id)
+        variant = self.variants.get(variant_id) if variant_id else None
+        check_line(product, variant, bool(variant_id))
+        line = self.by_key.get((product.pk, variant.pk if variant else None))
+        in_cart = line.quantity if line else 0
+        available = available_stock(product, variant)
+        if clamp and in_cart < available:
+            quantity = min(quantity, available - in_cart)
+        check_quantity(available, in_cart + quantity)
+        if line is None:
+            line = CartItem(cart=self.cart, product=product, variant=variant, quantity=quantity)
+            self.by_id[line.pk] = self.by_key[(product.pk, line.variant_id)] = self.new[line.pk] = line
+        else:
+            line.quantity += quantity
+            self._touch(line)
+        return quantity
+
+    def update(self, item_id, quantity):
+        line = self._line(item_id)
+        check_quantity(self.available(line), quantity)
+        line.quantity = quantity
+        self._touch(line)
+
+    def remove(self, item_id):
+        line = self._line(item_id)
+        del self.by_id[line.pk]
+        del self.by_key[(line.product_id, line.variant_id)]
+        if self.new.pop(line.pk, None) is None:
+            self.dirty.pop(line.pk, None)
+            self.deleted[line.pk] = line
+
+    def _line(self, item_id):
+        line = self.by_id.get(item_id)
+        if line is None:
+            raise OperationError("Cart item not found")
+        return line
+
+    def _touch(self, line):
+        if line.pk not in self.new:
+            line.updated_at = timezone.now()
+            self.dirty[line.pk] = line
+
+
+def apply_cart_operations(cart, operations, clamp=False):
+    """
+    Apply ``operations`` (dicts with ``op`` and the fields of that operation:
+    ``product_id``/``variant_id``/``quantity`` for add, ``item_id``/``quantity``
+    for update, ``item_id`` for remove) to ``cart`` in one transaction.
+
+    With ``clamp`` an add that exceeds the stock left is reduced to what fits
+    (and listed in ``adjusted``) instead of failing.
+    """
+    result = BatchResult()
+    with transaction.atomic():
+        lines = list(CartItem.objects.select_for_update().filter(cart=cart))
+        by_id = {line.pk: line for line in lines}
+
+        variant_ids = {op["variant_id"] for op in operations if op["op"] == ADD and op.get("variant_id")}
+        variant_ids.update(by_id[op["item_id"]].variant_id for op in operations if op.get("item_id") in by_id)
+        variant_ids.discard(None)
+        variants = Variant.objects.in_bulk(variant_ids) if variant_ids else {}
+
+        product_ids = {op["product_id"] for op in operations if op["op"] == ADD}
+        product_ids.update(by_id[op["item_id"]].product_id for op in operations if op.get("item_id") in by_id)
+        products = Product.objects.in_bulk(product_ids) if product_ids else {}
+
+        state = _CartState(cart, lines, products, variants)
+        for index, op in enumerate(operations):
+            try:
+                if op["op"] == ADD:
+                    requested = op.get("quantity", 1)
+                    quantity = state.add(op["product_id"], op.get("variant_id"), requested, clamp=clamp)
+                    if quantity != requested:
+                        result.adjusted.append({"index": index, "requested": requested, "quantity": quantity})
+                elif op["op"] == UPDATE:
+                    state.update(op["item_id"], op["quantity"])
+                else:
+                    state.remove(op["item_id"])
+            except CartRuleError as exc:
+                result.errors.append({"index": index, "error": str(exc)})
+
+        # bulk_create and bulk_update skip CartItem.save()/clean(); _CartState ran the same checks.
+        # Deletes go first so a removed line can be added back within the same batch.
+        if state.deleted:
+            CartItem.objects.filter(pk__in=list(state.deleted)).delete()
+        if state.new:
+            CartItem.objects.bulk_create(state.new.values())
+        if state.dirty:
+            CartItem.objects.bulk_update(state.dirty.values(), ["quantity", "updated_at"])
+        result.created, result.updated, result.removed = len(state.new), len(state.dirty), len(state.deleted)
+
+    if result.changed:
+        invalidate_cart(cart.user_id)
+    return result
@@ -0,0 +1,95 @@
+"""
+Per-user cart snapshots.
+
+A snapshot holds the serialized cart and its summary so unchanged carts are
+served without touching the database. Every write path invalidates the
+user's snapshot, and catalog changes invalidate the snapshots of every cart
+holding the changed products.
+
+Snapshots are keyed by a per-user generation that invalidation increments,
+immediately and again after commit. A reader takes the generation before
+loading the cart and stores what it built under that generation, so a
+snapshot built from the state before a write is stored under a generation
+nobody reads any more, however the read and the write interleave.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Cart, CartItem
+
+GENERATION_KEY = "cart:generation:{user_id}"
+SNAPSHOT_KEY = "cart:snapshot:{user_id}:{generation}"
+
+
+def _generation_key(user_id):
+    return GENERATION_KEY.format(user_id=user_id)
+
+
+def _generation(user_id):
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Not starting from 0: snapshots stored before the key was evicted must stay unreachable.
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def _bump(user_ids):
+    for user_id in user_ids:
+        key = _generation_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def build_cart_snapshot(cart):
+    """Serialize a cart loaded with Cart.objects.with_items()"""
+    from .serializers import CartSerializer
+
+    items = cart.items.all()
+    return {
+        "cart": CartSerializer(cart).data,
+        "summary": {
+            "total_items": cart.total_items,
+            "total_price": str(cart.total_price),
+            "items_count": len(items),
+        },
+    }
+
+
+def get_cart_snapshot(user):
+    """Serialized cart and summary of ``user``, built from the database on a miss"""
+    key = SNAPSHOT_KEY.format(user_id=user.pk, generation=_generation(user.pk))
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_cart_snapshot(Cart.objects.with_items().get_for_user(user))
+        cache.set(key, snapshot, getattr(settings, "CART_CACHE_TIMEOUT", 900))
+    return snapshot
+
+
+def invalidate_carts(user_ids):
+    """Move ``user_ids`` to a new snapshot generation now and again once the transaction commits"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    _bump(user_ids)
+    transaction.on_commit(lambda: _bump(user_ids))
+
+
+def invalidate_cart(user_id):
+    invalidate_carts([user_id])
+
+
+def invalidate_carts_for_products(product_ids):
+    """Drop the snapshots of every cart that holds one of the products"""
+    user_ids = (
+        CartItem.objects.filter(product_id__in=list(product_ids))
+        .values_list("cart__user_id", flat=True)
+        .distinct()
+    )
+    invalidate_carts(user_ids)
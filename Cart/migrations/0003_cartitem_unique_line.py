@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:01
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    # Lines without a variant could be duplicated before the constraint; keep one per product.
+    CartItem = apps.get_model('Cart', 'CartItem')
+    duplicates = (
+        CartItem.objects.filter(variant__isnull=True).values('cart', 'product')
+        .annotate(lines=Count('pk'), total=Sum('quantity')).filter(lines__gt=1)
+    )
+    for group in duplicates:
+        lines = CartItem.objects.filter(cart=group['cart'], product=group['product'], variant__isnull=True)
+        keep = lines.order_by('created_at', 'pk').first()
+        lines.exclude(pk=keep.pk).delete()
+        CartItem.objects.filter(pk=keep.pk).update(quantity=group['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Cart', '0002_initial'),
+        ('Product', '0010_productimage_content_addressed'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(models.F('cart'), models.F('product'), django.db.models.functions.comparison.Coalesce(models.F('variant'), models.Value(''), output_field=models.CharField()), name='cartitem_unique_line'),
+        ),
+    ]
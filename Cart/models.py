@@ -1,7 +1,45 @@
+from decimal import Decimal
+
 from django.db import models
 from django.conf import settings
+from django.db.models import Count, DecimalField, F, IntegerField, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce
 import uuid
 from Product.models import Product, Variant
+from .rules import available_stock
+
+
+def cart_total_expressions(prefix=''):
+    """Aggregates for a cart's quantity and price; ``prefix`` is the path to CartItem (e.g. 'items__')"""
+    unit_price = Coalesce(f'{prefix}variant__price', f'{prefix}product__price')
+    return {
+        'items_quantity': Coalesce(Sum(f'{prefix}quantity'), 0, output_field=IntegerField()),
+        'items_price': Coalesce(
+            Sum(F(f'{prefix}quantity') * unit_price, output_field=DecimalField(max_digits=12, decimal_places=2)),
+            Decimal('0.00'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    }
+
+
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate items_quantity, items_price and items_count in the same query as the cart"""
+        return self.annotate(**cart_total_expressions('items__'), items_count=Count('items'))
+
+    def with_items(self):
+        """Prefetch items with the product and variant they are priced from"""
+        return self.prefetch_related(
+            Prefetch('items', queryset=CartItem.objects.select_related('product', 'variant__product').order_by('created_at', 'id'))
+        )
+
+    def get_for_user(self, user):
+        """Fetch the user's cart through this queryset, creating an empty cart on first use"""
+        try:
+            return self.get(user=user)
+        except self.model.DoesNotExist:
+            cart, created = Cart.objects.get_or_create(user=user)
+            return cart
 
 
 class Cart(models.Model):
@@ -11,22 +49,39 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+
     def __str__(self):
         return f"Cart for {self.user.email}"
 
+    def _totals(self):
+        """Totals from annotations, prefetched items, or a single aggregate query, in that order"""
+        if hasattr(self, 'items_quantity'):
+            return self.items_quantity, self.items_price.quantize(Decimal('0.01'))
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            items = self.items.all()
+            return sum(item.quantity for item in items), sum((item.total_price for item in items), Decimal('0.00'))
+        totals = self.items.aggregate(**cart_total_expressions())
+        return totals['items_quantity'], totals['items_price'].quantize(Decimal('0.01'))
+
     @property
     def total_items(self):
         """Total number of items in cart"""
-        return sum(item.quantity for item in self.items.all())
+        return self._totals()[0]
 
     @property
     def total_price(self):
         """Total price of all items in cart"""
-        return sum(item.total_price for item in self.items.all())
+        return self._totals()[1]
 
     def clear(self):
         """Clear all items from cart"""
+        from .cache import invalidate_cart
+
         self.items.all().delete()
+        invalidate_cart(self.user_id)
+        for attr in ('items_quantity', 'items_price', 'items_count'):
+            self.__dict__.pop(attr, None)
 
 
 class CartItem(models.Model):
@@ -41,6 +96,14 @@ class CartItem(models.Model):
 
     class Meta:
         unique_together = ['cart', 'product', 'variant']
+        constraints = [
+            # unique_together lets NULLs differ, so it does not cover lines without a variant. A
+            # condition (or nulls_distinct) would be ignored by MySQL; an expression index is not.
+            models.UniqueConstraint(
+                F('cart'), F('product'), Coalesce(F('variant'), Value(''), output_field=models.CharField()),
+                name='cartitem_unique_line',
+            ),
+        ]
 
     def __str__(self):
         variant_str = f" - {self.variant.name}" if self.variant else ""
@@ -49,8 +112,10 @@ class CartItem(models.Model):
     @property
     def unit_price(self):
         """Get the unit price (from variant if available, otherwise product price)"""
-        if self.variant:
-            return self.variant.get_price()
+        # The variant belongs to self.product (see clean), so its fallback price is
+        # read from there instead of lazily loading variant.product
+        if self.variant_id and self.variant.price is not None:
+            return self.variant.price
         return self.product.price
 
     @property
@@ -67,9 +132,9 @@ class CartItem(models.Model):
             raise ValidationError("Variant must belong to the selected product")
         
         # Check stock availability
-        available_stock = self.variant.stock if self.variant else self.product.stock
-        if self.quantity > available_stock:
-            raise ValidationError(f"Not enough stock. Available: {available_stock}")
+        available = available_stock(self.product, self.variant)
+        if self.quantity > available:
+            raise ValidationError(f"Not enough stock. Available: {available}")
 
     def save(self, *args, **kwargs):
         self.clean()
@@ -0,0 +1,46 @@
+"""
+Cart line rules.
+
+The single-line serializers (AddToCartSerializer, UpdateCartItemSerializer)
+and the batch path (Cart.batch) load products and variants differently, but
+check them with these functions, so both accept and reject the same lines
+with the same messages.
+"""
+
+
+class CartRuleError(Exception):
+    """A line that breaks a cart rule; ``field`` names the request field at fault, if any"""
+
+    def __init__(self, message, field=None):
+        super().__init__(message)
+        self.message = message
+        self.field = field
+
+
+def check_line(product, variant, variant_requested):
+    """
+    Check a line of ``product`` (the requested product, None if it does not
+    exist) and ``variant`` (None if none was requested or it does not exist):
+    both are active and the variant belongs to the product.
+    """
+    if variant_requested and (variant is None or not variant.is_active):
+        raise CartRuleError("Variant not found or inactive", "variant_id")
+    if product is None or not product.is_active:
+        raise CartRuleError("Product not found or inactive", "product_id")
+    if variant is not None and variant.product_id != product.pk:
+        raise CartRuleError("Variant does not belong to the selected product")
+
+
+def available_stock(product, variant):
+    """Stock a line can draw on: the variant's, or the product's for a line without one"""
+    return variant.stock if variant else product.stock
+
+
+def insufficient_stock(available, requested):
+    return CartRuleError(f"Insufficient stock. Available: {available}, Requested: {requested}")
+
+
+def check_quantity(available, requested):
+    """A line's total quantity ``requested`` must stay within ``available``"""
+    if requested > available:
+        raise insufficient_stock(available, requested)
@@ -1,9 +1,18 @@
 from rest_framework import serializers
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .cache import invalidate_cart
 from .models import Cart, CartItem
+from .rules import CartRuleError, available_stock, check_line, check_quantity, insufficient_stock
 from Product.models import Product, Variant
 
 
+def _validation_error(error):
+    """The ValidationError reporting a CartRuleError"""
+    return serializers.ValidationError({error.field: error.message} if error.field else error.message)
+
+
 class CartItemSerializer(serializers.ModelSerializer):
     """Serializer for CartItem"""
     product_title = serializers.CharField(source='product.title', read_only=True)
@@ -44,71 +53,68 @@ class AddToCartSerializer(serializers.Serializer):
     variant_id = serializers.UUIDField(required=False, allow_null=True)
     quantity = serializers.IntegerField(min_value=1, default=1)
     
-    def validate_product_id(self, value):
-        """Validate product exists and is active"""
-        try:
-            product = Product.objects.get(id=value, is_active=True)
-            return value
-        except Product.DoesNotExist:
-            raise serializers.ValidationError("Product not found or inactive")
-    
-    def validate_variant_id(self, value):
-        """Validate variant exists and is active"""
-        if value:
-            try:
-                variant = Variant.objects.get(id=value, is_active=True)
-                return value
-            except Variant.DoesNotExist:
-                raise serializers.ValidationError("Variant not found or inactive")
-        return value
-    
     def validate(self, attrs):
-        """Validate variant belongs to product and stock availability"""
+        """Load product and variant in one query, then check them with the cart rules (Cart.rules)"""
         product_id = attrs['product_id']
         variant_id = attrs.get('variant_id')
-        quantity = attrs['quantity']
         
-        product = Product.objects.get(id=product_id)
-        
-        if variant_id:
-            variant = Variant.objects.get(id=variant_id)
-            if variant.product != product:
-                raise serializers.ValidationError("Variant does not belong to the selected product")
-            
-            if variant.stock < quantity:
-                raise serializers.ValidationError(
-                    f"Insufficient stock. Available: {variant.stock}, Requested: {quantity}"
-                )
+        variant = Variant.objects.select_related('product').filter(id=variant_id).first() if variant_id else None
+        if variant is not None and variant.product_id == product_id:
+            product = variant.product
+        elif variant_id and variant is None:
+            product = None  # reported as the missing variant
         else:
-            if product.stock < quantity:
-                raise serializers.ValidationError(
-                    f"Insufficient stock. Available: {product.stock}, Requested: {quantity}"
-                )
+            product = Product.objects.filter(id=product_id).first()
+        try:
+            check_line(product, variant, bool(variant_id))
+            check_quantity(available_stock(product, variant), attrs['quantity'])
+        except CartRuleError as error:
+            raise _validation_error(error)
         
+        attrs['product'] = product
+        attrs['variant'] = variant
         return attrs
     
     def create(self, validated_data):
-        """Add item to cart"""
+        """
+        Add item to cart: increment an existing line with a conditional
+        ``UPDATE ... SET quantity = quantity + n`` that also enforces stock, or
+        insert a new line; an insert that loses a race against a concurrent
+        one falls back to the increment.
+        """
         cart = validated_data['cart']
-        product = Product.objects.get(id=validated_data['product_id'])
-        variant = Variant.objects.get(id=validated_data['variant_id']) if validated_data.get('variant_id') else None
+        product = validated_data['product']
+        variant = validated_data['variant']
         quantity = validated_data['quantity']
+        available = available_stock(product, variant)
+        line = CartItem.objects.filter(cart=cart, product=product, variant=variant)
         
-        # Check if item already exists in cart
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            variant=variant,
-            defaults={'quantity': quantity}
-        )
-        
-        if not created:
-            # Update quantity if item already exists
-            cart_item.quantity += quantity
-            cart_item.save()
+        cart_item = None
+        if not self._increment(line, quantity, available):
+            in_cart = line.values_list('quantity', flat=True).first()
+            if in_cart is not None:
+                raise _validation_error(insufficient_stock(available, in_cart + quantity))
+            try:
+                with transaction.atomic():
+                    cart_item = CartItem.objects.create(cart=cart, product=product, variant=variant, quantity=quantity)
+            except IntegrityError:
+                # Another request created the line in the meantime.
+                if not self._increment(line, quantity, available):
+                    raise _validation_error(insufficient_stock(available, quantity))
+        if cart_item is None:
+            cart_item = line.get()
         
+        cart_item.cart, cart_item.product, cart_item.variant = cart, product, variant
+        invalidate_cart(cart.user_id)
         return cart_item
 
+    @staticmethod
+    def _increment(line, quantity, available):
+        """Add ``quantity`` to an existing line as long as the result stays within ``available``"""
+        return line.filter(quantity__lte=available - quantity).update(
+            quantity=F('quantity') + quantity, updated_at=timezone.now(),
+        )
+
 
 class UpdateCartItemSerializer(serializers.ModelSerializer):
     """Serializer for updating cart item quantity"""
@@ -121,11 +127,36 @@ class UpdateCartItemSerializer(serializers.ModelSerializer):
     def validate_quantity(self, value):
         """Validate quantity against available stock"""
         cart_item = self.instance
-        available_stock = cart_item.variant.stock if cart_item.variant else cart_item.product.stock
-        
-        if value > available_stock:
-            raise serializers.ValidationError(
-                f"Insufficient stock. Available: {available_stock}, Requested: {value}"
-            )
-        
+        try:
+            check_quantity(available_stock(cart_item.product, cart_item.variant), value)
+        except CartRuleError as error:
+            raise serializers.ValidationError(error.message)
         return value
+
+    def update(self, instance, validated_data):
+        """Update the quantity and drop the owner's cart snapshot"""
+        instance = super().update(instance, validated_data)
+        invalidate_cart(instance.cart.user_id)
+        return instance
+
+
+class CartOperationSerializer(serializers.Serializer):
+    """One operation of a batch: add a product/variant, or update/remove a cart item"""
+    op = serializers.ChoiceField(choices=['add', 'update', 'remove'])
+    product_id = serializers.UUIDField(required=False)
+    variant_id = serializers.UUIDField(required=False, allow_null=True)
+    item_id = serializers.UUIDField(required=False)
+    quantity = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        """Check that the fields the operation needs are present"""
+        required = {'add': ['product_id'], 'update': ['item_id', 'quantity'], 'remove': ['item_id']}[attrs['op']]
+        missing = {name: "This field is required." for name in required if name not in attrs}
+        if missing:
+            raise serializers.ValidationError(missing)
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """Serializer for applying many cart operations at once"""
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=100)
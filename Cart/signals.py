@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from Product.models import Product, Variant
+from .cache import invalidate_carts_for_products
+
+
+@receiver(post_save, sender=Product)
+def invalidate_carts_for_saved_product(sender, instance, created, raw=False, **kwargs):
+    # A new product cannot be in any cart yet.
+    if not raw and not created:
+        invalidate_carts_for_products([instance.pk])
+
+
+@receiver(post_save, sender=Variant)
+def invalidate_carts_for_variant(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_carts_for_products([instance.product_id])
+
+
+# Before the delete: by post_delete the cascade has already removed the cart items.
+@receiver(pre_delete, sender=Product)
+def invalidate_carts_for_deleted_product(sender, instance, **kwargs):
+    invalidate_carts_for_products([instance.pk])
+
+
+@receiver(pre_delete, sender=Variant)
+def invalidate_carts_for_deleted_variant(sender, instance, **kwargs):
+    invalidate_carts_for_products([instance.product_id])
@@ -1,3 +1,298 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+import threading
+
+import pytest
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from Cart.cache import invalidate_cart
+from Cart.models import Cart, CartItem
+from Cart.serializers import AddToCartSerializer
+from Product.models import Product, Variant
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def cart(user, product, variant):
+    cart = Cart.objects.create(user=user)
+    plain = Variant.objects.create(product=product, name="Size 43 / Blue", sku="SKU-001-43B", stock=5)
+    CartItem.objects.create(cart=cart, product=product, variant=variant, quantity=2)  # 2 x 109.99
+    CartItem.objects.create(cart=cart, product=product, variant=plain, quantity=1)  # falls back to 99.99
+    CartItem.objects.create(cart=cart, product=product, quantity=3)  # 3 x 99.99
+    return cart
+
+
+def _add_lines(cart, count):
+    for idx in range(count):
+        product = Product.objects.create(title=f"Extra {idx}", price="1.00", sku=f"EXTRA-{idx}", stock=5)
+        variant = Variant.objects.create(product=product, name="Only", sku=f"EXTRA-{idx}-V", stock=5)
+        CartItem.objects.create(cart=cart, product=product, variant=variant, quantity=1)
+
+
+def test_cart_totals_agree_across_code_paths(cart):
+    expected = (6, Decimal("619.94"))
+    assert (cart.total_items, cart.total_price) == expected
+    annotated = Cart.objects.with_totals().get(pk=cart.pk)
+    assert (annotated.total_items, annotated.total_price, annotated.items_count) == expected + (3,)
+    prefetched = Cart.objects.with_items().get(pk=cart.pk)
+    assert (prefetched.total_items, prefetched.total_price) == expected
+
+
+def test_empty_cart_totals_are_zero(user):
+    cart = Cart.objects.with_totals().get_for_user(user)
+    assert (cart.total_items, cart.total_price) == (0, Decimal("0.00"))
+
+
+def test_cart_summary_of_an_unchanged_cart_runs_no_queries(client, cart):
+    assert client.get("/api/cart/cart/summary/").status_code == 200
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get("/api/cart/cart/summary/")
+        assert client.get("/api/cart/cart/").data["total_price"] == "619.94"
+    assert response.data == {"total_items": 6, "total_price": "619.94", "items_count": 3}
+    assert len(ctx.captured_queries) == 0
+
+
+def test_cart_view_query_count_does_not_grow_with_lines(client, cart):
+    with CaptureQueriesContext(connection) as ctx:
+        client.get("/api/cart/cart/")
+    small = len(ctx.captured_queries)
+    _add_lines(cart, 10)
+    invalidate_cart(cart.user_id)
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get("/api/cart/cart/")
+    assert len(ctx.captured_queries) == small
+    assert response.data["total_items"] == 16
+    assert Decimal(response.data["total_price"]) == Decimal("629.94")
+
+
+def _total_price(client):
+    return client.get("/api/cart/cart/summary/").data["total_price"]
+
+
+def test_cart_writes_invalidate_the_snapshot(client, cart, product, variant):
+    assert _total_price(client) == "619.94"
+
+    response = client.post("/api/cart/cart/add/", {"product_id": str(product.pk), "variant_id": str(variant.pk)}, format="json")
+    assert response.status_code == 201, response.data
+    assert _total_price(client) == "729.93"
+
+    item = cart.items.get(variant=variant)
+    assert client.patch(f"/api/cart/cart/items/{item.pk}/", {"quantity": 1}, format="json").status_code == 200
+    assert _total_price(client) == "509.95"
+
+    assert client.delete(f"/api/cart/cart/items/{item.pk}/").status_code == 204
+    assert _total_price(client) == "399.96"
+
+    assert client.post("/api/cart/cart/clear/").status_code == 200
+    assert _total_price(client) == "0.00"
+
+
+def test_price_changes_invalidate_the_snapshot_of_carts_holding_the_product(client, cart, product, variant):
+    assert _total_price(client) == "619.94"
+    product.price = Decimal("10.00")
+    product.save()
+    assert _total_price(client) == "259.98"
+    variant.price = Decimal("20.00")
+    variant.save()
+    assert _total_price(client) == "80.00"
+
+
+def test_deleting_a_variant_or_product_invalidates_the_snapshot(client, cart, product, variant):
+    assert _total_price(client) == "619.94"
+    variant.delete()
+    assert _total_price(client) == "399.96"
+    product.delete()
+    assert client.get("/api/cart/cart/summary/").data == {"total_items": 0, "total_price": "0.00", "items_count": 0}
+
+
+def test_a_snapshot_built_while_the_cart_changes_is_not_served(client, cart, monkeypatch):
+    from Cart import cache as cart_cache
+
+    build = cart_cache.build_cart_snapshot
+
+    def build_then_write(loaded):
+        # The write commits after the reader loaded the cart but before it stores the snapshot.
+        snapshot = build(loaded)
+        cart.items.filter(variant__isnull=True).update(quantity=1)
+        invalidate_cart(cart.user_id)
+        return snapshot
+
+    monkeypatch.setattr(cart_cache, "build_cart_snapshot", build_then_write)
+    assert _total_price(client) == "619.94"
+    monkeypatch.setattr(cart_cache, "build_cart_snapshot", build)
+    assert _total_price(client) == "419.96"
+
+
+def test_checkout_invalidates_the_snapshot(client, cart, address):
+    assert client.get("/api/cart/cart/").data["items"]
+    response = client.post(
+        "/api/orders/orders/",
+        {"shipping_address_id": str(address.pk), "billing_address_id": str(address.pk)},
+        format="json",
+    )
+    assert response.status_code == 201, response.data
+    assert client.get("/api/cart/cart/").data["items"] == []
+
+
+def _add(client, product, variant=None, quantity=1):
+    data = {"product_id": str(product.pk), "quantity": quantity}
+    if variant is not None:
+        data["variant_id"] = str(variant.pk)
+    return client.post("/api/cart/cart/items/", data, format="json")
+
+
+def test_add_to_cart_fetches_product_and_variant_once(client, user, product, variant):
+    Cart.objects.create(user=user)
+    with CaptureQueriesContext(connection) as ctx:
+        assert _add(client, product, variant).status_code == 201
+    inserted = len(ctx.captured_queries)
+    with CaptureQueriesContext(connection) as ctx:
+        assert _add(client, product, variant, 2).status_code == 201
+    incremented = len(ctx.captured_queries)
+
+    lookups = [q["sql"] for q in ctx.captured_queries if "product_variant" in q["sql"].lower()]
+    assert len(lookups) == 1
+    # cart lookup, variant+product, conditional UPDATE, re-read of the line
+    assert incremented == 4
+    assert inserted <= 7
+    assert CartItem.objects.get(variant=variant).quantity == 3
+
+
+def test_add_to_cart_enforces_stock_on_the_combined_quantity(client, product, variant):
+    assert _add(client, product, variant, 4).status_code == 201
+    response = _add(client, product, variant, 2)
+    assert response.status_code == 400
+    assert "Available: 5, Requested: 6" in str(response.data)
+    assert _add(client, product, None, 10).status_code == 201
+    assert _add(client, product, None, 1).status_code == 400
+    assert CartItem.objects.get(variant=variant).quantity == 4
+    assert CartItem.objects.get(variant=None).quantity == 10
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_adds_of_a_line_without_a_variant_share_one_row(user, product):
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        pytest.skip("threads need a shared database")
+    cart = Cart.objects.create(user=user)
+    adds = 8
+    errors = []
+    barrier = threading.Barrier(adds)
+
+    def add():
+        barrier.wait()
+        try:
+            with transaction.atomic():
+                serializer = AddToCartSerializer(data={"product_id": str(product.pk), "quantity": 1})
+                serializer.is_valid(raise_exception=True)
+                serializer.save(cart=cart)
+        except Exception as exc:  # asserted below
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=add) for _ in range(adds)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert list(CartItem.objects.filter(cart=cart).values_list("variant", "quantity")) == [(None, adds)]
+    # SQLite serializes the writers above; the constraint is what holds on MySQL.
+    with pytest.raises(IntegrityError):
+        CartItem.objects.create(cart=cart, product=product, quantity=1)
+
+
+def test_add_to_cart_rejects_unknown_or_mismatched_lines(client, product, variant):
+    other = Product.objects.create(title="Sandal", price="20.00", sku="SANDAL-1", stock=1)
+    response = _add(client, other, variant)
+    assert response.status_code == 400
+    assert "does not belong" in str(response.data)
+    variant.is_active = False
+    variant.save()
+    assert "variant_id" in _add(client, product, variant).data
+    product.is_active = False
+    product.save()
+    assert "product_id" in _add(client, product).data
+
+
+def _batch(client, operations):
+    return client.post("/api/cart/cart/batch/", {"operations": operations}, format="json")
+
+
+def test_single_and_batch_adds_reject_the_same_lines_the_same_way(client, user, product, variant):
+    Cart.objects.create(user=user)
+    other = Product.objects.create(title="Sandal", price="20.00", sku="SANDAL-1", stock=1)
+    retired = Variant.objects.create(product=product, name="Retired", sku="SKU-001-OLD", stock=5, is_active=False)
+    cases = [(other, variant, 1), (product, retired, 1), (product, variant, 6), (other, None, 2)]
+
+    for line_product, line_variant, quantity in cases:
+        single = _add(client, line_product, line_variant, quantity).data
+        operation = {"op": "add", "product_id": str(line_product.pk), "quantity": quantity}
+        if line_variant is not None:
+            operation["variant_id"] = str(line_variant.pk)
+        batch = _batch(client, [operation]).data["errors"]
+        message = next(iter(single.values())) if isinstance(single, dict) else single
+        assert [error["error"] for error in batch] == [str(message[0])]
+    assert not CartItem.objects.exists()
+
+
+def test_cart_batch_applies_valid_operations_and_reports_the_rest(client, cart, product, variant):
+    other = Product.objects.create(title="Sandal", price="20.00", sku="SANDAL-1", stock=2)
+    variant_line = cart.items.get(variant=variant)
+    plain_line = cart.items.get(variant=None)
+    assert client.get("/api/cart/cart/").status_code == 200  # cache the snapshot
+
+    response = _batch(client, [
+        {"op": "add", "product_id": str(other.pk), "quantity": 2},
+        {"op": "add", "product_id": str(other.pk)},  # would make 3 of 2 in stock
+        {"op": "update", "item_id": str(variant_line.pk), "quantity": 4},
+        {"op": "remove", "item_id": str(plain_line.pk)},
+        {"op": "add", "product_id": str(product.pk), "variant_id": str(variant.pk), "quantity": 2},  # 6 of 5
+        {"op": "update", "item_id": str(plain_line.pk), "quantity": 1},  # removed above
+    ])
+
+    assert response.status_code == 200, response.data
+    assert response.data["errors"] == [
+        {"index": 1, "error": "Insufficient stock. Available: 2, Requested: 3"},
+        {"index": 4, "error": "Insufficient stock. Available: 5, Requested: 6"},
+        {"index": 5, "error": "Cart item not found"},
+    ]
+    quantities = {(item["product"], item["variant"]): item["quantity"] for item in response.data["cart"]["items"]}
+    assert quantities == {
+        (other.pk, None): 2,
+        (product.pk, variant.pk): 4,
+        (product.pk, cart.items.exclude(variant=variant).exclude(variant=None).get().variant_id): 1,
+    }
+    assert response.data["cart"]["total_price"] == "579.95"
+
+
+def test_cart_batch_queries_do_not_grow_with_operations(client, user):
+    Cart.objects.create(user=user)
+    products = [
+        Product.objects.create(title=f"Batch {idx}", price="2.00", sku=f"BATCH-{idx}", stock=5) for idx in range(20)
+    ]
+
+    def run(batch):
+        with CaptureQueriesContext(connection) as ctx:
+            response = _batch(client, [{"op": "add", "product_id": str(p.pk), "quantity": 2} for p in batch])
+        assert response.status_code == 200 and response.data["errors"] == []
+        return len(ctx.captured_queries)
+
+    assert run(products[:2]) == run(products[2:])
+    assert CartItem.objects.filter(product__in=products).count() == 20
+
+
+def test_cart_batch_rejects_malformed_operations(client, cart):
+    response = _batch(client, [{"op": "update", "item_id": str(cart.items.first().pk)}, {"op": "explode"}])
+    assert response.status_code == 400
+    assert "quantity" in response.data["operations"][0]
+    assert "op" in response.data["operations"][1]
@@ -7,6 +7,7 @@ urlpatterns = [
     path('cart/items/', views.CartItemListCreateView.as_view(), name='cart-item-list-create'),
     path('cart/items/<uuid:pk>/', views.CartItemDetailView.as_view(), name='cart-item-detail'),
     path('cart/add/', views.add_to_cart, name='add-to-cart'),
+    path('cart/batch/', views.cart_batch, name='cart-batch'),
     path('cart/clear/', views.clear_cart, name='clear-cart'),
     path('cart/summary/', views.cart_summary, name='cart-summary'),
 ]
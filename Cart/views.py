@@ -4,8 +4,13 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db import transaction
 
+from Ecomerce_Application.pagination import OptInKeysetPagination
+from .batch import apply_cart_operations
+from .cache import get_cart_snapshot, invalidate_cart
 from .models import Cart, CartItem
-from .serializers import CartSerializer, CartItemSerializer, AddToCartSerializer, UpdateCartItemSerializer
+from .serializers import (
+    CartSerializer, CartItemSerializer, AddToCartSerializer, UpdateCartItemSerializer, CartBatchSerializer,
+)
 from Product.models import Product, Variant
 
 
@@ -14,21 +19,20 @@ class CartView(generics.RetrieveAPIView):
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
     
-    def get_object(self):
-        """Get or create cart for user"""
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+    def retrieve(self, request, *args, **kwargs):
+        """Serve the cached snapshot; it is rebuilt from the database only after a change"""
+        return Response(get_cart_snapshot(request.user)['cart'])
 
 
 class CartItemListCreateView(generics.ListCreateAPIView):
     """List cart items and add items to cart"""
     serializer_class = CartItemSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptInKeysetPagination
     
     def get_queryset(self):
         """Return cart items for the authenticated user"""
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return CartItem.objects.filter(cart=cart)
+        return CartItem.objects.filter(cart__user=self.request.user).select_related('product', 'variant')
     
     def get_serializer_class(self):
         """Use different serializer for creation"""
@@ -49,8 +53,7 @@ class CartItemDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         """Return cart items for the authenticated user"""
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return CartItem.objects.filter(cart=cart)
+        return CartItem.objects.filter(cart__user=self.request.user).select_related('cart', 'product', 'variant')
     
     def get_serializer_class(self):
         """Use different serializer for updates"""
@@ -58,6 +61,11 @@ class CartItemDetailView(generics.RetrieveUpdateDestroyAPIView):
             return UpdateCartItemSerializer
         return CartItemSerializer
 
+    def perform_destroy(self, instance):
+        """Remove the item and drop the cart snapshot"""
+        instance.delete()
+        invalidate_cart(self.request.user.pk)
+
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -66,7 +74,8 @@ def add_to_cart(request):
     serializer = AddToCartSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         try:
-            cart_item = serializer.save()
+            cart, created = Cart.objects.get_or_create(user=request.user)
+            cart_item = serializer.save(cart=cart)
             response_serializer = CartItemSerializer(cart_item)
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
         except Exception as e:
@@ -77,6 +86,29 @@ def add_to_cart(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def cart_batch(request):
+    """
+    Apply many add/update/remove operations in one transaction.
+    Returns the resulting cart and the operations that could not be applied.
+    """
+    serializer = CartBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    try:
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        result = apply_cart_operations(cart, serializer.validated_data['operations'])
+        return Response({
+            'cart': get_cart_snapshot(request.user)['cart'],
+            'errors': result.errors,
+        })
+    except Exception as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def clear_cart(request):
@@ -97,15 +129,7 @@ def clear_cart(request):
 def cart_summary(request):
     """Get cart summary (total items, total price)"""
     try:
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        
-        summary = {
-            'total_items': cart.total_items,
-            'total_price': str(cart.total_price),
-            'items_count': cart.items.count()
-        }
-        
-        return Response(summary)
+        return Response(get_cart_snapshot(request.user)['summary'])
     except Exception as e:
         return Response(
             {'error': str(e)}, 
@@ -42,6 +42,10 @@ def api_root(request):
                 "product_images": f"{base_url}api/products/{{product_id}}/images/",
                 "search_products": f"{base_url}api/products/?search={{query}}",
                 "filter_by_category": f"{base_url}api/products/?category={{category_id}}",
+                "export_products": f"{base_url}api/products/export/?output=ndjson&updated_since={{timestamp}}",
+            },
+            "changes": {
+                "catalog_changes": f"{base_url}api/changes/?since={{seq}}",
             },
             "categories": {
                 "list_categories": f"{base_url}api/categories/",
@@ -56,6 +60,7 @@ def api_root(request):
                 "get_cart": f"{base_url}api/cart/",
                 "cart_items": f"{base_url}api/cart/items/",
                 "add_to_cart": f"{base_url}api/cart/add/",
+                "batch_update_cart": f"{base_url}api/cart/batch/",
                 "update_cart_item": f"{base_url}api/cart/items/{{item_id}}/",
                 "remove_cart_item": f"{base_url}api/cart/items/{{item_id}}/",
                 "clear_cart": f"{base_url}api/cart/clear/",
@@ -66,9 +71,11 @@ def api_root(request):
                 "create_order": f"{base_url}api/orders/",
                 "order_detail": f"{base_url}api/orders/{{order_id}}/",
                 "cancel_order": f"{base_url}api/orders/{{order_id}}/cancel/",
+                "reorder": f"{base_url}api/orders/{{order_id}}/reorder/",
                 "order_statistics": f"{base_url}api/orders/statistics/",
                 "user_orders": f"{base_url}api/users/{{user_id}}/orders/",
                 "update_order_status": f"{base_url}api/orders/{{order_id}}/status/",
+                "export_orders": f"{base_url}api/orders/export/?output=ndjson&created_since={{timestamp}}",
             },
             "admin": {
                 "admin_panel": f"{base_url}admin/",
@@ -84,6 +91,7 @@ def api_root(request):
             "default_page_size": 12,
             "page_parameter": "?page={{page_number}}",
             "page_size_parameter": "?page_size={{size}}",
+            "cursor_parameter": "?cursor= (keyset pagination for products, orders and cart items; follow the next/previous links)",
         },
         "filtering": {
             "search": "?search={{query}}",
@@ -0,0 +1,157 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on ``(<ordering field>, pk)``.
+
+    The ordering comes from the queryset (e.g. as applied by OrderingFilter), so
+    ``?ordering=price`` pages on ``(price, id)`` and the default ``-created_at``
+    pages on ``(created_at, id)``. Every page is a bounded index range scan and
+    no ``COUNT(*)`` is issued.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    default_ordering = "-created_at"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.field_name, self.descending = self._get_ordering(queryset)
+        field = queryset.model._meta.get_field(self.field_name)
+        pk_name = queryset.model._meta.pk.name
+
+        cursor = self._decode_cursor(request, queryset.model)
+        self.reverse = bool(cursor and cursor["reverse"])
+        # Walking backwards flips both the comparison and the sort direction.
+        descending = self.descending != self.reverse
+        if cursor:
+            op = "lt" if descending else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{self.field_name}__{op}": cursor["value"]})
+                | Q(**{self.field_name: cursor["value"], f"{pk_name}__{op}": cursor["pk"]})
+            )
+        prefix = "-" if descending else ""
+        queryset = queryset.order_by(f"{prefix}{self.field_name}", f"{prefix}{pk_name}")
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.next_position = self._position(field, results[-1]) if results and self.has_next else None
+        self.previous_position = self._position(field, results[0]) if results and self.has_previous else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self._encode_link(*self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self._encode_link(*self.previous_position, reverse=True)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            "name": self.cursor_query_param,
+            "required": False,
+            "in": "query",
+            "description": "Keyset pagination cursor. Pass an empty value to start from the first page.",
+            "schema": {"type": "string"},
+        }]
+
+    def _get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering) or [self.default_ordering]
+        name = ordering[0]
+        descending = name.startswith("-")
+        name = name.lstrip("-")
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            field = None
+        if field is None or not field.concrete or field.is_relation or field.null:
+            raise ValidationError({"ordering": f"Ordering by '{name}' is not supported with cursor pagination."})
+        return field.name, descending
+
+    def _position(self, field, obj):
+        return field.value_to_string(obj), str(obj.pk)
+
+    def _decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+            value, pk, reverse = payload["v"], payload["pk"], payload["r"]
+            return {
+                "value": model._meta.get_field(self.field_name).to_python(value),
+                "pk": model._meta.pk.to_python(pk),
+                "reverse": bool(reverse),
+            }
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _encode_link(self, value, pk, reverse):
+        payload = json.dumps({"v": value, "pk": pk, "r": int(reverse)}, separators=(",", ":"))
+        encoded = base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class OptInKeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination by default; switches to KeysetPagination when the
+    client sends a ``cursor`` query parameter (``?cursor=`` starts at page one).
+    """
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_pagination_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return (
+            super().get_schema_operation_parameters(view)
+            + self.keyset_pagination_class().get_schema_operation_parameters(view)
+        )
@@ -125,6 +125,30 @@ DATABASES = {
 }
 
 
+# Caches: Redis when REDIS_URL is set (shared between workers), otherwise a
+# per-process in-memory cache for tests and local development.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a serialized cart snapshot (Cart.cache) may be served from the cache.
+CART_CACHE_TIMEOUT = 900
+
+# Seconds a rendered anonymous catalog response (Product.response_cache) is kept;
+# entries are invalidated by tag long before that when the catalog changes.
+CATALOG_RESPONSE_CACHE_TIMEOUT = 300
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -165,6 +189,11 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'staticfiles')]
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Threads rendering product image derivatives (Product.images) in each web
+# worker process; 0 renders inline after the upload commits. Kept small: every
+# worker process has its own pool, and they share the host's cores.
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv('IMAGE_DERIVATIVE_WORKERS', 2))
+
 # Production: use WhiteNoise for static files (set in production/non-DEBUG)
 if not DEBUG:
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
@@ -193,6 +222,39 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend', "rest_framework.filters.SearchFilter", "rest_framework.filters.OrderingFilter"],
 }
 
+# Product search backend (dotted path). Defaults to MySQL FULLTEXT on MySQL and
+# the in-process index (Product.search.InMemorySearchBackend) elsewhere.
+PRODUCT_SEARCH_BACKEND = os.getenv('PRODUCT_SEARCH_BACKEND')
+# Search results beyond this are dropped; the response then carries X-Search-Truncated.
+PRODUCT_SEARCH_MAX_RESULTS = 1000
+# How often the in-process search backend re-reads documents written by other workers.
+PRODUCT_SEARCH_SYNC_SECONDS = 1
+# How often a read of the cached category tree checks the category change log for
+# changes made by other workers (their invalidation misses a per-process cache).
+CATEGORY_TREE_CHECK_SECONDS = 1
+
+# Order numbers: dotted path to the generator class. The default Snowflake-style
+# generator gives each process on a host its own node id, the first free one of
+# ORDER_NUMBER_NODE_SLOTS ids from ORDER_NUMBER_NODE_ID (0-1023), claimed with a
+# lock file. Hosts sharing the database need ranges that do not overlap.
+ORDER_NUMBER_GENERATOR = 'Order.numbering.SnowflakeOrderNumberGenerator'
+ORDER_NUMBER_NODE_ID = os.getenv('ORDER_NUMBER_NODE_ID')
+ORDER_NUMBER_NODE_SLOTS = int(os.getenv('ORDER_NUMBER_NODE_SLOTS', 64))
+ORDER_NUMBER_NODE_LOCK_DIR = os.getenv('ORDER_NUMBER_NODE_LOCK_DIR')
+
+# /api/changes/ holds back CatalogChange entries younger than this, so an entry
+# from a transaction that commits after a newer one was served is not skipped.
+# It must exceed the longest writer transaction, counted from the writer
+# inserting its entries to its commit; bulk writers (Product.importer) insert
+# them last for that reason.
+CATALOG_CHANGES_SETTLE_SECONDS = 2
+
+# Exports (Ecomerce_Application.exports) leave out rows whose window timestamp
+# (updated_at/created_at) is younger than this: it is stamped before the row's
+# transaction commits, and a late commit would land below the next export's
+# ``since``. It must exceed the longest transaction writing those rows.
+EXPORT_SETTLE_SECONDS = 2
+
 DJOSER = {
     "USER_CREATE_PASSWORD_RETYPE": True,
     "LOGIN_FIELD": "email",
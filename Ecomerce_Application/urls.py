@@ -15,10 +15,12 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from Product.storage import CONTENT_ADDRESSED
+from Product.views import product_image_file
 from .api_views import api_root, api_documentation, api_landing
 
 
@@ -51,6 +53,12 @@ urlpatterns = [
     path('api/orders/', include('Order.urls')),
     # path('api/payments/', include('Payment.urls')),
     # path('api/reviews/', include('Review.urls')),
+
+    # Content-addressed product images, served with immutable cache headers in every environment
+    re_path(
+        rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>{CONTENT_ADDRESSED.pattern})$",
+        product_image_file, name="product-image-file",
+    ),
 ]
 
 if settings.DEBUG:
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, UserOrderStatistics
 
 
 class OrderItemInline(admin.TabularInline):
@@ -47,3 +47,10 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_filter = ['order__status']
     search_fields = ['order__order_number', 'product__title']
     readonly_fields = ['id', 'unit_price', 'total_price']
+
+
+@admin.register(UserOrderStatistics)
+class UserOrderStatisticsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'total_orders', 'pending_orders', 'cancelled_orders', 'total_spent', 'updated_at']
+    search_fields = ['user__email']
+    readonly_fields = ['id', 'updated_at']
@@ -0,0 +1,42 @@
+"""
+Order export for analytics (see Ecomerce_Application.exports).
+
+NDJSON has one order per line with its items nested; CSV has one row per
+order item with the order's columns repeated.
+"""
+from Ecomerce_Application.exports import apply_window, export_response, group_by_parent, iter_batches
+from .models import Order, OrderItem
+
+ORDER_FIELDS = [
+    "id", "order_number", "user_id", "status", "payment_status", "payment_method",
+    "subtotal", "tax_amount", "shipping_cost", "total_amount",
+    "shipping_address_id", "billing_address_id",
+    "created_at", "updated_at", "confirmed_at", "shipped_at", "delivered_at",
+]
+ITEM_FIELDS = ["id", "product_id", "product__sku", "variant_id", "variant__sku", "quantity", "unit_price", "total_price"]
+ITEM_KEYS = [name.replace("__", "_") for name in ITEM_FIELDS]
+CSV_COLUMNS = ORDER_FIELDS + [f"item_{name}" for name in ITEM_KEYS]
+
+
+def order_batches(queryset, field):
+    """Lists of order records, with two queries per list"""
+    for batch in iter_batches(queryset.values(*ORDER_FIELDS), field):
+        items = group_by_parent(
+            OrderItem.objects.filter(order_id__in=[record["id"] for record in batch])
+            .order_by("id").values_list("order_id", *ITEM_FIELDS)
+        )
+        for record in batch:
+            record["items"] = [dict(zip(ITEM_KEYS, item)) for item in items.get(record["id"], [])]
+        yield batch
+
+
+def order_csv_rows(record):
+    record = dict(record)
+    items = record.pop("items")
+    return [dict(record, **{f"item_{name}": value for name, value in item.items()}) for item in items] or [record]
+
+
+def export_orders(request):
+    """Stream every order, optionally within a created_at/updated_at window"""
+    queryset, field = apply_window(Order.objects.all(), request.query_params, default="created")
+    return export_response(request, order_batches(queryset, field), "orders", CSV_COLUMNS, order_csv_rows)
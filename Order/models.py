@@ -1,10 +1,22 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 import uuid
 from decimal import Decimal
 from Product.models import Product, Variant
 from User.models import Address
+from .numbering import get_order_number_generator
+from .stock import reserve_stock, restore_stock
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_details(self):
+        """Load everything OrderSerializer renders: user, addresses and items with products/variants"""
+        return self.select_related('user', 'shipping_address', 'billing_address').prefetch_related(
+            models.Prefetch('items', queryset=OrderItem.objects.select_related('product', 'variant'))
+        )
 
 
 class Order(models.Model):
@@ -45,22 +57,65 @@ class Order(models.Model):
     shipped_at = models.DateTimeField(null=True, blank=True)
     delivered_at = models.DateTimeField(null=True, blank=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    ORDER_NUMBER_ATTEMPTS = 3
+    # Statuses whose total counts towards what a customer has spent
+    SPENT_STATUSES = (Status.CONFIRMED, Status.PROCESSING, Status.SHIPPED, Status.DELIVERED)
+
     class Meta:
         ordering = ['-created_at']
+        # Keyset batches of the exports (Order.exports).
+        indexes = [
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.order_number} - {self.user.email}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so save() can report status transitions to the rollup
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_total = instance.__dict__.get('total_amount')
+        return instance
+
     def save(self, *args, **kwargs):
-        if not self.order_number:
+        adding = self._state.adding
+        old_status = getattr(self, '_loaded_status', None)
+        with transaction.atomic():
+            self._save_with_order_number(*args, **kwargs)
+            if adding:
+                UserOrderStatistics.apply_change(self.user_id, None, self.status, None, self.total_amount)
+            elif old_status is None or self._loaded_total is None:
+                # Loaded without its status or total (deferred fields): recount instead of guessing
+                UserOrderStatistics.rebuild(self.user_id)
+            else:
+                UserOrderStatistics.apply_change(
+                    self.user_id, old_status, self.status, self._loaded_total, self.total_amount,
+                )
+        self._loaded_status, self._loaded_total = self.status, self.total_amount
+
+    def _save_with_order_number(self, *args, **kwargs):
+        if self.order_number:
+            return super().save(*args, **kwargs)
+        # Generated numbers are unique per node; retry on the rare cross-node collision
+        for attempt in range(self.ORDER_NUMBER_ATTEMPTS):
             self.order_number = self.generate_order_number()
-        super().save(*args, **kwargs)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                taken = Order.objects.filter(order_number=self.order_number).exists()
+                if attempt + 1 == self.ORDER_NUMBER_ATTEMPTS or not taken:
+                    self.order_number = ''
+                    raise
 
     def generate_order_number(self):
         """Generate a unique order number"""
-        import time
-        timestamp = str(int(time.time()))[-8:]  # Last 8 digits of timestamp
-        return f"ORD{timestamp}"
+        return get_order_number_generator()()
 
     @property
     def total_items(self):
@@ -83,29 +138,23 @@ class Order(models.Model):
         if not self.can_be_cancelled():
             raise ValidationError("Order cannot be cancelled in its current status")
         
-        # Restore stock for all items
-        for item in self.items.all():
-            item.restore_stock()
+        # Stock is only taken when the order is confirmed, so a pending order has nothing to give back
+        if self.status == self.Status.CONFIRMED:
+            restore_stock(self.items.all())
         
         self.status = self.Status.CANCELLED
         self.save()
 
     def confirm(self):
-        """Confirm the order"""
+        """Confirm the order, reserving stock for every line or for none of them"""
         if self.status != self.Status.PENDING:
             raise ValidationError("Only pending orders can be confirmed")
         
-        # Validate stock availability before confirming
-        for item in self.items.all():
-            if not item.is_stock_available():
-                raise ValidationError(f"Insufficient stock for {item.product.title}")
-        
-        # Reserve stock
-        for item in self.items.all():
-            item.reserve_stock()
+        # Raises StockReservationError listing every line that is short
+        reserve_stock(self.items.select_related('product', 'variant'))
         
         self.status = self.Status.CONFIRMED
-        self.confirmed_at = models.DateTimeField(auto_now=True)
+        self.confirmed_at = timezone.now()
         self.save()
 
 
@@ -141,23 +190,90 @@ class OrderItem(models.Model):
 
     def reserve_stock(self):
         """Reserve stock for this order item"""
-        if self.variant:
-            if self.variant.stock < self.quantity:
-                raise ValidationError(f"Insufficient stock for variant {self.variant.name}")
-            self.variant.stock -= self.quantity
-            self.variant.save()
-        else:
-            if self.product.stock < self.quantity:
-                raise ValidationError(f"Insufficient stock for product {self.product.title}")
-            self.product.stock -= self.quantity
-            self.product.save()
+        reserve_stock([self])
 
     def restore_stock(self):
         """Restore stock when order is cancelled"""
-        if self.variant:
-            self.variant.stock += self.quantity
-            self.variant.save()
-        else:
-            self.product.stock += self.quantity
-            self.product.save()
+        restore_stock([self])
+
+
+
+class UserOrderStatistics(models.Model):
+    """
+    Per-user order rollup behind the order statistics endpoint, maintained
+    incrementally by Order.save() on creation and status transitions, and
+    rebuilt when an order is deleted (Order.signals).
+    Bulk QuerySet.update() calls bypass it; call rebuild() afterwards.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='order_statistics')
+    total_orders = models.PositiveIntegerField(default=0)
+    pending_orders = models.PositiveIntegerField(default=0)
+    confirmed_orders = models.PositiveIntegerField(default=0)
+    processing_orders = models.PositiveIntegerField(default=0)
+    shipped_orders = models.PositiveIntegerField(default=0)
+    delivered_orders = models.PositiveIntegerField(default=0)
+    cancelled_orders = models.PositiveIntegerField(default=0)
+    refunded_orders = models.PositiveIntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "user order statistics"
+
+    def __str__(self):
+        return f"Order statistics for {self.user_id}"
+
+    @staticmethod
+    def status_field(status):
+        return f"{status}_orders"
+
+    @classmethod
+    def aggregate(cls, user_id):
+        """Compute the statistics of a user from their orders in one conditional-aggregation query"""
+        aggregates = {'total_orders': models.Count('id')}
+        for status in Order.Status.values:
+            aggregates[cls.status_field(status)] = models.Count('id', filter=models.Q(status=status))
+        aggregates['total_spent'] = Coalesce(
+            models.Sum('total_amount', filter=models.Q(status__in=Order.SPENT_STATUSES)),
+            Decimal('0.00'),
+            output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        )
+        return Order.objects.filter(user_id=user_id).order_by().aggregate(**aggregates)
+
+    @classmethod
+    def rebuild(cls, user_id):
+        """Recompute and store the rollup of a user"""
+        statistics, _ = cls.objects.update_or_create(user_id=user_id, defaults=cls.aggregate(user_id))
+        return statistics
+
+    @classmethod
+    def for_user(cls, user_id):
+        statistics = cls.objects.filter(user_id=user_id).first()
+        return statistics or cls.rebuild(user_id)
 
+    @classmethod
+    def apply_change(cls, user_id, old_status, new_status, old_total, new_total):
+        """Apply one order's creation (old_status=None) or status/total change as F() increments"""
+        changes = {}
+        if old_status is None:
+            changes['total_orders'] = models.F('total_orders') + 1
+        if old_status != new_status:
+            if old_status is not None:
+                changes[cls.status_field(old_status)] = models.F(cls.status_field(old_status)) - 1
+            changes[cls.status_field(new_status)] = models.F(cls.status_field(new_status)) + 1
+        spent_delta = (
+            (new_total if new_status in Order.SPENT_STATUSES else 0)
+            - (old_total if old_status in Order.SPENT_STATUSES else 0)
+        )
+        if spent_delta:
+            changes['total_spent'] = models.F('total_spent') + spent_delta
+        if not changes:
+            return
+        if not cls.objects.filter(user_id=user_id).update(**changes):
+            # First order activity seen for this user: the aggregate already includes this change
+            try:
+                with transaction.atomic():
+                    cls.objects.create(user_id=user_id, **cls.aggregate(user_id))
+            except IntegrityError:
+                cls.objects.filter(user_id=user_id).update(**changes)
@@ -0,0 +1,140 @@
+"""
+Order number generation.
+
+The generator is pluggable through the ORDER_NUMBER_GENERATOR setting (a
+dotted path to a class whose instances are called with no arguments and return
+a new order number).
+"""
+import hashlib
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+BASE36 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def to_base36(value, width):
+    digits = []
+    while value:
+        value, remainder = divmod(value, 36)
+        digits.append(BASE36[remainder])
+    return "".join(reversed(digits)).rjust(width, "0")
+
+
+class SnowflakeOrderNumberGenerator:
+    """
+    Snowflake-style ids: milliseconds since EPOCH_MS, a node id and a per-node
+    sequence, packed into 63 bits and written as 13 zero-padded base36 digits
+    after the ``ORD`` prefix (e.g. ``ORD0J8K2M4ZQ1A0B``). Numbers sort by
+    creation time, up to 4096 can be minted per millisecond per node, and no
+    database round trip is needed.
+
+    Every process, including each pre-forked worker, claims its own node id
+    on first use: the lowest id from ORDER_NUMBER_NODE_ID (default 0) up
+    whose lock file in ORDER_NUMBER_NODE_LOCK_DIR it can flock. The lock goes
+    with the process, so ids are unique among the live processes of a host
+    and are reused after a restart. Hosts (or containers with their own lock
+    directory) sharing a database need ORDER_NUMBER_NODE_ID values at least
+    ORDER_NUMBER_NODE_SLOTS apart. Without flock (Windows) the node id is a
+    hash of the host name and process id, which can collide; Order.save()
+    retries when a number is taken.
+    """
+    prefix = "ORD"
+    EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+    NODE_BITS = 10
+    SEQUENCE_BITS = 12
+    WIDTH = 13
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+        self._pid = None
+        self._node_id = None
+        self._node_lock = None
+
+    @property
+    def node_id(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            # Recomputed after a fork so pre-forked workers get their own node id.
+            self._pid = pid
+            if self._node_lock is not None:
+                # Inherited from the parent, whose lock it still is.
+                self._node_lock.close()
+                self._node_lock = None
+            if fcntl is not None:
+                self._node_id = self._claim_node_id()
+            else:
+                digest = hashlib.blake2b(f"{socket.gethostname()}:{pid}".encode(), digest_size=4).digest()
+                self._node_id = int.from_bytes(digest, "big") % (1 << self.NODE_BITS)
+            self._sequence = 0
+        return self._node_id
+
+    def _claim_node_id(self):
+        base = int(getattr(settings, "ORDER_NUMBER_NODE_ID", None) or 0)
+        slots = int(getattr(settings, "ORDER_NUMBER_NODE_SLOTS", 64))
+        directory = getattr(settings, "ORDER_NUMBER_NODE_LOCK_DIR", None) or tempfile.gettempdir()
+        for node_id in range(base, base + slots):
+            node_id %= 1 << self.NODE_BITS
+            lock = open(os.path.join(directory, f"order-number-node-{node_id}.lock"), "a")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                continue
+            self._node_lock = lock
+            return node_id
+        raise RuntimeError(f"All {slots} order number node ids from {base} are held by other processes.")
+
+    @staticmethod
+    def _now_ms():
+        return time.time_ns() // 1_000_000
+
+    def next_id(self):
+        with self._lock:
+            node_id = self.node_id
+            now = self._now_ms()
+            if now < self._last_ms:
+                # Clock went backwards: keep issuing from the last timestamp.
+                now = self._last_ms
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & ((1 << self.SEQUENCE_BITS) - 1)
+                if self._sequence == 0:
+                    while now <= self._last_ms:
+                        now = self._now_ms()
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (
+                ((now - self.EPOCH_MS) << (self.NODE_BITS + self.SEQUENCE_BITS))
+                | (node_id << self.SEQUENCE_BITS)
+                | self._sequence
+            )
+
+    def __call__(self):
+        return f"{self.prefix}{to_base36(self.next_id(), self.WIDTH)}"
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_order_number_generator():
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                path = getattr(settings, "ORDER_NUMBER_GENERATOR", "Order.numbering.SnowflakeOrderNumberGenerator")
+                _generator = import_string(path)()
+    return _generator
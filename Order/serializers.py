@@ -1,6 +1,9 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.db import transaction
 from .models import Order, OrderItem
+from Cart.cache import invalidate_cart
 from Cart.models import Cart, CartItem
 from User.models import Address
 from Product.models import Product, Variant
@@ -73,17 +76,17 @@ class CreateOrderSerializer(serializers.Serializer):
         """Validate cart has items and stock availability"""
         user = self.context['request'].user
         
-        # Check if user has a cart with items
-        try:
-            cart = Cart.objects.get(user=user)
-        except Cart.DoesNotExist:
-            raise serializers.ValidationError("No cart found for user")
-        
-        if not cart.items.exists():
+        # One query loads every line with the product and variant it prices from
+        self._cart_items = list(
+            CartItem.objects.filter(cart__user=user).select_related('product', 'variant__product')
+        )
+        if not self._cart_items:
+            if not Cart.objects.filter(user=user).exists():
+                raise serializers.ValidationError("No cart found for user")
             raise serializers.ValidationError("Cart is empty")
         
         # Check stock availability for all cart items
-        for cart_item in cart.items.all():
+        for cart_item in self._cart_items:
             available_stock = cart_item.variant.stock if cart_item.variant else cart_item.product.stock
             if cart_item.quantity > available_stock:
                 raise serializers.ValidationError(
@@ -95,44 +98,41 @@ class CreateOrderSerializer(serializers.Serializer):
     
     @transaction.atomic
     def create(self, validated_data):
-        """Create order from cart"""
+        """Create order from cart with a fixed number of queries, whatever the number of lines"""
         user = self.context['request'].user
+        cart_items = self._cart_items
         
-        # Get user's cart
-        cart = Cart.objects.get(user=user)
-        
-        # Get addresses
-        shipping_address = Address.objects.get(id=validated_data['shipping_address_id'])
-        billing_address = Address.objects.get(id=validated_data['billing_address_id'])
-        
-        # Create order
-        order = Order.objects.create(
-            user=user,
-            shipping_address=shipping_address,
-            billing_address=billing_address,
-            payment_method=validated_data.get('payment_method', ''),
-            subtotal=0,  # Will be calculated
-            total_amount=0  # Will be calculated
-        )
-        
-        # Create order items from cart items
-        for cart_item in cart.items.all():
-            unit_price = cart_item.unit_price
-            
-            OrderItem.objects.create(
-                order=order,
+        items = [
+            OrderItem(
                 product=cart_item.product,
                 variant=cart_item.variant,
                 quantity=cart_item.quantity,
-                unit_price=unit_price
+                unit_price=cart_item.unit_price,
+                # bulk_create skips OrderItem.save(), so the line total is set here
+                total_price=cart_item.unit_price * cart_item.quantity,
             )
+            for cart_item in cart_items
+        ]
+        subtotal = sum((item.total_price for item in items), Decimal('0.00'))
         
-        # Calculate totals
-        order.calculate_totals()
+        # Addresses were checked against the user during validation; only their ids are needed
+        order = Order(
+            user=user,
+            shipping_address_id=validated_data['shipping_address_id'],
+            billing_address_id=validated_data['billing_address_id'],
+            payment_method=validated_data.get('payment_method', ''),
+            subtotal=subtotal,
+        )
+        order.total_amount = order.subtotal + order.tax_amount + order.shipping_cost
         order.save()
         
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+        
         # Clear the cart
-        cart.clear()
+        CartItem.objects.filter(cart_id=cart_items[0].cart_id).delete()
+        invalidate_cart(user.pk)
         
         return order
 
@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Order, UserOrderStatistics
+
+
+@receiver(post_delete, sender=Order)
+def rebuild_statistics_of_deleted_order(sender, instance, **kwargs):
+    user_id = instance.user_id
+
+    def rebuild():
+        # No rollup left when the delete came from deleting the user.
+        if UserOrderStatistics.objects.filter(user_id=user_id).exists():
+            UserOrderStatistics.rebuild(user_id)
+
+    transaction.on_commit(rebuild)
@@ -0,0 +1,133 @@
+"""
+Stock reservation for orders.
+
+Stock is changed with conditional ``UPDATE ... SET stock = stock - n WHERE
+stock >= n`` statements, never read-modify-write in Python, so concurrent
+checkouts cannot oversell. Lines that draw from the same product or variant are
+merged first, and rows are always touched in the same order (variants, then
+products, by primary key) so concurrent reservations cannot deadlock.
+"""
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from Cart.cache import invalidate_carts_for_products
+from Product.models import CatalogChange, Product, Variant
+
+# Models in lock order.
+STOCK_MODELS = (Variant, Product)
+
+
+@dataclass
+class StockFailure:
+    """A line that could not be reserved."""
+    item: object
+    requested: int
+    available: int
+
+    @property
+    def message(self):
+        name = self.item.variant.name if self.item.variant_id else self.item.product.title
+        return f"Insufficient stock for {name}. Available: {self.available}, Requested: {self.requested}"
+
+
+class StockReservationError(ValidationError):
+    """Raised when one or more lines cannot be reserved; carries every failing line."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__([failure.message for failure in failures])
+
+    def as_lines(self):
+        return [
+            {
+                "item": str(failure.item.pk),
+                "product": str(failure.item.product_id),
+                "variant": str(failure.item.variant_id) if failure.item.variant_id else None,
+                "requested": failure.requested,
+                "available": failure.available,
+            }
+            for failure in self.failures
+        ]
+
+
+def _stock_rows(items):
+    """Group lines by the stock row they draw from: {model: {pk: (quantity, [items])}}."""
+    rows = {model: {} for model in STOCK_MODELS}
+    for item in items:
+        model, pk = (Variant, item.variant_id) if item.variant_id else (Product, item.product_id)
+        quantity, lines = rows[model].get(pk, (0, []))
+        rows[model][pk] = (quantity + item.quantity, lines + [item])
+    return rows
+
+
+def _product_ids(rows):
+    return {line.product_id for model_rows in rows.values() for _, lines in model_rows.values() for line in lines}
+
+
+def _log_stock_changes(rows, sign):
+    """One CatalogChange entry per stock row, with the signed change in ``delta``"""
+    CatalogChange.objects.bulk_create([
+        CatalogChange.entry(
+            CatalogChange.Entity.VARIANT if model is Variant else CatalogChange.Entity.PRODUCT,
+            CatalogChange.Action.STOCK, pk, lines[0].product_id, delta=sign * quantity,
+        )
+        for model, model_rows in rows.items()
+        for pk, (quantity, lines) in model_rows.items()
+    ])
+
+
+def _lock_order(rows):
+    return sorted(rows.items(), key=lambda row: str(row[0]).replace("-", ""))
+
+
+def reserve_stock(items):
+    """
+    Take stock for all ``items`` (OrderItem-like objects) in one transaction.
+    Either every line is reserved or none is and StockReservationError lists
+    each failing line with the stock that was available.
+    """
+    failed = {model: {} for model in STOCK_MODELS}
+    with transaction.atomic():
+        stock_rows = _stock_rows(items)
+        for model, rows in stock_rows.items():
+            for pk, (quantity, lines) in _lock_order(rows):
+                updated = model.objects.filter(pk=pk, stock__gte=quantity).update(stock=F("stock") - quantity)
+                if not updated:
+                    failed[model][pk] = (quantity, lines)
+        if any(failed.values()):
+            failures = []
+            for model, rows in failed.items():
+                if not rows:
+                    continue
+                available = dict(model.objects.filter(pk__in=rows).values_list("pk", "stock"))
+                for pk, (quantity, lines) in rows.items():
+                    failures.extend(StockFailure(line, quantity, available.get(pk, 0)) for line in lines)
+            # Raising inside the atomic block rolls back the lines already taken.
+            raise StockReservationError(failures)
+        _log_stock_changes(stock_rows, -1)
+        product_ids = _product_ids(stock_rows)
+        Product.objects.filter(pk__in=product_ids).refresh_summaries()
+        # Carts holding these products show stale stock now.
+        invalidate_carts_for_products(product_ids)
+
+
+def restore_stock(items):
+    """Give the stock of ``items`` back with a single UPDATE per model."""
+    with transaction.atomic():
+        stock_rows = _stock_rows(items)
+        for model, rows in stock_rows.items():
+            if not rows:
+                continue
+            increment = Case(
+                *[When(pk=pk, then=Value(quantity)) for pk, (quantity, _) in rows.items()],
+                default=Value(0),
+                output_field=PositiveIntegerField(),
+            )
+            model.objects.filter(pk__in=list(rows)).update(stock=F("stock") + increment)
+        _log_stock_changes(stock_rows, 1)
+        product_ids = _product_ids(stock_rows)
+        Product.objects.filter(pk__in=product_ids).refresh_summaries()
+        invalidate_carts_for_products(product_ids)
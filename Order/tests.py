@@ -1,3 +1,364 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import multiprocessing
+import threading
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from Cart.models import Cart, CartItem
+from Order.models import Order, OrderItem, UserOrderStatistics
+from Order import numbering
+from Order.numbering import SnowflakeOrderNumberGenerator
+from Order.stock import StockReservationError
+from Product.models import Product, Variant
+
+
+def make_order(user, address, lines):
+    """Create a pending order with ``lines`` of (product, variant, quantity)."""
+    order = Order.objects.create(
+        user=user, shipping_address=address, billing_address=address,
+        subtotal=Decimal("0.00"), total_amount=Decimal("0.00"),
+    )
+    for product, variant, quantity in lines:
+        OrderItem.objects.create(
+            order=order, product=product, variant=variant, quantity=quantity,
+            unit_price=Decimal(str(variant.get_price() if variant else product.price)),
+        )
+    return order
+
+
+def test_confirm_reserves_stock_for_every_line(user, address, product, variant):
+    order = make_order(user, address, [(product, variant, 2), (product, None, 3), (product, variant, 1)])
+    order.confirm()
+    variant.refresh_from_db()
+    product.refresh_from_db()
+    assert variant.stock == 2
+    assert product.stock == 7
+    assert order.status == Order.Status.CONFIRMED
+    assert order.confirmed_at is not None
+
+
+def test_confirm_is_all_or_nothing_and_reports_each_short_line(user, address, product, variant):
+    other = Product.objects.create(title="Sandal", price="20.00", sku="SANDAL-1", stock=1)
+    order = make_order(user, address, [(product, None, 4), (product, variant, 6), (other, None, 2)])
+
+    with pytest.raises(StockReservationError) as exc:
+        order.confirm()
+
+    lines = exc.value.as_lines()
+    assert {(line["requested"], line["available"]) for line in lines} == {(6, 5), (2, 1)}
+    product.refresh_from_db()
+    assert product.stock == 10  # the line that fitted was rolled back
+    assert Order.objects.get(pk=order.pk).status == Order.Status.PENDING
+
+
+def test_cancel_restores_confirmed_stock_only(user, address, product, variant):
+    pending = make_order(user, address, [(product, variant, 1)])
+    pending.cancel()
+    variant.refresh_from_db()
+    assert variant.stock == 5
+
+    confirmed = make_order(user, address, [(product, variant, 2), (product, variant, 1), (product, None, 4)])
+    confirmed.confirm()
+    confirmed.cancel()
+    variant.refresh_from_db()
+    product.refresh_from_db()
+    assert (variant.stock, product.stock) == (5, 10)
+    assert confirmed.status == Order.Status.CANCELLED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_confirms_never_oversell(user, address, product):
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        pytest.skip("threads need a shared database")
+    variant = Variant.objects.create(product=product, name="Limited", sku="LIMITED-1", stock=5)
+    orders = [make_order(user, address, [(product, variant, 1)]) for _ in range(20)]
+    results = []
+    barrier = threading.Barrier(len(orders))
+
+    def confirm(order):
+        barrier.wait()
+        try:
+            with transaction.atomic():
+                order.confirm()
+            results.append(True)
+        except StockReservationError:
+            results.append(False)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=confirm, args=(order,)) for order in orders]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    variant.refresh_from_db()
+    assert results.count(True) == 5
+    assert variant.stock == 0
+    assert Order.objects.filter(status=Order.Status.CONFIRMED).count() == 5
+
+
+def _fill_cart(user, lines, prefix):
+    cart, _ = Cart.objects.get_or_create(user=user)
+    for idx in range(lines):
+        product = Product.objects.create(title=f"Line {idx}", price="4.50", sku=f"{prefix}-{idx}", stock=10)
+        variant = Variant.objects.create(product=product, name="One size", sku=f"{prefix}-{idx}-OS", stock=10) if idx % 2 else None
+        CartItem.objects.create(cart=cart, product=product, variant=variant, quantity=2)
+    return cart
+
+
+def _checkout(client, address):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.post(
+            "/api/orders/orders/",
+            {"shipping_address_id": str(address.pk), "billing_address_id": str(address.pk)},
+            format="json",
+        )
+    assert response.status_code == 201, response.data
+    return response, len(ctx.captured_queries)
+
+
+def test_checkout_builds_order_from_cart_in_constant_queries(user, address):
+    client = APIClient()
+    client.force_authenticate(user)
+    # The first order of a user also creates their statistics rollup row.
+    UserOrderStatistics.rebuild(user.pk)
+
+    cart = _fill_cart(user, 2, "SMALL")
+    small_response, small = _checkout(client, address)
+    assert not cart.items.exists()
+
+    _fill_cart(user, 20, "LARGE")
+    response, large = _checkout(client, address)
+
+    assert small == large
+    assert len(response.data["items"]) == 20
+    order = Order.objects.get(pk=response.data["id"])
+    assert order.subtotal == order.total_amount == Decimal("180.00")
+    assert all(item.total_price == Decimal("9.00") for item in order.items.all())
+
+
+def test_order_numbers_are_unique_and_time_ordered_across_threads():
+    generator = SnowflakeOrderNumberGenerator()
+    per_thread = {}
+
+    def mint(name):
+        per_thread[name] = [generator() for _ in range(5000)]
+
+    threads = [threading.Thread(target=mint, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    numbers = [number for batch in per_thread.values() for number in batch]
+    assert len(set(numbers)) == 40000
+    assert all(len(number) <= 20 and number.startswith("ORD") for number in numbers)
+    assert all(batch == sorted(batch) for batch in per_thread.values())
+
+
+def test_generators_on_different_nodes_do_not_collide(settings):
+    settings.ORDER_NUMBER_NODE_ID = 1
+    first = SnowflakeOrderNumberGenerator()
+    first_numbers = {first() for _ in range(2000)}
+    settings.ORDER_NUMBER_NODE_ID = 2
+    second = SnowflakeOrderNumberGenerator()
+    assert first_numbers.isdisjoint(second() for _ in range(2000))
+
+
+def _child_node_id(generator, queue):
+    queue.put(generator.node_id)
+
+
+@pytest.mark.skipif(numbering.fcntl is None or "fork" not in multiprocessing.get_all_start_methods(), reason="needs flock and fork")
+def test_each_process_claims_its_own_node_id(settings, tmp_path):
+    settings.ORDER_NUMBER_NODE_LOCK_DIR = str(tmp_path)
+    settings.ORDER_NUMBER_NODE_ID = 8
+    generator = SnowflakeOrderNumberGenerator()
+    other = SnowflakeOrderNumberGenerator()
+    assert (generator.node_id, other.node_id) == (8, 9)
+
+    # A forked worker inherits the generator, not its node id.
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    child = context.Process(target=_child_node_id, args=(generator, queue))
+    child.start()
+    assert queue.get(timeout=10) == 10
+    child.join()
+    assert generator.node_id == 8
+
+    settings.ORDER_NUMBER_NODE_SLOTS = 2
+    with pytest.raises(RuntimeError):
+        SnowflakeOrderNumberGenerator().node_id
+    del other
+    assert SnowflakeOrderNumberGenerator().node_id == 9
+
+
+def test_order_save_retries_when_a_number_is_taken(user, address, monkeypatch):
+    first = make_order(user, address, [])
+    numbers = iter([first.order_number, "ORDRETRYNUMBER"])
+    monkeypatch.setattr(Order, "generate_order_number", lambda self: next(numbers))
+    assert make_order(user, address, []).order_number == "ORDRETRYNUMBER"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_many_threads_create_orders_in_the_same_second(user, address):
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        pytest.skip("threads need a shared database")
+    errors = []
+    barrier = threading.Barrier(16)
+
+    def create_orders():
+        barrier.wait()
+        try:
+            for _ in range(10):
+                make_order(user, address, [])
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=create_orders) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert Order.objects.values("order_number").distinct().count() == 160
+
+
+def _statistics(client):
+    response = client.get("/api/orders/orders/statistics/")
+    assert response.status_code == 200
+    return response.data
+
+
+def test_order_statistics_rollup_follows_status_transitions(user, address, product, variant):
+    client = APIClient()
+    client.force_authenticate(user)
+    orders = [make_order(user, address, [(product, None, 1)]) for _ in range(4)]
+    for order in orders:
+        order.subtotal = order.total_amount = Decimal("10.00")
+        order.save()
+    orders[0].confirm()
+    orders[1].confirm()
+    orders[1].cancel()
+    admin_update = Order.objects.get(pk=orders[2].pk)
+    admin_update.status = Order.Status.CANCELLED
+    admin_update.save()
+
+    stats = _statistics(client)
+    assert stats == {
+        "total_orders": 4,
+        "pending_orders": 1,
+        "confirmed_orders": 1,
+        "shipped_orders": 0,
+        "delivered_orders": 0,
+        "cancelled_orders": 2,
+        "total_spent": Decimal("10.00"),
+    }
+    rebuilt = UserOrderStatistics.aggregate(user.pk)
+    assert {key: rebuilt[key] for key in stats} == stats
+
+
+def test_order_statistics_rollup_follows_deletes(user, address, product, django_capture_on_commit_callbacks):
+    client = APIClient()
+    client.force_authenticate(user)
+    orders = [make_order(user, address, [(product, None, 1)]) for _ in range(3)]
+    for order in orders:
+        order.subtotal = order.total_amount = Decimal("10.00")
+        order.save()
+    orders[0].confirm()
+    assert _statistics(client)["total_orders"] == 3
+
+    with django_capture_on_commit_callbacks(execute=True):
+        orders[0].delete()
+        Order.objects.filter(pk=orders[1].pk).delete()
+
+    stats = _statistics(client)
+    assert (stats["total_orders"], stats["confirmed_orders"], stats["pending_orders"]) == (1, 0, 1)
+    assert stats["total_spent"] == Decimal("0.00")
+
+
+def test_order_statistics_is_one_query_once_the_rollup_exists(user, address, product):
+    client = APIClient()
+    client.force_authenticate(user)
+    for _ in range(5):
+        make_order(user, address, [(product, None, 1)])
+    with CaptureQueriesContext(connection) as ctx:
+        assert _statistics(client)["pending_orders"] == 5
+    assert len(ctx.captured_queries) == 1
+
+
+def test_order_statistics_are_rebuilt_when_missing(user, address, product):
+    client = APIClient()
+    client.force_authenticate(user)
+    make_order(user, address, [(product, None, 1)]).confirm()
+    UserOrderStatistics.objects.all().delete()
+    assert _statistics(client)["confirmed_orders"] == 1
+
+
+def test_reorder_copies_lines_at_current_prices_and_clamps_to_stock(user, address, product, variant):
+    client = APIClient()
+    client.force_authenticate(user)
+    retired = Product.objects.create(title="Retired", price="5.00", sku="RETIRED-1", stock=10)
+    order = make_order(user, address, [(product, variant, 3), (product, None, 2), (retired, None, 1)])
+    retired.is_active = False
+    retired.save()
+    variant.price = Decimal("120.00")
+    variant.stock = 4
+    variant.save()
+    cart = Cart.objects.create(user=user)
+    CartItem.objects.create(cart=cart, product=product, variant=variant, quantity=2)
+
+    response = client.post(f"/api/orders/orders/{order.pk}/reorder/")
+    assert response.status_code == 200, response.data
+
+    lines = {item["variant"]: item for item in response.data["cart"]["items"]}
+    assert lines[variant.pk]["quantity"] == 4
+    assert lines[variant.pk]["unit_price"] == "120.00"
+    assert lines[None]["quantity"] == 2
+    variant_line = order.items.get(variant=variant)
+    assert response.data["adjusted"] == [{"item": str(variant_line.pk), "requested": 3, "quantity": 2}]
+    assert response.data["errors"] == [{"item": str(order.items.get(product=retired).pk), "error": "Product not found or inactive"}]
+    assert response.data["cart"]["total_price"] == "679.98"
+
+
+def test_reorder_is_limited_to_the_users_own_orders(user, address, product):
+    stranger = get_user_model().objects.create_user(email="other@example.com", first_name="O", last_name="T", password="x")
+    order = make_order(user, address, [(product, None, 1)])
+    client = APIClient()
+    client.force_authenticate(stranger)
+    assert client.post(f"/api/orders/orders/{order.pk}/reorder/").status_code == 404
+
+
+def test_order_export_streams_items_within_a_created_window(user, address, product, variant, settings):
+    settings.EXPORT_SETTLE_SECONDS = 0
+    old = make_order(user, address, [(product, None, 1)])
+    Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=2))
+    order = make_order(user, address, [(product, None, 2), (product, variant, 1)])
+    client = APIClient()
+    client.force_authenticate(user)
+    assert client.get("/api/orders/orders/export/").status_code == 403
+
+    user.is_staff = True
+    user.save()
+    since = (timezone.now() - timedelta(days=1)).isoformat()
+    response = client.get("/api/orders/orders/export/", {"created_since": since})
+    [record] = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert record["order_number"] == order.order_number
+    assert sorted((item["variant_sku"] or "", item["quantity"]) for item in record["items"]) == [("", 2), ("SKU-001-42B", 1)]
+
+    response = client.get("/api/orders/orders/export/", {"output": "csv"})
+    rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+    assert [row["order_number"] for row in rows] == [old.order_number] + [order.order_number] * 2
@@ -6,7 +6,9 @@ urlpatterns = [
     path('orders/', views.OrderListCreateView.as_view(), name='order-list-create'),
     path('orders/<uuid:pk>/', views.OrderDetailView.as_view(), name='order-detail'),
     path('orders/<uuid:order_id>/cancel/', views.cancel_order, name='order-cancel'),
+    path('orders/<uuid:order_id>/reorder/', views.reorder, name='order-reorder'),
     path('orders/statistics/', views.order_statistics, name='order-statistics'),
+    path('orders/export/', views.export_orders_view, name='order-export'),
     
     # Admin endpoints
     path('users/<uuid:user_id>/orders/', views.UserOrderListView.as_view(), name='user-orders'),
@@ -1,11 +1,18 @@
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.db import transaction
 from django.utils import timezone
 
-from .models import Order, OrderItem
+from Cart.batch import apply_cart_operations
+from Cart.cache import get_cart_snapshot
+from Cart.models import Cart
+from Ecomerce_Application.pagination import OptInKeysetPagination
+from .exports import export_orders
+from .models import Order, OrderItem, UserOrderStatistics
+from .stock import StockReservationError
 from .serializers import (
     OrderSerializer, CreateOrderSerializer, UpdateOrderStatusSerializer
 )
@@ -16,10 +23,11 @@ class OrderListCreateView(generics.ListCreateAPIView):
     """List user's orders and create new orders from cart"""
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptInKeysetPagination
     
     def get_queryset(self):
         """Return orders for the authenticated user"""
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.filter(user=self.request.user).with_details()
     
     def get_serializer_class(self):
         """Use different serializer for creation"""
@@ -34,7 +42,7 @@ class OrderListCreateView(generics.ListCreateAPIView):
         
         try:
             order = serializer.save()
-            response_serializer = OrderSerializer(order)
+            response_serializer = OrderSerializer(Order.objects.with_details().get(pk=order.pk))
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
         except Exception as e:
             return Response(
@@ -50,19 +58,20 @@ class OrderDetailView(generics.RetrieveAPIView):
     
     def get_queryset(self):
         """Return orders for the authenticated user"""
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.filter(user=self.request.user).with_details()
 
 
 class UserOrderListView(generics.ListAPIView):
     """List orders for a specific user (admin only)"""
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+    pagination_class = OptInKeysetPagination
     
     def get_queryset(self):
         """Return orders for the specified user"""
         user_id = self.kwargs['user_id']
         user = get_object_or_404(User, id=user_id)
-        return Order.objects.filter(user=user)
+        return Order.objects.filter(user=user).with_details()
 
 
 class OrderStatusUpdateView(generics.UpdateAPIView):
@@ -105,6 +114,11 @@ class OrderStatusUpdateView(generics.UpdateAPIView):
                 response_serializer = OrderSerializer(order)
                 return Response(response_serializer.data)
                 
+        except StockReservationError as e:
+            return Response(
+                {'error': e.messages, 'lines': e.as_lines()}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)}, 
@@ -138,25 +152,67 @@ def cancel_order(request, order_id):
         )
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def reorder(request, order_id):
+    """
+    Copy the lines of a previous order into the user's cart in one batch.
+    Lines are priced at today's prices and reduced to the stock left; lines that
+    cannot be added at all (inactive or out of stock) are reported in ``errors``.
+    """
+    try:
+        items = list(
+            OrderItem.objects.filter(order_id=order_id, order__user=request.user)
+            .order_by('id')
+            .values('id', 'product_id', 'variant_id', 'quantity')
+        )
+        if not items:
+            get_object_or_404(Order, id=order_id, user=request.user)
+        
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        result = apply_cart_operations(cart, [
+            {'op': 'add', 'product_id': item['product_id'], 'variant_id': item['variant_id'], 'quantity': item['quantity']}
+            for item in items
+        ], clamp=True)
+        
+        def with_item(lines):
+            return [{'item': str(items[line.pop('index')]['id']), **line} for line in lines]
+        
+        return Response({
+            'cart': get_cart_snapshot(request.user)['cart'],
+            'adjusted': with_item(result.adjusted),
+            'errors': with_item(result.errors),
+        })
+    except Http404:
+        raise
+    except Exception as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def order_statistics(request):
     """Get order statistics for the authenticated user"""
-    user = request.user
-    
-    orders = Order.objects.filter(user=user)
+    statistics = UserOrderStatistics.for_user(request.user.pk)
     
     stats = {
-        'total_orders': orders.count(),
-        'pending_orders': orders.filter(status=Order.Status.PENDING).count(),
-        'confirmed_orders': orders.filter(status=Order.Status.CONFIRMED).count(),
-        'shipped_orders': orders.filter(status=Order.Status.SHIPPED).count(),
-        'delivered_orders': orders.filter(status=Order.Status.DELIVERED).count(),
-        'cancelled_orders': orders.filter(status=Order.Status.CANCELLED).count(),
-        'total_spent': sum(order.total_amount for order in orders.filter(
-            status__in=[Order.Status.CONFIRMED, Order.Status.PROCESSING, 
-                       Order.Status.SHIPPED, Order.Status.DELIVERED]
-        ))
+        'total_orders': statistics.total_orders,
+        'pending_orders': statistics.pending_orders,
+        'confirmed_orders': statistics.confirmed_orders,
+        'shipped_orders': statistics.shipped_orders,
+        'delivered_orders': statistics.delivered_orders,
+        'cancelled_orders': statistics.cancelled_orders,
+        'total_spent': statistics.total_spent,
     }
     
     return Response(stats)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, permissions.IsAdminUser])
+def export_orders_view(request):
+    """Admin export of every order with its items, streamed as NDJSON or CSV (see Order.exports)"""
+    return export_orders(request)
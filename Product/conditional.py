@@ -0,0 +1,95 @@
+"""
+Conditional GET and Cache-Control for the catalog endpoints.
+
+Validators come from one indexed query that runs before the view:
+
+- a product's detail uses its ``updated_at``, which every change to what the
+  detail nests (variants, stock, images, categories) bumps as well;
+- a variant's detail uses the ``updated_at`` of its product;
+- categories use the newest category CatalogChange and the number of them,
+  kept with the cached category tree (Product.tree);
+- lists use the newest CatalogChange of any kind.
+
+A request whose If-None-Match or If-Modified-Since matches gets a 304 without
+the resource being queried or serialized.
+"""
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .models import CatalogChange, Product, Variant
+from .tree import get_category_tree
+
+# Browsers revalidate after max_age; the CDN serves its copy for s_maxage and
+# keeps serving it for stale_while_revalidate while it revalidates.
+PRODUCT_CACHE_CONTROL = {"public": True, "max_age": 30, "s_maxage": 60, "stale_while_revalidate": 30}
+CATEGORY_CACHE_CONTROL = {"public": True, "max_age": 300, "s_maxage": 600, "stale_while_revalidate": 60}
+
+
+def _latest_change(queryset):
+    seq, changed_at = queryset.order_by("-seq").values_list("seq", "changed_at").first() or (0, None)
+    return seq, changed_at
+
+
+def catalog_version(request, **kwargs):
+    return _latest_change(CatalogChange.objects.all())
+
+
+def category_version(request, **kwargs):
+    return get_category_tree()["version"]
+
+
+def _updated_at(model, pk, field):
+    try:
+        updated_at = model.objects.filter(pk=pk).values_list(field, flat=True).first()
+    except ValidationError:
+        # Malformed pk: no validator, the view answers 404.
+        return None
+    return (updated_at.isoformat(), updated_at) if updated_at else None
+
+
+def product_version(request, pk=None, **kwargs):
+    return _updated_at(Product, pk, "updated_at")
+
+
+def variant_version(request, pk=None, **kwargs):
+    return _updated_at(Variant, pk, "product__updated_at")
+
+
+def conditional(version, prefix, cache_control):
+    """
+    Decorator for a viewset method: ETag ``"<prefix>-<token>"`` and
+    Last-Modified from ``version(request, **kwargs)`` (a ``(token, datetime)``
+    pair or None), 304 on a match, and the ``cache_control`` policy.
+    """
+    def versioned(request, kwargs):
+        # condition() asks for the ETag and Last-Modified separately; look the version up once.
+        cached = request.__dict__.setdefault("_catalog_versions", {})
+        key = (prefix, tuple(sorted(kwargs.items())))
+        if key not in cached:
+            cached[key] = version(request, **kwargs)
+        return cached[key]
+
+    def etag(request, *args, **kwargs):
+        token = versioned(request, kwargs)
+        return f"{prefix}-{token[0]}" if token else None
+
+    def last_modified(request, *args, **kwargs):
+        token = versioned(request, kwargs)
+        return token[1] if token else None
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            response = condition(etag_func=etag, last_modified_func=last_modified)(
+                lambda request, *args, **kwargs: method(self, request, *args, **kwargs)
+            )(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                patch_cache_control(response, **cache_control)
+                # The browsable API and JSON share the URL.
+                patch_vary_headers(response, ("Accept",))
+            return response
+        return wrapper
+    return decorator
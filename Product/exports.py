@@ -0,0 +1,58 @@
+"""
+Full catalog export for feeds (see Ecomerce_Application.exports).
+
+The CSV layout is one row per variant (one row for a product without
+variants) with the columns Product.importer reads, so an export can be
+imported back as is.
+"""
+from Ecomerce_Application.exports import apply_window, export_response, group_by_parent, iter_batches
+from .models import Product, ProductImage, Variant
+
+PRODUCT_FIELDS = [
+    "id", "sku", "slug", "title", "description", "price", "currency", "stock", "is_active",
+    "min_price", "max_price", "available_stock", "created_at", "updated_at",
+]
+VARIANT_FIELDS = ["id", "sku", "name", "price", "stock", "is_active"]
+CSV_COLUMNS = PRODUCT_FIELDS + ["categories", "images"] + [f"variant_{name}" for name in VARIANT_FIELDS]
+
+
+class ProductExport:
+    def __init__(self, request):
+        self.request = request
+        self.storage = ProductImage._meta.get_field("image").storage
+
+    def batches(self, queryset, field):
+        """Lists of product records, with four queries per list"""
+        for batch in iter_batches(queryset.values(*PRODUCT_FIELDS), field):
+            ids = [record["id"] for record in batch]
+            variants = group_by_parent(
+                Variant.objects.filter(product_id__in=ids).order_by("name", "id").values_list("product_id", *VARIANT_FIELDS)
+            )
+            images = group_by_parent(
+                ProductImage.objects.filter(product_id__in=ids).order_by("order", "id").values_list("product_id", "image")
+            )
+            categories = group_by_parent(
+                Product.category.through.objects.filter(product_id__in=ids)
+                .order_by("category__slug").values_list("product_id", "category__slug")
+            )
+            for record in batch:
+                pk = record["id"]
+                record["categories"] = categories.get(pk, [])
+                record["images"] = [self.request.build_absolute_uri(self.storage.url(name)) for name in images.get(pk, [])]
+                record["variants"] = [dict(zip(VARIANT_FIELDS, variant)) for variant in variants.get(pk, [])]
+            yield batch
+
+    @staticmethod
+    def csv_rows(record):
+        record = dict(record, categories="|".join(record["categories"]), images="|".join(record["images"]))
+        variants = record.pop("variants")
+        if not variants:
+            return [record]
+        return [dict(record, **{f"variant_{name}": value for name, value in variant.items()}) for variant in variants]
+
+
+def export_products(request):
+    """Stream every product, optionally within an updated_at/created_at window"""
+    queryset, field = apply_window(Product.objects.all(), request.query_params)
+    batches = ProductExport(request).batches(queryset, field)
+    return export_response(request, batches, "products", CSV_COLUMNS, ProductExport.csv_rows)
@@ -1,13 +1,107 @@
-from django_filters import FilterSet, NumberFilter, CharFilter
+import uuid
+
+from django.conf import settings
+from django.db.models import Case, Exists, IntegerField, OuterRef, Value, When
+from django_filters import BooleanFilter, FilterSet, NumberFilter, CharFilter
 from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from Ecomerce_Application.pagination import KeysetPagination
 from .models import Product
+from .search import get_search_backend
+from .tree import category_path
 
 class ProductFilter(FilterSet):
     price_min = NumberFilter(field_name='price', lookup_expr="gte")
     price_max = NumberFilter(field_name="price", lookup_expr="lte")
-    category = CharFilter(field_name="category", lookup_expr="iexact")
+    # A category id or slug; both hit a unique index (no case-insensitive match on the FK).
+    category = CharFilter(method="filter_category")
+    # Read the maintained summary columns, so no variant join is needed.
+    effective_price_min = NumberFilter(field_name="min_price", lookup_expr="gte")
+    effective_price_max = NumberFilter(field_name="min_price", lookup_expr="lte")
+    in_stock = BooleanFilter(method="filter_in_stock")
+    # A category id or slug, including all of its subcategories.
+    category_tree = CharFilter(method="filter_category_tree")
 
     class Meta:
         model = Product
-        fields = ["price_min", "price_max", "category", "is_active"]
+        fields = [
+            "price_min", "price_max", "category", "is_active", "effective_price_min", "effective_price_max", "in_stock",
+            "category_tree",
+        ]
+
+    def filter_category(self, queryset, name, value):
+        try:
+            return queryset.filter(category__id=uuid.UUID(value))
+        except ValueError:
+            return queryset.filter(category__slug=value)
+
+    def filter_category_tree(self, queryset, name, value):
+        try:
+            value = str(uuid.UUID(value))
+        except ValueError:
+            pass
+        path = category_path(value)
+        if path is None:
+            return queryset.none()
+        in_subtree = Product.category.through.objects.filter(product_id=OuterRef("pk"), category__path__startswith=path)
+        return queryset.filter(Exists(in_subtree))
+
+    def filter_in_stock(self, queryset, name, value):
+        if value:
+            return queryset.filter(available_stock__gt=0)
+        return queryset.filter(available_stock=0)
+
+
+class ProductSearchFilter(filters.BaseFilterBackend):
+    """
+    Full-text product search through the configured search backend.
+    ``?search=`` (or the older ``?title=``) restricts the queryset to matching
+    products; without an explicit ``?ordering=`` results come back by relevance.
+    Must run after OrderingFilter so the relevance order is not overridden.
+    Only the PRODUCT_SEARCH_MAX_RESULTS most relevant matches are kept; when
+    there were more, ``request.search_truncated`` is set for the view to report.
+    Relevance is not a column, so a relevance-ordered search with a ``cursor``
+    is a 400 asking for an ``?ordering=`` or page numbers instead.
+    """
+    search_param = "search"
+    legacy_search_param = "title"
+
+    def get_search_terms(self, request):
+        return (
+            request.query_params.get(self.search_param)
+            or request.query_params.get(self.legacy_search_param)
+            or ""
+        ).strip()
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_terms(request)
+        if not query:
+            return queryset
+        ordering_param = getattr(filters.OrderingFilter, "ordering_param", "ordering")
+        by_relevance = not request.query_params.get(ordering_param)
+        if by_relevance and KeysetPagination.cursor_query_param in request.query_params:
+            raise ValidationError({
+                KeysetPagination.cursor_query_param: "Search results ordered by relevance cannot be paged with a "
+                "cursor. Add an ordering (e.g. ?ordering=-created_at) or use ?page= instead.",
+            })
+        limit = getattr(settings, "PRODUCT_SEARCH_MAX_RESULTS", 1000)
+        product_ids = get_search_backend().search(query, limit + 1)
+        request.search_truncated = len(product_ids) > limit
+        product_ids = product_ids[:limit]
+        queryset = queryset.filter(pk__in=product_ids)
+        if product_ids and by_relevance:
+            rank = Case(
+                *[When(pk=pk, then=Value(position)) for position, pk in enumerate(product_ids)],
+                output_field=IntegerField(),
+            )
+            queryset = queryset.alias(search_rank=rank).order_by("search_rank")
+        return queryset
 
+    def get_schema_operation_parameters(self, view):
+        return [{
+            "name": self.search_param,
+            "required": False,
+            "in": "query",
+            "description": "Full-text search over title, sku, description, categories and variants.",
+            "schema": {"type": "string"},
+        }]
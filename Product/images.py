@@ -0,0 +1,165 @@
+"""
+Product image derivatives.
+
+Every uploaded ProductImage gets resized copies (DERIVATIVES, never upscaled)
+in the fallback format of the original (JPEG, or PNG when it has
+transparency) and in WebP and AVIF when this Pillow build can write them.
+They are stored under the name of the original (Product.storage), so images
+sharing an original share their derivatives, and are recorded in
+``ProductImage.derivatives``::
+
+    {"card": {"width": 480, "height": 320, "jpeg": "products/...", "webp": "products/..."}, ...}
+
+Rendering runs after the upload's transaction commits, on a thread pool of
+IMAGE_DERIVATIVE_WORKERS threads per process (Pillow releases the GIL while
+decoding, resizing and encoding); 0 renders inline. Queued renders live only
+in the process's memory and are lost if it exits first; the
+generate_image_derivatives command picks them up.
+"""
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .storage import derivative_files, release
+
+logger = logging.getLogger(__name__)
+
+# Largest first: each size is resized from the previous one.
+DERIVATIVES = {"zoom": (1600, 1600), "card": (480, 480), "thumbnail": (160, 160)}
+MODERN_FORMATS = tuple(fmt for fmt in ("webp", "avif") if features.check(fmt))
+SAVE_OPTIONS = {
+    "jpeg": {"quality": 82, "optimize": True, "progressive": True},
+    "png": {"optimize": True},
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 60, "speed": 8},
+}
+EXTENSIONS = {"jpeg": "jpg", "png": "png", "webp": "webp", "avif": "avif"}
+
+_executor = None
+
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def render_derivatives(data):
+    """
+    Encode every derivative of the image in ``data``:
+    ``{name: {"width": w, "height": h, "files": {format: bytes}}}``
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        # Let the JPEG decoder scale down by up to 8x while decoding.
+        largest = max(DERIVATIVES.values())
+        original.draft("RGB", largest)
+        alpha = _has_alpha(original)
+        image = ImageOps.exif_transpose(original).convert("RGBA" if alpha else "RGB")
+    formats = ("png" if alpha else "jpeg",) + MODERN_FORMATS
+
+    rendered = {}
+    for name, size in DERIVATIVES.items():
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        files = {}
+        for fmt in formats:
+            buffer = io.BytesIO()
+            image.save(buffer, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+            files[fmt] = buffer.getvalue()
+        rendered[name] = {"width": image.width, "height": image.height, "files": files}
+    return rendered
+
+
+def _label(name, fmt):
+    """``<size>-<settings hash>``: new sizes or encoder settings get new, uncached URLs"""
+    settings_hash = hashlib.sha256(repr((DERIVATIVES[name], SAVE_OPTIONS[fmt])).encode()).hexdigest()[:8]
+    return f"{name}-{settings_hash}"
+
+
+def _shared_derivatives(image):
+    """Derivatives of another image with the same (content-addressed) original, if complete"""
+    from .models import ProductImage
+
+    shared = (
+        ProductImage.objects.filter(image=image.image.name).exclude(pk=image.pk).exclude(derivatives={})
+        .values_list("derivatives", flat=True).first()
+    )
+    return shared if shared and set(shared) == set(DERIVATIVES) else None
+
+
+def generate_derivatives(image_id, reuse=True):
+    """
+    Render and store the derivatives of ProductImage ``image_id``, replacing
+    any it had. With ``reuse``, an image sharing its original with another
+    image takes that image's derivatives instead of rendering them again.
+    """
+    from .models import CatalogChange, Product, ProductImage
+
+    image = ProductImage.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return None
+    storage = image.image.storage
+    derivatives = _shared_derivatives(image) if reuse else None
+    if derivatives is None:
+        try:
+            with storage.open(image.image.name, "rb") as original:
+                rendered = render_derivatives(original.read())
+        except (OSError, Image.DecompressionBombError) as exc:
+            logger.warning("Cannot render derivatives of %s: %s", image.image.name, exc)
+            return None
+
+        derivatives = {}
+        for name, result in rendered.items():
+            derivatives[name] = {"width": result["width"], "height": result["height"]}
+            for fmt, content in result["files"].items():
+                derivatives[name][fmt] = storage.save_derived(
+                    image.image.name, _label(name, fmt), EXTENSIONS[fmt], ContentFile(content),
+                )
+
+    with transaction.atomic():
+        # Only if the row still holds the same upload; a replaced image schedules its own run.
+        updated = ProductImage.objects.filter(pk=image_id, image=image.image.name).update(derivatives=derivatives)
+        if updated:
+            Product.objects.filter(pk=image.product_id).update(updated_at=timezone.now())
+            CatalogChange.log(CatalogChange.Entity.PRODUCT, CatalogChange.Action.UPDATED, image.product_id, fields=["images"])
+    # Shared files stay while another image holds the same original.
+    new_files = set(derivative_files(derivatives))
+    if updated:
+        release(image.image.name, [name for name in derivative_files(image.derivatives) if name not in new_files], image_id)
+    else:
+        release(image.image.name, list(new_files), image_id)
+    return derivatives if updated else None
+
+
+def _run_in_worker(image_id):
+    try:
+        generate_derivatives(image_id)
+    except Exception:
+        logger.exception("Rendering derivatives of image %s failed", image_id)
+    finally:
+        # Worker threads open their own connection.
+        connection.close()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_DERIVATIVE_WORKERS, thread_name_prefix="image-derivatives",
+        )
+    return _executor
+
+
+def schedule_derivatives(image_id):
+    """Render the derivatives of ``image_id`` once the current transaction commits"""
+    def submit():
+        if getattr(settings, "IMAGE_DERIVATIVE_WORKERS", 0) > 0:
+            _get_executor().submit(_run_in_worker, image_id)
+        else:
+            generate_derivatives(image_id)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,367 @@
+"""
+Bulk catalog import from CSV or JSON Lines.
+
+Rows are read lazily from the file and handled CHUNK_SIZE at a time, so
+memory stays flat whatever the file size. Each chunk is validated row by row,
+then written in one transaction: categories and new products are inserted
+skipping conflicts and re-read, existing products are updated in bulk,
+variants by sku are upserted with ``bulk_create(update_conflicts=True)``, and
+category links are replaced through the M2M through table in bulk. An
+existing product or variant only gets the fields its row gives; the model
+defaults apply to new ones.
+
+Bulk writes skip model signals, so the side effects they would trigger are
+applied explicitly per chunk: CatalogChange entries, search indexing, the
+product summary columns, cart snapshots and the category tree cache.
+
+A row describes one product (``sku`` plus ``title`` and ``price``) and
+optionally its categories and variants. A row with only ``sku`` and variants
+adds or updates variants of an existing product. In CSV, ``categories`` is
+``|``-separated and a single variant can be given in ``variant_sku``,
+``variant_name``, ``variant_price``, ``variant_stock`` and
+``variant_is_active`` columns.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from rest_framework import serializers
+
+from .models import CatalogChange, Category, Product, Variant
+from .search import index_products
+from .slugs import SLUG_ATTEMPTS, assign_slugs, slug_base
+from .tree import invalidate_category_tree
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ("csv", "jsonl")
+CSV_VARIANT_PREFIX = "variant_"
+PRODUCT_FIELDS = ["title", "description", "price", "currency", "stock", "is_active"]
+# Always written; the other fields of an existing variant only when the row gives them.
+VARIANT_UPDATE_FIELDS = ["product", "name"]
+
+
+class VariantImportSerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=120)
+    name = serializers.CharField(max_length=100)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False, allow_null=True)
+    stock = serializers.IntegerField(min_value=0, required=False)
+    is_active = serializers.BooleanField(required=False)
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=120)
+    title = serializers.CharField(max_length=255, required=False)
+    description = serializers.CharField(allow_blank=True, required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    currency = serializers.CharField(max_length=20, required=False)
+    stock = serializers.IntegerField(min_value=0, required=False)
+    is_active = serializers.BooleanField(required=False)
+    categories = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    variants = VariantImportSerializer(many=True, required=False)
+
+    def validate(self, attrs):
+        if ("title" in attrs) != ("price" in attrs):
+            raise serializers.ValidationError("title and price are required together.")
+        if "title" not in attrs and "categories" in attrs:
+            raise serializers.ValidationError("categories can only be given with the product's title and price.")
+        return attrs
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    products_created: int = 0
+    products_updated: int = 0
+    variants: int = 0
+    categories_created: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)  # [{"line": n, "errors": {...}}], capped at MAX_REPORTED_ERRORS
+
+    def add_error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "products_created": self.products_created,
+            "products_updated": self.products_updated,
+            "variants": self.variants,
+            "categories_created": self.categories_created,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def _text_stream(source):
+    """A text stream over a path, a binary file (e.g. an upload) or a text file"""
+    if isinstance(source, str):
+        return open(source, encoding="utf-8", newline="")
+    if isinstance(source, io.TextIOBase):
+        return source
+    return io.TextIOWrapper(source, encoding="utf-8", newline="")
+
+
+def _csv_rows(stream):
+    for row in csv.DictReader(stream):
+        data = {key: value.strip() for key, value in row.items() if key and value and value.strip()}
+        if "categories" in data:
+            data["categories"] = [name.strip() for name in data["categories"].split("|") if name.strip()]
+        variant = {key[len(CSV_VARIANT_PREFIX):]: data.pop(key) for key in list(data) if key.startswith(CSV_VARIANT_PREFIX)}
+        if variant:
+            data["variants"] = [variant]
+        yield data
+
+
+def _jsonl_rows(stream):
+    for line in stream:
+        line = line.strip()
+        if not line:
+            yield None  # keeps line numbers aligned
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield ValueError(f"Invalid JSON: {exc}")
+
+
+def read_rows(source, file_format):
+    """Yield ``(line number, row dict or exception)`` from a CSV or JSONL source"""
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported format {file_format!r}; use one of {', '.join(FORMATS)}.")
+    stream = _text_stream(source)
+    try:
+        if file_format == "csv":
+            # Line 1 is the header.
+            yield from enumerate(_csv_rows(stream), start=2)
+        else:
+            for line, row in enumerate(_jsonl_rows(stream), start=1):
+                if row is not None:
+                    yield line, row
+    finally:
+        if isinstance(source, str):
+            stream.close()
+
+
+def _upsert_kwargs(unique_fields, update_fields):
+    kwargs = {"update_conflicts": True, "update_fields": update_fields}
+    if connection.features.supports_update_conflicts_with_target:
+        kwargs["unique_fields"] = unique_fields
+    return kwargs
+
+
+def _category_slug(name):
+    """The slug Category.save() gives a new category named ``name``, or "" if it has none of its own"""
+    return slug_base(Category, name) if slugify(name) else ""
+
+
+def _upsert_categories(names, report, changes):
+    """Category ids by slug for ``names``, creating the missing categories (logged to ``changes``)"""
+    wanted = {_category_slug(name): name for name in names}
+    wanted.pop("", None)
+    existing = dict(Category.objects.filter(slug__in=wanted).values_list("slug", "pk"))
+    missing = [Category(name=wanted[slug][:100], slug=slug) for slug in wanted if slug not in existing]
+    if missing:
+        for category in missing:
+            category.compute_path()
+        Category.objects.bulk_create(missing, ignore_conflicts=True)
+        existing = dict(Category.objects.filter(slug__in=wanted).values_list("slug", "pk"))
+        # A slug a concurrent writer inserted first was skipped and kept its own id.
+        created = [category for category in missing if existing.get(category.slug) == category.pk]
+        report.categories_created += len(created)
+        changes.extend(
+            CatalogChange.entry(CatalogChange.Entity.CATEGORY, CatalogChange.Action.CREATED, category.pk)
+            for category in created
+        )
+    return existing
+
+
+def _insert_products(products):
+    """
+    Insert new ``products`` and return ``(inserted, raced, failed)``.
+
+    Conflicts are skipped, not upserted: MySQL's ON DUPLICATE KEY UPDATE fires
+    on any unique key, so a slug a concurrent writer took would update that
+    writer's product. A product whose slug was taken is retried with a new
+    slug. One whose sku was inserted concurrently is in ``raced`` as
+    ``{sku: (pk, slug)}`` of the stored row, for the caller to update.
+    """
+    inserted, raced = [], {}
+    for _ in range(SLUG_ATTEMPTS):
+        assign_slugs(products, lambda product: product.title)
+        Product.objects.bulk_create(products, ignore_conflicts=True)
+        stored = {
+            sku: (pk, slug)
+            for sku, pk, slug in Product.objects.filter(sku__in=[product.sku for product in products]).values_list("sku", "pk", "slug")
+        }
+        retry = []
+        for product in products:
+            row = stored.get(product.sku)
+            if row is None:
+                product.slug = ""
+                retry.append(product)
+            elif row[0] == product.pk:
+                inserted.append(product)
+            else:
+                raced[product.sku] = row
+        products = retry
+        if not products:
+            break
+    return inserted, raced, products
+
+
+def import_chunk(rows, report):
+    """Validate and write one chunk of ``(line, row)`` pairs; returns the ids of the products touched"""
+    valid = {}
+    for line, row in rows:
+        report.rows += 1
+        if isinstance(row, Exception):
+            report.add_error(line, {"non_field_errors": [str(row)]})
+            continue
+        serializer = ProductImportRowSerializer(data=row)
+        if not serializer.is_valid():
+            report.add_error(line, serializer.errors)
+            continue
+        # A sku repeated within the chunk (e.g. one CSV row per variant): the last
+        # row with product fields wins and the variants of all rows are kept.
+        data = dict(serializer.validated_data)
+        previous = valid.get(data["sku"])
+        if previous is not None:
+            variants = previous[1].get("variants", []) + data.get("variants", [])
+            if "title" not in data:
+                data = dict(previous[1])
+            data["variants"] = variants
+        valid[data["sku"]] = (line, data)
+    if not valid:
+        return []
+
+    with transaction.atomic():
+        existing = {sku: (pk, slug) for sku, pk, slug in Product.objects.filter(sku__in=valid).values_list("sku", "pk", "slug")}
+        unknown = [sku for sku, (_, data) in valid.items() if sku not in existing and "title" not in data]
+        for sku in unknown:
+            line, _ = valid.pop(sku)
+            report.add_error(line, {"sku": [f"Unknown product {sku}; new products need a title and price."]})
+
+        now = timezone.now()
+        products, new_products, updates = [], [], {}
+        for sku, (_, data) in valid.items():
+            if "title" not in data:
+                continue
+            # Fields the row leaves out take the model defaults when created and are kept when updated.
+            fields = {name: data[name] for name in PRODUCT_FIELDS if name in data}
+            product = Product(sku=sku, created_at=now, updated_at=now, **fields)
+            if sku in existing:
+                product.pk, product.slug = existing[sku]
+                updates.setdefault(tuple(fields), []).append(product)
+            else:
+                new_products.append(product)
+            products.append(product)
+        created = 0
+        if new_products:
+            inserted, raced, failed = _insert_products(new_products)
+            for product in failed:
+                line, _ = valid.pop(product.sku)
+                report.add_error(line, {"slug": ["Could not allocate a unique slug; try again."]})
+                products.remove(product)
+            for product in new_products:
+                if product.sku in raced:
+                    # Inserted by a concurrent writer since the chunk started: update it instead.
+                    product.pk, product.slug = existing[product.sku] = raced[product.sku]
+                    fields = tuple(name for name in PRODUCT_FIELDS if name in valid[product.sku][1])
+                    updates.setdefault(fields, []).append(product)
+            created = len(inserted)
+        for fields, group in updates.items():
+            Product.objects.bulk_update(group, [*fields, "updated_at"])
+        report.products_created += created
+        report.products_updated += len(products) - created
+        product_ids = {product.sku: product.pk for product in products}
+        changes = [
+            CatalogChange.entry(
+                CatalogChange.Entity.PRODUCT,
+                CatalogChange.Action.UPDATED if product.sku in existing else CatalogChange.Action.CREATED,
+                product.pk,
+            )
+            for product in products
+        ]
+        product_ids.update((sku, existing[sku][0]) for sku in valid if sku in existing and sku not in product_ids)
+
+        variants, variant_fields, moved_from = {}, {}, set()
+        for sku, (_, data) in valid.items():
+            for variant in data.get("variants", []):
+                variants[variant["sku"]] = Variant(product_id=product_ids[sku], **variant)
+                variant_fields[variant["sku"]] = tuple(name for name in ("price", "stock", "is_active") if name in variant)
+        if variants:
+            existing_variants = {
+                sku: (pk, product_id)
+                for sku, pk, product_id in Variant.objects.filter(sku__in=variants).values_list("sku", "pk", "product_id")
+            }
+            for sku, variant in variants.items():
+                if sku in existing_variants:
+                    variant.pk, previous_product_id = existing_variants[sku]
+                    if previous_product_id != variant.product_id:
+                        # Moved to another product: the one it left needs its summaries, index and carts refreshed.
+                        moved_from.add(previous_product_id)
+                changes.append(CatalogChange.entry(
+                    CatalogChange.Entity.VARIANT,
+                    CatalogChange.Action.UPDATED if sku in existing_variants else CatalogChange.Action.CREATED,
+                    variant.pk, variant.product_id,
+                ))
+            groups = {}
+            for sku, variant in variants.items():
+                groups.setdefault(variant_fields[sku], []).append(variant)
+            for fields, group in groups.items():
+                Variant.objects.bulk_create(group, **_upsert_kwargs(["sku"], VARIANT_UPDATE_FIELDS + list(fields)))
+            report.variants += len(variants)
+
+        categorized = {sku: data["categories"] for sku, (_, data) in valid.items() if "categories" in data}
+        if categorized:
+            category_ids = _upsert_categories({name for names in categorized.values() for name in names}, report, changes)
+            Through = Product.category.through
+            Through.objects.filter(product_id__in=[product_ids[sku] for sku in categorized]).delete()
+            Through.objects.bulk_create([
+                Through(product_id=product_ids[sku], category_id=category_ids[slug])
+                for sku, names in categorized.items()
+                for slug in {_category_slug(name) for name in names} if slug in category_ids
+            ], ignore_conflicts=True)
+
+        touched = list(set(product_ids.values()) | moved_from)
+        Product.objects.filter(pk__in=touched).refresh_summaries()
+        index_products(touched)
+        # Last in the transaction and stamped now, so CATALOG_CHANGES_SETTLE_SECONDS only
+        # has to cover the commit, not the whole chunk.
+        logged_at = timezone.now()
+        for change in changes:
+            change.changed_at = logged_at
+        CatalogChange.objects.bulk_create(changes)
+        if any(change.entity == CatalogChange.Entity.CATEGORY for change in changes):
+            # After the entries: the rebuilt tree carries the category version. Also dropped on commit.
+            invalidate_category_tree()
+    return touched
+
+
+def import_catalog(source, file_format, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Import a CSV or JSONL catalog file (a path or a file object) and return an
+    ImportReport. ``progress(report)`` is called after every chunk.
+    """
+    from Cart.cache import invalidate_carts_for_products
+
+    report = ImportReport()
+    rows = read_rows(source, file_format)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        touched = import_chunk(chunk, report)
+        if touched:
+            invalidate_carts_for_products(touched)
+        if progress is not None:
+            progress(report)
+    return report
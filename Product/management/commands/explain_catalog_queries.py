@@ -0,0 +1,110 @@
+import re
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django_filters import BooleanFilter, NumberFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from Product.models import Category, Product, Variant
+from Product.views import ProductViewSet
+
+CATALOG_TABLES = {Product._meta.db_table, Variant._meta.db_table, Category._meta.db_table}
+
+
+def full_scans(plan):
+    """Tables of ``plan`` (as returned by QuerySet.explain()) read without an index"""
+    if connection.vendor == "mysql":
+        return [table for table, access in re.findall(r'"table_name": "(\w+)",\s*"access_type": "(\w+)"', plan) if access == "ALL"]
+    if connection.vendor == "postgresql":
+        return re.findall(r"Seq Scan on (\w+)", plan)
+    # SQLite: "SCAN <table>" walks the table itself, "SCAN <table> USING INDEX" walks an index in order.
+    return [match.group(1) for match in re.finditer(r"\bSCAN (\w+)(?! USING)", plan)]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the catalog list query for every ProductFilter filter combined with every "
+        "ordering, and fail if any of them reads a catalog table without an index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed", type=int, default=2000,
+            help="Products to create (in a transaction that is rolled back) so the planner sees realistic tables; 0 uses the data as is.",
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"])
+            failures = self.explain_all()
+            transaction.set_rollback(True)
+        if failures:
+            for params, tables in failures:
+                self.stderr.write(f"full scan of {', '.join(sorted(set(tables)))}: ?{params}")
+            raise CommandError(f"{len(failures)} catalog queries do a full table scan.")
+        self.stdout.write(self.style.SUCCESS("Every catalog query is index-backed."))
+
+    def seed(self, count):
+        categories = [Category(name=f"Explain {n}", slug=f"explain-{n}") for n in range(20)]
+        for category in categories:
+            category.compute_path()
+        Category.objects.bulk_create(categories)
+        products = Product.objects.bulk_create([
+            Product(
+                title=f"Explain product {n}", slug=f"explain-product-{n}", sku=f"EXPLAIN-{n}",
+                price=Decimal(5 + n % 200), stock=n % 7, is_active=n % 10 != 0,
+            )
+            for n in range(count)
+        ], batch_size=500)
+        Product.category.through.objects.bulk_create([
+            Product.category.through(product_id=product.pk, category_id=categories[n % len(categories)].pk)
+            for n, product in enumerate(products)
+        ], batch_size=500)
+        Variant.objects.bulk_create([
+            Variant(product=product, name=f"Size {size}", sku=f"{product.sku}-{size}", stock=size)
+            for product in products[::3] for size in range(3)
+        ], batch_size=500)
+        Product.objects.refresh_summaries()
+        if connection.vendor in ("sqlite", "postgresql"):
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+    def filter_combinations(self):
+        category = Category.objects.values_list("slug", flat=True).first() or "missing"
+        combinations = [{}]
+        for name, filter_ in ProductViewSet.filterset_class.base_filters.items():
+            if isinstance(filter_, BooleanFilter):
+                combinations.append({name: "true"})
+            elif isinstance(filter_, NumberFilter):
+                combinations.append({name: "50"})
+            elif name in ("category", "category_tree"):
+                combinations.append({name: category})
+        combinations += [{"is_active": "true", **params} for params in combinations if "is_active" not in params]
+        return combinations
+
+    def orderings(self):
+        fields = ProductViewSet.ordering_fields
+        return [None] + [f"{prefix}{field}" for field in fields for prefix in ("", "-")]
+
+    def explain_all(self):
+        factory = APIRequestFactory()
+        explain_options = {"format": "json"} if connection.vendor == "mysql" else {}
+        failures = []
+        for params in self.filter_combinations():
+            for ordering in self.orderings():
+                query = dict(params, **({"ordering": ordering} if ordering else {}))
+                view = ProductViewSet(action="list", format_kwarg=None, kwargs={})
+                view.request = Request(factory.get("/api/products/", query))
+                queryset = view.filter_queryset(view.get_queryset())[:view.paginator.page_size]
+                plan = queryset.explain(**explain_options)
+                tables = [table for table in full_scans(plan) if table in CATALOG_TABLES]
+                label = "&".join(f"{key}={value}" for key, value in query.items())
+                if tables:
+                    failures.append((label, tables))
+                if self.verbosity > 1:
+                    self.stdout.write(f"?{label}\n{plan}\n")
+        return failures
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from Product.images import generate_derivatives
+from Product.models import ProductImage
+
+
+def _generate(image_id):
+    try:
+        return generate_derivatives(image_id)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the resized WebP/AVIF/JPEG derivatives of product images, e.g. after "
+        "changing Product.images.DERIVATIVES or for images uploaded before they existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--missing-only", action="store_true", help="Only images without derivatives.")
+        parser.add_argument("--workers", type=int, default=None, help="Threads (default IMAGE_DERIVATIVE_WORKERS).")
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.exclude(image="")
+        if options["missing_only"]:
+            images = images.filter(derivatives={})
+        image_ids = list(images.order_by("pk").values_list("pk", flat=True))
+        workers = options["workers"] if options["workers"] is not None else settings.IMAGE_DERIVATIVE_WORKERS
+
+        if workers > 0:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_generate, image_ids))
+        else:
+            results = [generate_derivatives(image_id) for image_id in image_ids]
+        rendered = sum(result is not None for result in results)
+        self.stdout.write(self.style.SUCCESS(f"Rendered derivatives of {rendered} of {len(image_ids)} images."))
@@ -0,0 +1,34 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Product.importer import CHUNK_SIZE, FORMATS, import_catalog
+
+
+class Command(BaseCommand):
+    help = "Import products, variants and categories from a CSV or JSON Lines file, upserting by sku."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or os.path.splitext(path)[1].lstrip(".").lower()
+        if file_format not in FORMATS:
+            raise CommandError(f"Cannot tell the format of {path}; pass --format ({', '.join(FORMATS)}).")
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist.")
+
+        def progress(report):
+            self.stdout.write(f"{report.rows} rows read, {report.error_count} errors")
+
+        report = import_catalog(path, file_format, chunk_size=options["chunk_size"], progress=progress)
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.rows - report.error_count} of {report.rows} rows: "
+            f"{report.products_created} products created, {report.products_updated} updated, "
+            f"{report.variants} variants, {report.categories_created} new categories."
+        ))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from Product.models import CatalogChange
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete CatalogChange entries older than --days. Consumers that fall further "
+        "behind resync with the product export and continue from the newest seq."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        deleted, _ = CatalogChange.objects.filter(changed_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} catalog changes."))
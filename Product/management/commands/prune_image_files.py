@@ -0,0 +1,44 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from Product.models import ProductImage
+from Product.storage import CONTENT_ADDRESSED, REUSE_GRACE, REUSED_DIR, derivative_files, product_image_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete content-addressed product image files no ProductImage references, e.g. left "
+        "behind when an upload reusing a file was released within its grace period."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-age-hours", type=int, default=24, help="Keep files newer than this.")
+
+    def handle(self, *args, **options):
+        referenced = set()
+        for image, derivatives in ProductImage.objects.values_list("image", "derivatives").iterator():
+            referenced.add(image)
+            referenced.update(derivative_files(derivatives))
+        cutoff = timezone.now() - timedelta(hours=options["min_age_hours"])
+        markers_cutoff = timezone.now() - timedelta(seconds=REUSE_GRACE)
+
+        deleted = 0
+        root = product_image_storage.location
+        for directory, _, files in os.walk(root):
+            for file_name in files:
+                name = os.path.relpath(os.path.join(directory, file_name), root).replace(os.sep, "/")
+                if name.startswith(f"{REUSED_DIR}/"):
+                    # Reuse markers only matter during their grace period.
+                    if product_image_storage.get_modified_time(name) < markers_cutoff:
+                        product_image_storage.delete(name)
+                    continue
+                if (
+                    CONTENT_ADDRESSED.fullmatch(name) and name not in referenced
+                    and product_image_storage.get_modified_time(name) < cutoff
+                ):
+                    product_image_storage.delete(name)
+                    deleted += 1
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} unreferenced image files."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from Product.models import Product
+from Product.search import index_products
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product search documents (and the search backend index) in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        batch, total = [], 0
+        for product_id in Product.objects.values_list("pk", flat=True).iterator(chunk_size=batch_size):
+            batch.append(product_id)
+            if len(batch) >= batch_size:
+                total += len(index_products(batch))
+                batch = []
+        total += len(index_products(batch))
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} products."))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def add_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    table = schema_editor.quote_name("Product_productsearchdocument")
+    schema_editor.execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX product_search_title_ft (title)")
+    schema_editor.execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX product_search_body_ft (body)")
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    table = schema_editor.quote_name("Product_productsearchdocument")
+    schema_editor.execute(f"ALTER TABLE {table} DROP INDEX product_search_title_ft, DROP INDEX product_search_body_ft")
+
+
+def build_documents(apps, schema_editor):
+    Product = apps.get_model("Product", "Product")
+    ProductSearchDocument = apps.get_model("Product", "ProductSearchDocument")
+    batch = []
+    for product in Product.objects.prefetch_related("category", "variants").iterator(chunk_size=1000):
+        body = [product.sku, product.description]
+        body.extend(category.name for category in product.category.all())
+        body.extend(variant.name for variant in product.variants.all())
+        body.extend(variant.sku for variant in product.variants.all())
+        batch.append(ProductSearchDocument(product_id=product.pk, title=product.title, body="\n".join(filter(None, body))))
+        if len(batch) >= 1000:
+            ProductSearchDocument.objects.bulk_create(batch)
+            batch = []
+    ProductSearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Product', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='Product.product')),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(add_fulltext_indexes, drop_fulltext_indexes),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:36
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_summaries(apps, schema_editor):
+    """Same UPDATE as ProductQuerySet.refresh_summaries(), over every product."""
+    Product = apps.get_model('Product', 'Product')
+    Variant = apps.get_model('Product', 'Variant')
+    active_variants = Variant.objects.filter(product=OuterRef('pk'), is_active=True).order_by().values('product')
+    effective_price = Coalesce('price', OuterRef('price'))
+
+    def per_product(aggregate):
+        return Subquery(active_variants.annotate(value=aggregate).values('value')[:1])
+
+    Product.objects.update(
+        min_price=Coalesce(per_product(Min(effective_price)), F('price')),
+        max_price=Coalesce(per_product(Max(effective_price)), F('price')),
+        available_stock=Coalesce(per_product(Sum('stock')), F('stock')),
+        active_variant_count=Coalesce(per_product(Count('pk')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Product', '0002_productsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='active_variant_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='available_stock',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='max_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='min_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'min_price'], name='product_active_min_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'available_stock'], name='product_active_stock_idx'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:41
+
+from django.db import migrations, models
+
+
+def build_paths(apps, schema_editor):
+    Category = apps.get_model('Product', 'Category')
+    parents = dict(Category.objects.values_list('pk', 'parent_id'))
+    paths = {}
+
+    def path_of(pk, seen=()):
+        if pk not in paths:
+            parent_id = parents[pk]
+            # A pre-existing cycle is broken by treating the category as a root.
+            parent_path = path_of(parent_id, seen + (pk,)) if parent_id and parent_id not in seen else '/'
+            paths[pk] = f'{parent_path}{pk.hex}/'
+        return paths[pk]
+
+    categories = list(Category.objects.only('pk'))
+    for category in categories:
+        category.path = path_of(category.pk)
+        category.depth = category.path.count('/') - 2
+    Category.objects.bulk_update(categories, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Product', '0004_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=700),
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
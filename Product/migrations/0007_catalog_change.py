@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:04
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Product', '0006_product_updated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('product', 'Product'), ('variant', 'Variant'), ('category', 'Category')], max_length=10)),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted'), ('stock', 'Stock changed')], max_length=10)),
+                ('object_id', models.UUIDField()),
+                ('product_id', models.UUIDField(blank=True, null=True)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('changed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Product', '0007_catalog_change'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='catalogchange',
+            index=models.Index(fields=['entity', 'seq'], name='catalog_change_entity_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:22
+
+import Product.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Product', '0009_productimage_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(db_index=True, storage=Product.storage.ContentAddressedStorage(), upload_to='products/'),
+        ),
+    ]
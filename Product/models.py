@@ -1,6 +1,39 @@
 from django.db import models
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F, Min, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Length, Now, Replace, StrIndex, Substr
 import uuid
-from django.utils.text import slugify
+from datetime import timedelta
+
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .slugs import save_with_unique_slug
+from .storage import product_image_storage
+
+
+class CategoryQuerySet(models.QuerySet):
+    def subtree(self, path):
+        """Categories at or below the category whose path is ``path``"""
+        return self.filter(path__startswith=path)
+
+    def rebase(self, old_prefix, new_prefix):
+        """Replace ``old_prefix`` at the start of every path with ``new_prefix``"""
+        return self.update(
+            path=Concat(Value(new_prefix), Substr("path", len(old_prefix) + 1)),
+            depth=F("depth") + (new_prefix.count("/") - old_prefix.count("/")),
+        )
+
+    def detach(self, pk):
+        """Cut the ancestors up to and including category ``pk`` from every path (after it was deleted)"""
+        marker = f"/{pk.hex}/"
+        path = Substr("path", StrIndex("path", Value(marker)) + len(marker) - 1)
+        return self.filter(path__contains=marker).update(
+            path=path, depth=Length(path) - Length(Replace(path, Value("/"), Value(""))) - 2,
+        )
 
 
 # Category db model
@@ -16,24 +49,79 @@ class Category(models.Model):
     slug = models.SlugField(unique=True, blank=True)
     parent = models.ForeignKey("self", blank=True, null=True, on_delete=models.SET_NULL, related_name='children')
     description = models.TextField(blank=True)
+    # Materialized path: the ids of the ancestors and of the category itself,
+    # e.g. "/<root id>/<child id>/". A subtree is every path starting with this one.
+    path = models.CharField(max_length=700, db_index=True, editable=False, default="")
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = CategoryQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = "categories"
 
+    def compute_path(self):
+        """Set path and depth from the parent; raises ValidationError on a cycle"""
+        parent_path = ""
+        if self.parent_id:
+            parent_path = Category.objects.values_list("path", flat=True).get(pk=self.parent_id)
+        path = f"{parent_path or '/'}{self.pk.hex}/"
+        if self.path and parent_path.startswith(self.path):
+            raise ValidationError("A category cannot be moved below itself.")
+        self.path, self.depth = path, path.count("/") - 2
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base = slugify(self.name)[:200]
-            slug = base
-            idx = 1
-            while Category.objects.filter(slug=slug).exists():
-                slug = f"{base}-{idx}"
-                idx += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        old_path = self.path
+        self.compute_path()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "path", "depth"}
+        with transaction.atomic():
+            if self.slug:
+                super().save(*args, **kwargs)
+            else:
+                save_with_unique_slug(self, self.name, lambda: super(Category, self).save(*args, **kwargs))
+            if old_path and old_path != self.path:
+                # Moved: rebase the whole subtree with one UPDATE.
+                Category.objects.exclude(pk=self.pk).subtree(old_path).rebase(old_path, self.path)
 
     def __str__(self):
         return self.name
 
+class ProductQuerySet(models.QuerySet):
+    def with_listing_summary(self):
+        """
+        Annotate primary_image for the compact catalog listing; prices and
+        stock are read from the maintained summary columns.
+        """
+        primary_image = ProductImage.objects.filter(product=OuterRef("pk")).order_by("order", "id")
+        return self.annotate(
+            primary_image=Subquery(primary_image.values("image")[:1]),
+            primary_image_derivatives=Subquery(primary_image.values("derivatives")[:1], output_field=models.JSONField()),
+        )
+
+    def refresh_summaries(self):
+        """
+        Recompute min_price, max_price, available_stock and active_variant_count
+        from the active variants with a single UPDATE. Variant prices fall back
+        to the product price; products without active variants use their own
+        price and stock. updated_at is bumped too, so it covers variant and
+        stock changes (it drives the product ETag and the export windows).
+        """
+        active_variants = Variant.objects.filter(product=OuterRef("pk"), is_active=True).order_by().values("product")
+        effective_price = Coalesce("price", OuterRef("price"))
+
+        def per_product(aggregate):
+            return Subquery(active_variants.annotate(value=aggregate).values("value")[:1])
+
+        return self.update(
+            min_price=Coalesce(per_product(Min(effective_price)), F("price")),
+            max_price=Coalesce(per_product(Max(effective_price)), F("price")),
+            available_stock=Coalesce(per_product(Sum("stock")), F("stock")),
+            active_variant_count=Coalesce(per_product(Count("pk")), 0),
+            updated_at=Now(),
+        )
+
+
 #Product db model
 class Product(models.Model):
     id = models.UUIDField(
@@ -54,17 +142,62 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Summary of the active variants (or of the product itself when it has none),
+    # kept current by save(), the Variant signals and the order stock engine.
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, editable=False)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, editable=False)
+    available_stock = models.PositiveIntegerField(default=0, editable=False)
+    active_variant_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    SUMMARY_FIELDS = ("min_price", "max_price", "available_stock", "active_variant_count")
+
+    class Meta:
+        # Shaped after ProductFilter and the list orderings; checked by the
+        # explain_catalog_queries command.
+        indexes = [
+            models.Index(fields=["is_active", "min_price"], name="product_active_min_price_idx"),
+            models.Index(fields=["is_active", "available_stock"], name="product_active_stock_idx"),
+            models.Index(fields=["is_active", "price"], name="product_active_price_idx"),
+            models.Index(fields=["is_active", "created_at"], name="product_active_created_idx"),
+            models.Index(fields=["is_active", "title"], name="product_active_title_idx"),
+            models.Index(fields=["created_at"], name="product_created_idx"),
+            # Keyset batches of the exports (Product.exports).
+            models.Index(fields=["updated_at"], name="product_updated_idx"),
+            models.Index(fields=["price"], name="product_price_idx"),
+            models.Index(fields=["title"], name="product_title_idx"),
+        ]
+
+    @property
+    def in_stock(self):
+        return self.available_stock > 0
+
+    def summarize_variants(self):
+        """Set the summary columns from the active variants (one query; none for a new product)"""
+        variants = [] if self._state.adding else list(
+            self.variants.filter(is_active=True).values_list("price", "stock")
+        )
+        price = Decimal(str(self.price))
+        if variants:
+            prices = [variant_price if variant_price is not None else price for variant_price, _ in variants]
+            self.min_price, self.max_price = min(prices), max(prices)
+            self.available_stock = sum(stock for _, stock in variants)
+        else:
+            self.min_price = self.max_price = price
+            self.available_stock = self.stock
+        self.active_variant_count = len(variants)
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base = slugify(self.title)[:200]
-            slug = base
-            idx = 1
-            while Product.objects.filter(slug=slug).exists():
-                slug = f"{base}-{idx}"
-                idx += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        self.summarize_variants()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *self.SUMMARY_FIELDS}
+        # The post_save handlers (e.g. the CatalogChange entry) commit with the row.
+        with transaction.atomic():
+            if not self.slug:
+                return save_with_unique_slug(self, self.title, lambda: super(Product, self).save(*args, **kwargs))
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -83,6 +216,11 @@ class Variant(models.Model):
     stock = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
 
+    def save(self, *args, **kwargs):
+        # The post_save handlers (e.g. the CatalogChange entry) commit with the row.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def get_price(self):
         return self.price if self.price is not None else self.product.price
 
@@ -92,9 +230,12 @@ class Variant(models.Model):
 class ProductImage(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, verbose_name='image_id', editable=False)
     product = models.ForeignKey(Product, related_name="images", on_delete=models.CASCADE)
-    image = models.ImageField(upload_to="products/%Y/%m/%d/", )
+    # Named by content hash and shared between rows (Product.storage).
+    image = models.ImageField(upload_to="products/", storage=product_image_storage, db_index=True)
     alt_text = models.CharField(max_length=255, blank=True)
     order = models.PositiveSmallIntegerField(default=0)
+    # Resized copies in modern formats, written by Product.images.
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ("order",)
@@ -102,7 +243,110 @@ class ProductImage(models.Model):
     def __str__(self):
         return f"Image for {self.product.title} ({self.pk})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored file so a replaced upload gets new derivatives.
+        instance._loaded_image = instance.__dict__.get("image")
+        return instance
+
+    @property
+    def image_changed(self):
+        return self.image.name != getattr(self, "_loaded_image", None)
 
 
+class ProductSearchDocument(models.Model):
+    """
+    Denormalized search text for a product (title, sku, description, category
+    and variant names). Maintained by Product.signals and read by Product.search.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="search_document")
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search document for {self.title}"
+
+
+# Sent with ``changes`` (a list of CatalogChange) whenever entries are written.
+catalog_changed = Signal()
+
+
+class CatalogChangeQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            catalog_changed.send(sender=self.model, changes=objs)
+        return objs
+
+    def since(self, seq, settle_seconds=0):
+        """
+        Changes after ``seq`` in sequence order. With ``settle_seconds`` the
+        newest entries are held back: sequence numbers are allocated when a
+        row is inserted, not when its transaction commits, so a still-open
+        transaction can commit an entry below the newest one a reader has
+        already seen. ``settle_seconds`` must exceed the time any writer
+        takes from inserting its entries to committing.
+
+        The page ends just before the lowest unsettled entry rather than
+        skipping it: ``changed_at`` does not follow ``seq``, and a settled
+        entry above an unsettled one would move a reader's position past it.
+        """
+        changes = self.filter(seq__gt=seq).order_by("seq")
+        if settle_seconds:
+            cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+            unsettled = self.filter(seq__gt=seq, changed_at__gt=cutoff).aggregate(first=models.Min("seq"))["first"]
+            if unsettled is not None:
+                changes = changes.filter(seq__lt=unsettled)
+        return changes
+
+
+class CatalogChange(models.Model):
+    """
+    Append-only log of catalog changes with increasing sequence numbers. Entries
+    are written in the transaction of the change (by Product.signals, the stock
+    engine and the importer) and served by /api/changes/?since=<seq>.
+    """
+    class Entity(models.TextChoices):
+        PRODUCT = "product", "Product"
+        VARIANT = "variant", "Variant"
+        CATEGORY = "category", "Category"
+
+    class Action(models.TextChoices):
+        CREATED = "created", "Created"
+        UPDATED = "updated", "Updated"
+        DELETED = "deleted", "Deleted"
+        STOCK = "stock", "Stock changed"
+
+    seq = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=10, choices=Entity.choices)
+    action = models.CharField(max_length=10, choices=Action.choices)
+    object_id = models.UUIDField()
+    # Product of a variant (or stock) change; not a foreign key so entries outlive deletes.
+    product_id = models.UUIDField(null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    objects = CatalogChangeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Newest change of one entity (the category ETag) without walking stock changes.
+            models.Index(fields=["entity", "seq"], name="catalog_change_entity_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.entity} {self.object_id} {self.action}"
 
+    @classmethod
+    def entry(cls, entity, action, object_id, product_id=None, **data):
+        """An unsaved entry, for bulk_create"""
+        return cls(entity=entity, action=action, object_id=object_id, product_id=product_id, data=data)
 
+    @classmethod
+    def log(cls, entity, action, object_id, product_id=None, **data):
+        entry = cls.entry(entity, action, object_id, product_id, **data)
+        entry.save()
+        catalog_changed.send(sender=cls, changes=[entry])
+        return entry
@@ -0,0 +1,191 @@
+"""
+Server-side cache of rendered anonymous catalog responses.
+
+Entries are keyed on the scheme, host and path, the query parameters in
+sorted order and the negotiated media type, and stored with the versions of the tags they depend
+on (``products``, ``product:<id>``, ``variants``, ``variant:<id>``,
+``categories``).
+Invalidating a tag increments its version, which makes every entry stored
+under an older version stale without having to find it. Product.signals
+invalidates tags for every CatalogChange, so model saves and deletes, stock
+changes and imports are all covered.
+
+A stale or missing entry is rebuilt by one worker at a time: the first takes a
+lock with ``cache.add`` and rebuilds; the others serve the stale entry while
+it does or, if there is none, wait up to LOCK_WAIT seconds for the new one.
+
+Hits, misses, stale serves and waits are counted in the cache so the counters
+cover every worker (see cache_stats()).
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+KEY_PREFIX = "catalog:response:"
+TAG_PREFIX = "catalog:tag:"
+STATS_PREFIX = "catalog:response-stats:"
+STATS = ("hits", "misses", "stale", "waits")
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2.0
+LOCK_POLL = 0.05
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Missing (never set or evicted).
+        if cache.add(key, 1, None):
+            return 1
+        return cache.incr(key)
+
+
+def _count(stat):
+    _incr(STATS_PREFIX + stat)
+
+
+def cache_stats():
+    values = cache.get_many([STATS_PREFIX + stat for stat in STATS])
+    stats = {stat: values.get(STATS_PREFIX + stat, 0) for stat in STATS}
+    served = stats["hits"] + stats["misses"] + stats["stale"]
+    stats["hit_ratio"] = round((stats["hits"] + stats["stale"]) / served, 4) if served else None
+    return stats
+
+
+def reset_cache_stats():
+    cache.delete_many([STATS_PREFIX + stat for stat in STATS])
+
+
+def tag_versions(tags):
+    """Current version of every tag; a tag without one gets a fresh, never reused version"""
+    keys = {TAG_PREFIX + tag: tag for tag in tags}
+    versions = cache.get_many(list(keys))
+    for key in keys:
+        if key not in versions:
+            # Nanoseconds: an evicted tag restarts above any version an old entry could hold.
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def invalidate_tags(tags):
+    """Make every entry depending on ``tags`` stale, now and again once the transaction commits"""
+    tags = set(tags)
+    if not tags:
+        return
+
+    def bump():
+        for tag in tags:
+            try:
+                cache.incr(TAG_PREFIX + tag)
+            except ValueError:
+                pass  # No version yet: no entry can depend on it.
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def tags_for_changes(changes):
+    """The tags invalidated by CatalogChange entries"""
+    from .models import CatalogChange
+
+    tags = set()
+    for change in changes:
+        if change.entity == CatalogChange.Entity.CATEGORY:
+            # One tag for all categories: moving or deleting one rewrites the paths of its
+            # descendants. Product details nest their categories and the product filters use the tree.
+            tags.update({"categories", "products"})
+        elif change.entity == CatalogChange.Entity.VARIANT:
+            tags.update({f"variant:{change.object_id}", f"product:{change.product_id}", "variants", "products"})
+        else:
+            tags.update({f"product:{change.object_id}", "products"})
+    return tags
+
+
+def tagged(*tags, per_object=None):
+    """A tags function for cached_response: ``tags`` plus ``<per_object>:<pk>`` for detail views"""
+    def for_request(request, pk=None, **kwargs):
+        return [*tags, f"{per_object}:{pk}"] if per_object else list(tags)
+    return for_request
+
+
+def _cache_key(request):
+    query = sorted((key, sorted(request.query_params.getlist(key))) for key in request.query_params)
+    media_type = getattr(request, "accepted_media_type", "") or ""
+    # Bodies hold absolute URLs (pagination links, images), built from the host and scheme.
+    origin = (request.scheme, request.get_host())
+    digest = hashlib.sha256(repr((origin, request.path, query, media_type)).encode()).hexdigest()
+    return KEY_PREFIX + digest
+
+
+def _from_entry(entry):
+    response = HttpResponse(entry["content"], status=entry["status"], content_type=entry["content_type"])
+    for header, value in entry["headers"]:
+        response[header] = value
+    return response
+
+
+def _store(key, versions, response):
+    entry = {
+        "versions": versions,
+        "content": response.content,
+        "status": response.status_code,
+        "content_type": response["Content-Type"],
+        "headers": [(header, response[header]) for header in ("Vary", "Allow", "X-Search-Truncated") if response.has_header(header)],
+    }
+    cache.set(key, entry, getattr(settings, "CATALOG_RESPONSE_CACHE_TIMEOUT", 300))
+
+
+def cached_response(tags):
+    """
+    Decorator for a viewset method: serve anonymous GETs from the response
+    cache. ``tags(request, **kwargs)`` lists the tags the response depends on.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != "GET" or request.user.is_authenticated:
+                return method(self, request, *args, **kwargs)
+
+            def build():
+                response = self.finalize_response(request, method(self, request, *args, **kwargs), *args, **kwargs)
+                response.render()
+                return response
+
+            key = _cache_key(request)
+            versions = tag_versions(tags(request, **kwargs))
+            entry = cache.get(key)
+            if entry is not None and entry["versions"] == versions:
+                _count("hits")
+                return _from_entry(entry)
+
+            lock = f"{key}:lock"
+            if not cache.add(lock, 1, LOCK_TIMEOUT):
+                if entry is not None:
+                    _count("stale")
+                    return _from_entry(entry)
+                deadline = time.monotonic() + LOCK_WAIT
+                while time.monotonic() < deadline:
+                    time.sleep(LOCK_POLL)
+                    entry = cache.get(key)
+                    if entry is not None:
+                        _count("waits")
+                        return _from_entry(entry)
+                _count("misses")
+                return build()
+
+            try:
+                _count("misses")
+                response = build()
+                if response.status_code == 200:
+                    _store(key, versions, response)
+                return response
+            finally:
+                cache.delete(lock)
+        return wrapper
+    return decorator
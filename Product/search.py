@@ -0,0 +1,293 @@
+"""
+Product search.
+
+Every product has a ProductSearchDocument row holding its denormalized text.
+A pluggable backend turns a query into a ranked list of product ids:
+
+* MySQLFullTextBackend uses FULLTEXT indexes on the document table (production).
+* InMemorySearchBackend keeps an inverted index in the current process
+  (tests, SQLite and local development). Writes in other processes reach it
+  through the documents' ``updated_at``, re-read at most every
+  PRODUCT_SEARCH_SYNC_SECONDS.
+
+The backend is chosen with the PRODUCT_SEARCH_BACKEND setting (a dotted path)
+and otherwise follows the database vendor.
+"""
+import heapq
+import math
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Prefetch
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Product, ProductSearchDocument, Variant
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+TITLE_WEIGHT = 3.0
+PREFIX_WEIGHT = 0.5
+# updated_at is set before the writer commits; re-read this far back so late commits are not missed.
+SYNC_OVERLAP = timedelta(seconds=10)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def build_document(product):
+    """Return a ProductSearchDocument for a product with categories and variants loaded."""
+    body = [product.sku, product.description]
+    body.extend(category.name for category in product.category.all())
+    body.extend(variant.name for variant in product.variants.all())
+    body.extend(variant.sku for variant in product.variants.all())
+    return ProductSearchDocument(product_id=product.pk, title=product.title, body="\n".join(filter(None, body)))
+
+
+def index_products(product_ids):
+    """(Re)build the search documents of the given products and feed them to the backend."""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return []
+    products = Product.objects.filter(pk__in=product_ids).prefetch_related(
+        "category", Prefetch("variants", queryset=Variant.objects.only("product_id", "name", "sku")),
+    )
+    documents = [build_document(product) for product in products]
+    upsert_kwargs = {"update_conflicts": True, "update_fields": ["title", "body", "updated_at"]}
+    if connection.features.supports_update_conflicts_with_target:
+        upsert_kwargs["unique_fields"] = ["product"]
+    ProductSearchDocument.objects.bulk_create(documents, **upsert_kwargs)
+    get_search_backend().index(documents)
+    return documents
+
+
+def remove_products(product_ids):
+    product_ids = list(product_ids)
+    ProductSearchDocument.objects.filter(product_id__in=product_ids).delete()
+    get_search_backend().remove(product_ids)
+
+
+class SearchBackend:
+    """Interface implemented by the search backends."""
+
+    def index(self, documents):
+        """Called after documents were written to the database."""
+
+    def remove(self, product_ids):
+        """Called after products were deleted."""
+
+    def search(self, query, limit):
+        """Return up to ``limit`` product ids, most relevant first."""
+        raise NotImplementedError
+
+    def autocomplete(self, prefix, limit):
+        """Return up to ``limit`` product ids whose title has a word starting with ``prefix``."""
+        raise NotImplementedError
+
+
+class InMemorySearchBackend(SearchBackend):
+    """
+    Inverted index held in process memory, loaded lazily from the document
+    table and kept current by index()/remove() for writes in this process and
+    by _sync() for the others. Every query term must match a token exactly or
+    as a prefix; scores are tf-idf with title hits weighted up.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._postings = defaultdict(dict)  # token -> {product_id: weight}
+        self._title_postings = defaultdict(set)  # token -> {product_id}
+        self._doc_tokens = {}  # product_id -> (tokens, title tokens)
+        self._terms = []  # sorted vocabulary for prefix lookups
+        self._title_terms = []
+        self._synced_through = None  # documents updated up to here are indexed
+        self._synced_at = 0.0  # time.monotonic() of the last sync
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            self._sync()
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._synced_through, self._synced_at = timezone.now(), time.monotonic()
+            for document in ProductSearchDocument.objects.only("product_id", "title", "body").iterator(chunk_size=2000):
+                self._add(document)
+            self._loaded = True
+
+    def _sync(self):
+        """Index the documents other processes wrote or deleted since the last sync."""
+        if self._synced_through is None:
+            return  # Not loaded from the table.
+        if time.monotonic() - self._synced_at < getattr(settings, "PRODUCT_SEARCH_SYNC_SECONDS", 1):
+            return
+        with self._lock:
+            started = timezone.now()
+            self._synced_at = time.monotonic()
+            changed = ProductSearchDocument.objects.filter(updated_at__gt=self._synced_through - SYNC_OVERLAP)
+            for document in changed.only("product_id", "title", "body"):
+                self._add(document)
+            self._synced_through = started
+            # Deletes leave no row behind; look for them only when the counts disagree.
+            if ProductSearchDocument.objects.count() != len(self._doc_tokens):
+                live = set(ProductSearchDocument.objects.values_list("product_id", flat=True))
+                for product_id in set(self._doc_tokens) - live:
+                    self._discard(product_id)
+
+    def _add(self, document):
+        self._discard(document.product_id)
+        title_tokens = tokenize(document.title)
+        weights = defaultdict(float)
+        for token in title_tokens:
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(document.body):
+            weights[token] += 1.0
+        for token, weight in weights.items():
+            if token not in self._postings:
+                insort(self._terms, token)
+            self._postings[token][document.product_id] = weight
+        for token in set(title_tokens):
+            if token not in self._title_postings:
+                insort(self._title_terms, token)
+            self._title_postings[token].add(document.product_id)
+        self._doc_tokens[document.product_id] = (tuple(weights), frozenset(title_tokens))
+
+    def _discard(self, product_id):
+        tokens, title_tokens = self._doc_tokens.pop(product_id, ((), ()))
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(product_id, None)
+        for token in title_tokens:
+            postings = self._title_postings.get(token)
+            if postings is not None:
+                postings.discard(product_id)
+
+    def index(self, documents):
+        with self._lock:
+            if not self._loaded:
+                # The lazy load will pick these documents up from the table.
+                return
+            for document in documents:
+                self._add(document)
+
+    def remove(self, product_ids):
+        with self._lock:
+            for product_id in product_ids:
+                self._discard(product_id)
+
+    @staticmethod
+    def _expand(terms, prefix):
+        start = bisect_left(terms, prefix)
+        for term in terms[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def search(self, query, limit):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        self._ensure_loaded()
+        with self._lock:
+            total = max(len(self._doc_tokens), 1)
+            scores = None
+            for term in terms:
+                term_scores = defaultdict(float)
+                for token in self._expand(self._terms, term):
+                    postings = self._postings[token]
+                    if not postings:
+                        continue
+                    idf = math.log(1 + total / len(postings))
+                    boost = 1.0 if token == term else PREFIX_WEIGHT
+                    for product_id, weight in postings.items():
+                        term_scores[product_id] += boost * weight * idf
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {pid: score + term_scores[pid] for pid, score in scores.items() if pid in term_scores}
+                if not scores:
+                    return []
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], str(item[0])))
+        return [product_id for product_id, _ in ranked]
+
+    def autocomplete(self, prefix, limit):
+        terms = tokenize(prefix)
+        if not terms:
+            return []
+        self._ensure_loaded()
+        *leading, last = terms
+        with self._lock:
+            matches = None
+            for term in leading:
+                ids = self._title_postings.get(term, set())
+                matches = set(ids) if matches is None else matches & ids
+            hits = defaultdict(int)
+            for token in self._expand(self._title_terms, last):
+                for product_id in self._title_postings[token]:
+                    if matches is None or product_id in matches:
+                        # Shorter completions rank first, e.g. "run" -> "run" before "running".
+                        hits[product_id] = max(hits[product_id], 1000 - len(token))
+        ranked = heapq.nsmallest(limit, hits.items(), key=lambda item: (-item[1], str(item[0])))
+        return [product_id for product_id, _ in ranked]
+
+
+class MySQLFullTextBackend(SearchBackend):
+    """
+    Boolean-mode MATCH ... AGAINST over the FULLTEXT indexes created by the
+    Product migrations. InnoDB keeps the indexes current on every write, so
+    index()/remove() have nothing to do. Terms shorter than
+    innodb_ft_min_token_size are ignored by MySQL.
+    """
+
+    @staticmethod
+    def _boolean_query(query):
+        return " ".join(f"+{term}*" for term in tokenize(query))
+
+    def _ranked(self, query, columns, limit):
+        boolean_query = self._boolean_query(query)
+        if not boolean_query:
+            return []
+        score = " + ".join(f"MATCH({column}) AGAINST (%s IN BOOLEAN MODE) * {weight}" for column, weight in columns)
+        documents = (
+            ProductSearchDocument.objects
+            .annotate(score=RawSQL(score, [boolean_query] * len(columns)))
+            .filter(score__gt=0)
+            .order_by("-score", "product_id")
+            .values_list("product_id", flat=True)
+        )
+        return list(documents[:limit])
+
+    def search(self, query, limit):
+        return self._ranked(query, [("title", TITLE_WEIGHT), ("body", 1)], limit)
+
+    def autocomplete(self, prefix, limit):
+        return self._ranked(prefix, [("title", 1)], limit)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(settings, "PRODUCT_SEARCH_BACKEND", None)
+                if not path:
+                    path = (
+                        "Product.search.MySQLFullTextBackend"
+                        if connection.vendor == "mysql"
+                        else "Product.search.InMemorySearchBackend"
+                    )
+                _backend = import_string(path)()
+    return _backend
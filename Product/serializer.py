@@ -1,8 +1,22 @@
-from django.core.exceptions import ValidationError
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
 from Product.models import Product, Category, ProductImage, Variant
+from Product.uploads import Base64ImageField, validate_image_file
+
+
+def _media_url(name, context):
+    url = ProductImage._meta.get_field("image").storage.url(name)
+    request = context.get("request")
+    return request.build_absolute_uri(url) if request else url
+
+
+def _derivative_urls(derivatives, context, sizes=None):
+    """``{size: {"width", "height", <format>: url}}`` for ProductImage.derivatives"""
+    return {
+        size: {key: _media_url(value, context) if key not in ("width", "height") else value for key, value in entry.items()}
+        for size, entry in (derivatives or {}).items()
+        if sizes is None or size in sizes
+    }
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -13,26 +27,32 @@ class CategorySerializer(serializers.ModelSerializer):
 
 class ProductImageSerializer(serializers.HyperlinkedModelSerializer):
     image = serializers.ImageField(max_length=None, allow_empty_file=False, use_url=True)
+    derivatives = serializers.SerializerMethodField()
     class Meta:
         model = ProductImage
-        fields = ("id", "product", "image", "alt_text", "order")
+        fields = ("id", "product", "image", "alt_text", "order", "derivatives")
         read_only_fields = ("id",)
 
+    def get_derivatives(self, obj):
+        return _derivative_urls(obj.derivatives, self.context)
+
     def validate_image(self, image):
-        max_size = 5 * 1024 * 1024
-        if image.size > max_size:
-            raise ValidationError("Image file too large (max 5 MB).")
-        valid_mime_type = ["image/jpeg", "image/png", "image/webp"]
-        content_type = image.content_type
-        if content_type not in valid_mime_type:
-            raise ValidationError("Unsupported image type. Use JPEG/PNG/WEBP")
-        return image
+        # Usually already enforced while streaming (Product.uploads.ImageUploadHandler).
+        return validate_image_file(image)
 class ProductImageBase64Serializer(serializers.ModelSerializer):
     image = Base64ImageField()
     class Meta:
         model = ProductImage
         fields = ("id", "product", "image", "alt_text", "order")
 
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            # The decoded temporary file; storage may have moved it already.
+            if "image" in self.validated_data:
+                self.validated_data["image"].close()
+
 
 class VariantSerializer(serializers.ModelSerializer):
     class Meta:
@@ -42,6 +62,34 @@ class VariantSerializer(serializers.ModelSerializer):
 
 
 class ProductListSerializer(serializers.ModelSerializer):
+    """
+    Compact catalog row. Expects a queryset built with
+    ``Product.objects.with_listing_summary()`` so nothing is loaded per row;
+    prices and stock come from the product's summary columns.
+    """
+    primary_image = serializers.SerializerMethodField()
+    primary_image_sizes = serializers.SerializerMethodField()
+    in_stock = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = (
+            "id", "title", "slug", "price", "currency", "primary_image", "primary_image_sizes",
+            "min_price", "max_price", "in_stock",
+        )
+        read_only_fields = fields
+
+    def get_primary_image(self, obj):
+        if not obj.primary_image:
+            return None
+        return _media_url(obj.primary_image, self.context)
+
+    def get_primary_image_sizes(self, obj):
+        # Listings only need the small sizes; the detail has every derivative.
+        return _derivative_urls(obj.primary_image_derivatives, self.context, sizes=("card", "thumbnail"))
+
+
+class ProductDetailSerializer(serializers.ModelSerializer):
     category  = CategorySerializer(read_only=True, many=True)
     images = ProductImageSerializer(read_only=True, many=True)
     variants = VariantSerializer(read_only=True, many=True)
@@ -0,0 +1,146 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import CatalogChange, Category, Product, ProductImage, Variant, catalog_changed
+from .images import schedule_derivatives
+from .response_cache import invalidate_tags, tags_for_changes
+from .search import index_products, remove_products
+from .storage import derivative_files, release
+from .tree import invalidate_category_tree
+
+
+Entity, Action = CatalogChange.Entity, CatalogChange.Action
+
+
+def _saved(created):
+    return Action.CREATED if created else Action.UPDATED
+
+
+def _touch_products(product_ids):
+    """Bump updated_at of products whose detail representation changed without a Product save"""
+    Product.objects.filter(pk__in=list(product_ids)).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        index_products([instance.pk])
+        CatalogChange.log(Entity.PRODUCT, _saved(created), instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    remove_products([instance.pk])
+    CatalogChange.log(Entity.PRODUCT, Action.DELETED, instance.pk)
+
+
+@receiver(m2m_changed, sender=Product.category.through)
+def index_recategorized_products(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        # pk_set is not provided for clear(), so remember who is affected.
+        instance._cleared_product_ids = list(instance.products.values_list("pk", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        product_ids = [instance.pk]
+    elif action == "post_clear":
+        product_ids = getattr(instance, "_cleared_product_ids", [])
+    else:
+        product_ids = pk_set or []
+    if product_ids:
+        _touch_products(product_ids)
+        index_products(product_ids)
+        CatalogChange.objects.bulk_create([
+            CatalogChange.entry(Entity.PRODUCT, Action.UPDATED, product_id, fields=["category"]) for product_id in product_ids
+        ])
+
+
+@receiver(post_save, sender=Category)
+def index_category_products(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        CatalogChange.log(Entity.CATEGORY, _saved(created), instance.pk)
+    # After the log entry: the rebuilt tree carries the category version.
+    invalidate_category_tree()
+    if not raw and not created:
+        product_ids = list(instance.products.values_list("pk", flat=True))
+        _touch_products(product_ids)
+        index_products(product_ids)
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_products(sender, instance, **kwargs):
+    # The category links are gone by post_delete.
+    instance._product_ids = list(instance.products.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def detach_deleted_category(sender, instance, **kwargs):
+    # The children were re-parented to NULL; make them roots in the materialized path too.
+    Category.objects.detach(instance.pk)
+    CatalogChange.log(Entity.CATEGORY, Action.DELETED, instance.pk)
+    invalidate_category_tree()
+    _touch_products(getattr(instance, "_product_ids", []))
+
+
+def _deleted_with_product(origin):
+    """True when a delete cascaded from a Product (or Product queryset) delete."""
+    model = getattr(origin, "model", None) or type(origin)
+    return model is Product
+
+
+@receiver(post_save, sender=Variant)
+def index_saved_variant(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        Product.objects.filter(pk=instance.product_id).refresh_summaries()
+        index_products([instance.product_id])
+        CatalogChange.log(Entity.VARIANT, _saved(created), instance.pk, instance.product_id)
+
+
+@receiver(post_delete, sender=Variant)
+def index_deleted_variant(sender, instance, origin=None, **kwargs):
+    if not _deleted_with_product(origin):
+        Product.objects.filter(pk=instance.product_id).refresh_summaries()
+        index_products([instance.product_id])
+        CatalogChange.log(Entity.VARIANT, Action.DELETED, instance.pk, instance.product_id)
+
+
+@receiver(pre_save, sender=ProductImage)
+def reset_replaced_image(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding and instance.image_changed:
+        # Remember the old file and its derivatives to release once the row no longer holds them.
+        instance._replaced = (getattr(instance, "_loaded_image", None), derivative_files(instance.derivatives))
+        instance.derivatives = {}
+
+
+@receiver(post_save, sender=ProductImage)
+def render_image_derivatives(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.image and (created or instance.image_changed):
+        schedule_derivatives(instance.pk)
+    instance._loaded_image = instance.image.name
+    old_name, files = instance.__dict__.pop("_replaced", (None, []))
+    if old_name:
+        transaction.on_commit(lambda: release(old_name, [old_name, *files]))
+
+
+@receiver(post_delete, sender=ProductImage)
+def release_image_files(sender, instance, **kwargs):
+    name, files = instance.image.name, derivative_files(instance.derivatives)
+    transaction.on_commit(lambda: release(name, [name, *files]))
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def touch_product_of_image(sender, instance, raw=False, origin=None, **kwargs):
+    if not raw and not _deleted_with_product(origin):
+        _touch_products([instance.product_id])
+        CatalogChange.log(Entity.PRODUCT, Action.UPDATED, instance.product_id, fields=["images"])
+
+
+@receiver(catalog_changed)
+def invalidate_cached_responses(sender, changes, **kwargs):
+    invalidate_tags(tags_for_changes(changes))
@@ -0,0 +1,95 @@
+"""
+Unique slug allocation.
+
+Slugs are ``<base>`` for the first object with a given title and
+``<base>-<n>`` after that. The next free suffix is found with one aggregate
+query instead of probing ``<base>-1``, ``<base>-2``, ... one at a time, and a
+save that loses a race for the same slug to a concurrent writer is retried with
+a fresh one.
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Count, Max, Q
+from django.db.models.functions import Cast, Substr
+from django.utils.text import slugify
+
+SLUG_ATTEMPTS = 5
+BASE_MAX_LENGTH = 200
+# Room left for "-<suffix>" within the field's max_length.
+SUFFIX_RESERVE = 11
+BULK_CHUNK_SIZE = 200
+
+
+def slug_base(model, text, field="slug"):
+    max_length = model._meta.get_field(field).max_length
+    base = slugify(text)[:min(BASE_MAX_LENGTH, max_length - SUFFIX_RESERVE)].strip("-")
+    return base or model._meta.model_name
+
+
+def next_free_slug(model, base, field="slug"):
+    """The first free slug for ``base``, found with a single query"""
+    suffixed = rf"^{re.escape(base)}-[0-9]+$"
+    taken = model._default_manager.filter(**{f"{field}__startswith": base}).aggregate(
+        base_taken=Count("pk", filter=Q(**{field: base})),
+        max_suffix=Max(
+            Cast(Substr(field, len(base) + 2), BigIntegerField()),
+            filter=Q(**{f"{field}__regex": suffixed}),
+        ),
+    )
+    if not taken["base_taken"]:
+        return base
+    return f"{base}-{(taken['max_suffix'] or 0) + 1}"
+
+
+def save_with_unique_slug(instance, text, save, field="slug"):
+    """Allocate a slug for ``instance`` from ``text`` and call ``save()``, retrying on a slug conflict"""
+    model = type(instance)
+    base = slug_base(model, text, field)
+    for attempt in range(SLUG_ATTEMPTS):
+        setattr(instance, field, next_free_slug(model, base, field))
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            taken = model._default_manager.filter(**{field: getattr(instance, field)}).exists()
+            if attempt + 1 == SLUG_ATTEMPTS or not taken:
+                setattr(instance, field, "")
+                raise
+
+
+def assign_slugs(instances, text_of, field="slug"):
+    """
+    Give every instance without a slug a unique one, for bulk_create. Existing
+    slugs are read with one query per BULK_CHUNK_SIZE distinct bases; slugs
+    within the batch are numbered in memory.
+    """
+    pending = [instance for instance in instances if not getattr(instance, field)]
+    if not pending:
+        return instances
+    model = type(pending[0])
+    bases = {id(instance): slug_base(model, text_of(instance), field) for instance in pending}
+    distinct = sorted(set(bases.values()))
+    wanted = set(distinct)
+    taken, next_suffix = set(), {}
+    for start in range(0, len(distinct), BULK_CHUNK_SIZE):
+        chunk = distinct[start:start + BULK_CHUNK_SIZE]
+        lookup = reduce(or_, (Q(**{f"{field}__startswith": base}) for base in chunk))
+        taken.update(model._default_manager.filter(lookup).values_list(field, flat=True))
+    for slug in taken:
+        base, _, suffix = slug.rpartition("-")
+        if suffix.isdigit() and base in wanted:
+            next_suffix[base] = max(next_suffix.get(base, 1), int(suffix) + 1)
+    for instance in pending:
+        base = bases[id(instance)]
+        if base not in taken:
+            slug = base
+        else:
+            suffix = next_suffix.get(base, 1)
+            next_suffix[base] = suffix + 1
+            slug = f"{base}-{suffix}"
+        taken.add(slug)
+        setattr(instance, field, slug)
+    return instances
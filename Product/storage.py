@@ -0,0 +1,141 @@
+"""
+Content-addressed storage for product images.
+
+Files are stored under the SHA-256 of their content,
+``products/<2 hex>/<sha256>.<ext>``. The hash is computed as the upload's
+chunks are written, in the same pass. The same photo uploaded for many
+products is kept once.
+
+Derivatives (Product.images) are written with save_derived() under the name
+of their original plus a label naming their size and encoding settings,
+``products/<2 hex>/<sha256>.<label>.<ext>``. Hashing their own bytes would
+let byte-different originals with the same pixels share derivative files
+that are released with either of them. A name never gets other content, so
+its URL can be cached for good (Product.views.product_image_file).
+
+Files are shared, so they are only deleted through release(). A file's
+reference count is the number of ProductImage rows holding it, counted
+through the indexed ``image`` column rather than kept in a counter that could
+drift. A derivative is named after its original, so it is held by exactly
+the rows holding that original.
+
+An upload that matches an existing file holds it before its row commits.
+The reuse is stamped on a marker file under REUSED_DIR, in the storage every
+worker shares, and release() leaves a file reused within REUSE_GRACE alone
+(prune_image_files removes it if it stays unreferenced).
+"""
+import hashlib
+import os
+import re
+import time
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Names written by ContentAddressedStorage, relative to its location.
+CONTENT_ADDRESSED = re.compile(r"[\w-]+/[0-9a-f]{2}/[0-9a-f]{64}(?:\.[\w-]+)?\.[a-z0-9]+")
+# An upload that matched an existing file keeps it from being released for this long, covering
+# the window between the file being reused and the row referencing it being committed.
+REUSE_GRACE = 600
+REUSED_DIR = ".reused"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage naming every file after the SHA-256 of its content, or of its original"""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content; an existing file is the same file.
+        return name
+
+    def _write(self, directory, content, digest=None):
+        """Copy ``content`` to a new temporary file in ``directory``, updating ``digest``"""
+        os.makedirs(self.path(directory), exist_ok=True)
+        temporary = self.path(os.path.join(directory, f".{uuid.uuid4().hex}.tmp"))
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    if digest is not None:
+                        digest.update(chunk)
+                    file.write(chunk)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        return temporary
+
+    def _move(self, temporary, name):
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(temporary, self.file_permissions_mode)
+        # Atomic: a concurrent writer of the same name writes the same content.
+        os.replace(temporary, full_path)
+        return name
+
+    def _save(self, name, content):
+        prefix = name.split("/", 1)[0] if "/" in name else "files"
+        extension = os.path.splitext(name)[1].lower()
+        digest = hashlib.sha256()
+        temporary = self._write(prefix, content, digest)
+        hexdigest = digest.hexdigest()
+        name = f"{prefix}/{hexdigest[:2]}/{hexdigest}{extension}"
+        if os.path.exists(self.path(name)):
+            os.remove(temporary)
+            self._mark_reused(name)
+            return name
+        return self._move(temporary, name)
+
+    def _mark_reused(self, name):
+        marker = self.path(os.path.join(REUSED_DIR, name))
+        os.makedirs(os.path.dirname(marker), exist_ok=True)
+        with open(marker, "a"):
+            pass
+        os.utime(marker)
+
+    def recently_reused(self, name):
+        """Whether an upload matched ``name`` within the last REUSE_GRACE seconds, in any process"""
+        try:
+            return time.time() - os.path.getmtime(self.path(os.path.join(REUSED_DIR, name))) < REUSE_GRACE
+        except FileNotFoundError:
+            return False
+
+    def save_derived(self, original, label, extension, content):
+        """Store a file derived from ``original`` as ``<original root>.<label>.<extension>``"""
+        name = f"{os.path.splitext(original)[0]}.{label}.{extension}"
+        return self._move(self._write(os.path.dirname(name), content), name)
+
+
+product_image_storage = ContentAddressedStorage()
+
+
+def derivative_files(derivatives):
+    """The file names in a ProductImage.derivatives value"""
+    return [
+        value for entry in (derivatives or {}).values()
+        for key, value in entry.items() if key not in ("width", "height") and value
+    ]
+
+
+def release(image_name, files, exclude_pk=None):
+    """
+    Delete ``files``, the original ``image_name`` and/or its derivatives, unless
+    a ProductImage other than ``exclude_pk`` still holds ``image_name``.
+    Call it once the change dropping the reference has committed.
+    """
+    from .models import ProductImage
+
+    if not image_name or not files:
+        return False
+    storage = ProductImage._meta.get_field("image").storage
+    holders = ProductImage.objects.filter(image=image_name)
+    if exclude_pk is not None:
+        holders = holders.exclude(pk=exclude_pk)
+    if holders.exists() or storage.recently_reused(image_name):
+        return False
+    for name in files:
+        storage.delete(name)
+    return True
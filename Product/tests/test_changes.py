@@ -0,0 +1,112 @@
+import io
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from Order.stock import reserve_stock, restore_stock
+from Product import importer
+from Product.importer import import_catalog
+from Product.models import CatalogChange, Category, Product, Variant
+
+
+@pytest.fixture(autouse=True)
+def no_settle_delay(settings):
+    settings.CATALOG_CHANGES_SETTLE_SECONDS = 0
+
+
+def _changes(since=0, **params):
+    response = APIClient().get("/api/changes/", {"since": since, **params})
+    assert response.status_code == 200, response.data
+    return response.data
+
+
+def _events(data):
+    return [(change["entity"], change["action"], change["object_id"]) for change in data["changes"]]
+
+
+def test_model_and_stock_changes_are_logged_in_sequence(db, category, product, variant):
+    start = CatalogChange.objects.latest("seq").seq
+    product.title = "Road Shoe"
+    product.save()
+    product.category.remove(category)
+    line = SimpleNamespace(pk=1, product_id=product.pk, variant_id=variant.pk, quantity=2, product=product, variant=variant)
+    reserve_stock([line])
+    restore_stock([line])
+    variant_id = variant.pk
+    variant.delete()
+
+    data = _changes(start)
+    assert _events(data) == [
+        ("product", "updated", product.pk),
+        ("product", "updated", product.pk),
+        ("variant", "stock", variant_id),
+        ("variant", "stock", variant_id),
+        ("variant", "deleted", variant_id),
+    ]
+    assert [change["data"].get("delta") for change in data["changes"][2:4]] == [-2, 2]
+    assert data["next"] == data["changes"][-1]["seq"] and not data["has_more"]
+    assert _changes(data["next"])["changes"] == []
+
+
+def test_changes_roll_back_with_the_change(db, product):
+    start = CatalogChange.objects.latest("seq").seq
+    with pytest.raises(RuntimeError), transaction.atomic():
+        Variant.objects.create(product=product, name="Gone", sku="GONE-1")
+        raise RuntimeError
+    assert _changes(start)["changes"] == []
+
+
+def test_importer_logs_bulk_writes_and_feed_pages(db):
+    csv = "sku,title,price,categories,variant_sku,variant_name\nA-1,A,1.00,New,A-1-S,Small\nB-1,B,2.00,,,\n"
+    import_catalog(io.BytesIO(csv.encode()), "csv")
+    a, b = Product.objects.get(sku="A-1"), Product.objects.get(sku="B-1")
+    new = Category.objects.get(slug="new")
+
+    first = _changes(limit=2)
+    assert first["has_more"]
+    events = _events(first) + _events(_changes(first["next"]))
+    assert events == [
+        ("product", "created", a.pk),
+        ("product", "created", b.pk),
+        ("variant", "created", Variant.objects.get(sku="A-1-S").pk),
+        ("category", "created", new.pk),
+    ]
+
+
+def test_importer_logs_a_chunk_at_the_end_of_its_transaction(db, monkeypatch):
+    indexed_at = []
+    monkeypatch.setattr(importer, "index_products", lambda ids: indexed_at.append(timezone.now()))
+    csv = "sku,title,price,categories\nA-1,A,1.00,New\n"
+    import_catalog(io.BytesIO(csv.encode()), "csv")
+
+    # Stamped after the slow part of the chunk, so the settle window only has to cover the commit.
+    assert CatalogChange.objects.count() == 2
+    assert all(change.changed_at >= indexed_at[0] for change in CatalogChange.objects.all())
+
+
+def test_a_page_ends_before_the_first_unsettled_change(db, product, settings):
+    settings.CATALOG_CHANGES_SETTLE_SECONDS = 60
+    now = timezone.now()
+    CatalogChange.objects.all().delete()
+    first, unsettled, late = CatalogChange.objects.bulk_create([
+        CatalogChange(entity=CatalogChange.Entity.PRODUCT, action=CatalogChange.Action.UPDATED,
+                      object_id=product.pk, changed_at=now - timedelta(minutes=minutes))
+        for minutes in (10, 0, 5)
+    ])
+    data = _changes()
+    assert [change["seq"] for change in data["changes"]] == [first.seq]
+    assert (data["next"], data["has_more"]) == (first.seq, False)
+    assert _changes(first.seq)["changes"] == []
+
+    CatalogChange.objects.filter(seq=unsettled.seq).update(changed_at=now - timedelta(minutes=2))
+    assert [change["seq"] for change in _changes(first.seq)["changes"]] == [unsettled.seq, late.seq]
+
+
+def test_recent_changes_are_held_back_until_settled(db, product, settings):
+    settings.CATALOG_CHANGES_SETTLE_SECONDS = 60
+    assert _changes()["changes"] == []
+    assert APIClient().get("/api/changes/", {"since": "x"}).status_code == 400
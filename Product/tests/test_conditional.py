@@ -0,0 +1,87 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from Product.models import Category, ProductImage
+
+
+def _revalidate(client, url, response):
+    return client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+
+def test_product_detail_answers_304_with_one_query_until_it_changes(product, variant):
+    client = APIClient()
+    url = f"/api/products/{product.pk}/"
+    first = client.get(url)
+    assert first.status_code == 200
+    assert "public" in first["Cache-Control"] and "s-maxage=60" in first["Cache-Control"]
+    assert first["Last-Modified"]
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = _revalidate(client, url, first)
+    assert response.status_code == 304
+    assert len(ctx.captured_queries) == 1
+    assert response["ETag"] == first["ETag"] and "public" in response["Cache-Control"]
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code == 304
+
+    # Changes the detail nests bump the product's validator.
+    for change in (
+        lambda: variant.save(),
+        lambda: ProductImage.objects.create(product=product, image="products/x.jpg"),
+        lambda: Category.objects.filter(pk__in=product.category.all()).first().save(),
+    ):
+        etag = first["ETag"]
+        change()
+        first = client.get(url)
+        assert first["ETag"] != etag
+        assert _revalidate(client, url, first).status_code == 304
+
+
+def test_lists_and_categories_revalidate_on_the_change_log(product, variant, category):
+    client = APIClient()
+    products, categories = client.get("/api/products/"), client.get("/api/categories/tree/")
+    assert _revalidate(client, "/api/products/", products).status_code == 304
+    assert _revalidate(client, "/api/categories/tree/", categories).status_code == 304
+
+    variant.stock = 1
+    variant.save()
+    # Stock moved: product lists change, categories do not.
+    assert _revalidate(client, "/api/products/", products).status_code == 200
+    assert _revalidate(client, "/api/categories/tree/", categories).status_code == 304
+
+    category.description = "All shoes"
+    category.save()
+    assert _revalidate(client, "/api/categories/tree/", categories).status_code == 200
+    assert _revalidate(client, f"/api/categories/{category.slug}/", categories).status_code == 200
+
+
+def test_variant_detail_follows_its_product_and_missing_objects_have_no_validator(product, variant):
+    client = APIClient()
+    url = f"/api/variants/{variant.pk}/"
+    first = client.get(url)
+    assert _revalidate(client, url, first).status_code == 304
+    product.title = "Renamed"
+    product.save()
+    assert _revalidate(client, url, first).status_code == 200
+
+    missing = client.get("/api/products/not-a-uuid/")
+    assert missing.status_code == 404 and not missing.has_header("ETag")
+
+
+def test_the_cached_tree_follows_category_changes_made_by_other_workers(category, settings):
+    from Product.models import CatalogChange
+    from Product.tree import get_category_tree
+
+    settings.CATEGORY_TREE_CHECK_SECONDS = 0
+    Entity, Action = CatalogChange.Entity, CatalogChange.Action
+    pending = CatalogChange.log(Entity.CATEGORY, Action.CREATED, category.pk)
+    CatalogChange.log(Entity.CATEGORY, Action.UPDATED, category.pk)
+    # Still uncommitted when the tree is cached.
+    CatalogChange.objects.filter(seq=pending.seq).delete()
+    assert set(get_category_tree()["slugs"]) == {category.slug}
+
+    # Another worker's write: its invalidation misses this process's cache, and its entry
+    # commits below the newest one already seen.
+    bags = Category.objects.bulk_create([Category(name="Bags", slug="bags", path="/x/")])[0]
+    CatalogChange.objects.create(seq=pending.seq, entity=Entity.CATEGORY, action=Action.CREATED, object_id=bags.pk)
+    assert set(get_category_tree()["slugs"]) == {category.slug, "bags"}
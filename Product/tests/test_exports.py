@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from Product.importer import import_catalog
+from Product.models import Product, ProductImage, Variant
+
+
+@pytest.fixture(autouse=True)
+def no_settle_delay(settings):
+    settings.EXPORT_SETTLE_SECONDS = 0
+
+
+@pytest.fixture
+def admin_client(db):
+    admin = get_user_model().objects.create_user(email="admin@example.com", first_name="A", last_name="B", password="x", is_staff=True)
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+def _content(response):
+    assert response.status_code == 200, response
+    return b"".join(response.streaming_content).decode()
+
+
+def test_ndjson_export_streams_products_with_variants_categories_and_images(admin_client, product, variant):
+    ProductImage.objects.create(product=product, image="products/2025/01/01/shoe.jpg")
+
+    response = admin_client.get("/api/products/export/")
+
+    assert response["Content-Type"] == "application/x-ndjson"
+    [record] = [json.loads(line) for line in _content(response).splitlines()]
+    assert (record["sku"], record["price"], record["categories"]) == ("SKU-001", "99.99", ["shoes"])
+    assert record["images"] == ["http://testserver/media/products/2025/01/01/shoe.jpg"]
+    assert [(v["sku"], v["price"]) for v in record["variants"]] == [("SKU-001-42B", "109.99")]
+
+
+def test_export_reads_fixed_size_batches_with_per_batch_prefetches(admin_client, category, monkeypatch):
+    monkeypatch.setattr("Ecomerce_Application.exports.EXPORT_CHUNK_SIZE", 2)
+    products = Product.objects.bulk_create([
+        Product(title=f"P{n}", slug=f"p{n}", sku=f"P-{n}", price="1.00") for n in range(5)
+    ])
+    Variant.objects.bulk_create([Variant(product=p, name="One", sku=f"{p.sku}-1") for p in products])
+
+    response = admin_client.get("/api/products/export/")
+    with CaptureQueriesContext(connection) as ctx:
+        lines = _content(response).splitlines()
+
+    assert sorted(json.loads(line)["sku"] for line in lines) == [f"P-{n}" for n in range(5)]
+    # 3 batches of (products, variants, images, categories).
+    assert len(ctx.captured_queries) == 3 * 4
+
+
+def test_export_window_and_csv_round_trips_through_the_importer(admin_client, product, variant):
+    cutoff = timezone.now()
+    Product.objects.filter(pk=product.pk).update(updated_at=cutoff - timedelta(days=1))
+    newer = Product.objects.create(title="Trail Shoe", sku="SKU-002", price="50.00", stock=2)
+
+    response = admin_client.get("/api/products/export/", {"updated_since": cutoff.isoformat()})
+    assert [json.loads(line)["sku"] for line in _content(response).splitlines()] == ["SKU-002"]
+    assert admin_client.get("/api/products/export/", {"updated_since": "yesterday"}).status_code == 400
+
+    text = _content(admin_client.get("/api/products/export/", {"output": "csv"}))
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert [(row["sku"], row["variant_sku"]) for row in rows] == [("SKU-001", "SKU-001-42B"), ("SKU-002", "")]
+
+    Product.objects.filter(pk=newer.pk).update(title="Renamed")
+    report = import_catalog(io.BytesIO(text.encode()), "csv")
+    assert (report.error_count, report.products_updated, report.variants) == (0, 2, 1)
+    assert Product.objects.get(pk=newer.pk).title == "Trail Shoe"
+
+
+def test_export_is_admin_only(user, product):
+    client = APIClient()
+    assert client.get("/api/products/export/").status_code in (401, 403)
+    client.force_authenticate(user)
+    assert client.get("/api/products/export/").status_code == 403
+
+
+def test_exports_leave_rows_that_may_still_be_committing_for_the_next_one(admin_client, product, settings):
+    settings.EXPORT_SETTLE_SECONDS = 60
+    since = (timezone.now() - timedelta(days=2)).isoformat()
+    Product.objects.filter(pk=product.pk).update(updated_at=timezone.now() - timedelta(days=1))
+    recent = Product.objects.create(title="Trail Shoe", sku="SKU-002", price="50.00")
+
+    response = admin_client.get("/api/products/export/", {"updated_since": since})
+    assert [json.loads(line)["sku"] for line in _content(response).splitlines()] == ["SKU-001"]
+    Product.objects.filter(pk=recent.pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+    response = admin_client.get("/api/products/export/", {"updated_since": since})
+    assert [json.loads(line)["sku"] for line in _content(response).splitlines()] == ["SKU-001", "SKU-002"]
@@ -0,0 +1,104 @@
+import io
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+from rest_framework.test import APIClient
+
+from Product.images import DERIVATIVES, MODERN_FORMATS, render_derivatives
+from Product.models import CatalogChange, Product, ProductImage
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_DERIVATIVE_WORKERS = 0
+    return tmp_path
+
+
+def _image_bytes(size=(2000, 1000), mode="RGB", fmt="JPEG"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, "red" if mode == "RGB" else (255, 0, 0, 128)).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def _upload(product, data, name="shoe.jpg"):
+    return ProductImage.objects.create(product=product, image=SimpleUploadedFile(name, data))
+
+
+def test_render_derivatives_keeps_aspect_ratio_and_never_upscales():
+    rendered = render_derivatives(_image_bytes(size=(1000, 500)))
+
+    assert list(rendered) == list(DERIVATIVES)
+    assert (rendered["zoom"]["width"], rendered["zoom"]["height"]) == (1000, 500)
+    assert (rendered["card"]["width"], rendered["card"]["height"]) == (480, 240)
+    assert (rendered["thumbnail"]["width"], rendered["thumbnail"]["height"]) == (160, 80)
+    assert set(rendered["card"]["files"]) == {"jpeg", *MODERN_FORMATS}
+    assert Image.open(io.BytesIO(rendered["card"]["files"]["jpeg"])).size == (480, 240)
+
+
+def test_render_derivatives_keeps_transparency_as_png():
+    rendered = render_derivatives(_image_bytes(mode="RGBA", fmt="PNG"))
+
+    assert "png" in rendered["thumbnail"]["files"] and "jpeg" not in rendered["thumbnail"]["files"]
+    assert Image.open(io.BytesIO(rendered["thumbnail"]["files"]["png"])).mode == "RGBA"
+
+
+def test_upload_renders_derivatives_after_commit(product, media, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        image = _upload(product, _image_bytes())
+
+    image.refresh_from_db()
+    card = image.derivatives["card"]
+    assert (card["width"], card["height"]) == (480, 240)
+    assert (media / card["jpeg"]).exists()
+    if "webp" in MODERN_FORMATS:
+        assert card["webp"].endswith(".webp")
+    # One entry for the upload, one for its derivatives.
+    assert CatalogChange.objects.filter(object_id=product.pk, data__fields=["images"]).count() == 2
+
+    listing = Product.objects.with_listing_summary().get(pk=product.pk)
+    response = APIClient().get("/api/products/")
+    row = next(row for row in response.json()["results"] if row["id"] == str(product.pk))
+    assert set(row["primary_image_sizes"]) == {"card", "thumbnail"}
+    assert row["primary_image_sizes"]["card"]["jpeg"].endswith(card["jpeg"])
+    assert listing.primary_image_derivatives["card"]["jpeg"] == card["jpeg"]
+
+
+def test_replacing_and_deleting_an_image_removes_old_derivatives(product, media, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        image = _upload(product, _image_bytes())
+    image.refresh_from_db()
+    old = image.derivatives["thumbnail"]["jpeg"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        image.image = SimpleUploadedFile("boot.jpg", _image_bytes(size=(300, 300)))
+        image.save()
+    image.refresh_from_db()
+    assert not (media / old).exists()
+    assert image.derivatives["zoom"]["width"] == 300
+
+    current = image.derivatives["thumbnail"]["jpeg"]
+    with django_capture_on_commit_callbacks(execute=True):
+        image.delete()
+    assert not (media / current).exists()
+
+
+def test_unreadable_image_is_skipped(product, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        image = _upload(product, b"not an image")
+
+    image.refresh_from_db()
+    assert image.derivatives == {}
+
+
+def test_generate_image_derivatives_command(product, capsys):
+    image = _upload(product, _image_bytes(size=(400, 400)))
+    assert image.derivatives == {}
+
+    call_command("generate_image_derivatives", "--missing-only", "--workers", "0")
+
+    image.refresh_from_db()
+    assert image.derivatives["zoom"]["width"] == 400
+    assert "1 of 1 images" in capsys.readouterr().out
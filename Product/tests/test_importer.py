@@ -0,0 +1,163 @@
+import io
+import json
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from Product.importer import import_catalog
+from Product.models import CatalogChange, Category, Product, Variant
+from Product.search import get_search_backend
+from Product.tree import get_category_tree
+
+CSV = """sku,title,price,stock,categories,variant_sku,variant_name,variant_price,variant_stock
+TEE-1,Plain Tee,12.00,0,Shirts|Basics,TEE-1-S,Small,,4
+TEE-1,Plain Tee,12.00,0,Shirts|Basics,TEE-1-L,Large,14.50,2
+CAP-1,Cap,9.99,7,Hats,,,,
+BAD-1,,oops,,,,,,
+"""
+
+
+def _import_csv(text, **kwargs):
+    return import_catalog(io.BytesIO(text.encode()), "csv", **kwargs)
+
+
+def test_csv_import_upserts_products_variants_and_categories(db):
+    report = _import_csv(CSV)
+
+    assert (report.rows, report.products_created, report.variants, report.categories_created) == (4, 2, 2, 3)
+    assert [error["line"] for error in report.errors] == [5]
+    tee = Product.objects.get(sku="TEE-1")
+    assert tee.slug == "plain-tee"
+    assert set(tee.category.values_list("slug", flat=True)) == {"shirts", "basics"}
+    assert (tee.min_price, tee.max_price, tee.available_stock) == (Decimal("12.00"), Decimal("14.50"), 6)
+    assert Variant.objects.get(sku="TEE-1-S").price is None
+    assert tee.pk in get_search_backend().search("plain tee", 10)
+
+    update = "sku,title,price,stock,categories\nTEE-1,Plain Tee v2,11.00,0,Basics\n"
+    report = _import_csv(update)
+    tee.refresh_from_db()
+    assert (report.products_created, report.products_updated) == (0, 1)
+    assert (tee.title, tee.slug, tee.min_price) == ("Plain Tee v2", "plain-tee", Decimal("11.00"))
+    assert list(tee.category.values_list("slug", flat=True)) == ["basics"]
+    assert Variant.objects.filter(product=tee).count() == 2
+
+
+def test_jsonl_import_in_chunks_reports_progress_and_errors(db):
+    lines = [json.dumps({"sku": f"SKU-{n}", "title": "Same Title", "price": "5.00", "categories": ["Bulk"]}) for n in range(25)]
+    lines.insert(3, "{not json")
+    lines.append(json.dumps({"sku": "MISSING", "variants": [{"sku": "MISSING-1", "name": "One"}]}))
+    seen = []
+
+    report = import_catalog(io.StringIO("\n".join(lines)), "jsonl", chunk_size=10, progress=lambda r: seen.append(r.rows))
+
+    assert seen == [10, 20, 27]
+    assert report.products_created == 25
+    assert [error["line"] for error in report.errors] == [4, 27]
+    assert Product.objects.filter(slug__startswith="same-title").count() == 25
+    assert Category.objects.get(slug="bulk").products.count() == 25
+
+
+def test_categories_are_counted_and_visible_per_chunk(db, monkeypatch):
+    csv = "sku,title,price,categories\nA-1,A,1.00,Hats\nB-1,B,2.00,Shirts|Raced\n"
+    real_bulk_create = Category.objects.bulk_create
+
+    def racing_bulk_create(objs, **kwargs):
+        if any(category.slug == "raced" for category in objs):
+            # A concurrent writer inserts one of the slugs first.
+            Category(name="Raced", slug="raced").save()
+        return real_bulk_create(objs, **kwargs)
+
+    monkeypatch.setattr(Category.objects, "bulk_create", racing_bulk_create)
+    tree_slugs = []
+    report = _import_csv(csv, chunk_size=1, progress=lambda r: tree_slugs.append(set(get_category_tree()["slugs"])))
+
+    assert report.categories_created == 2
+    created = CatalogChange.objects.filter(entity=CatalogChange.Entity.CATEGORY, action=CatalogChange.Action.CREATED)
+    raced = Category.objects.get(slug="raced")
+    # Only the writer that inserted it logs it.
+    assert created.filter(object_id=raced.pk).count() == 1 and created.count() == 3
+    # The tree cached after the first chunk does not hide the second chunk's categories.
+    assert tree_slugs[0] == {"hats"} and tree_slugs[1] >= {"hats", "shirts", "raced"}
+
+
+def test_updates_only_write_the_fields_a_row_gives(db, product, variant):
+    Product.objects.filter(pk=product.pk).update(description="Leather", stock=7, is_active=False)
+    report = _import_csv(
+        "sku,title,price,variant_sku,variant_name\n"
+        f"{product.sku},Renamed,90.00,{variant.sku},Size 42 / Black\n"
+    )
+
+    assert (report.products_updated, report.variants) == (1, 1)
+    product.refresh_from_db()
+    variant.refresh_from_db()
+    assert (product.title, product.price) == ("Renamed", Decimal("90.00"))
+    assert (product.description, product.stock, product.is_active, product.currency) == ("Leather", 7, False, "USD")
+    assert (variant.name, variant.price, variant.stock, variant.is_active) == ("Size 42 / Black", Decimal("109.99"), 5, True)
+
+    _import_csv(f"sku,title,price,stock,variant_sku,variant_name,variant_stock\n{product.sku},Renamed,90.00,0,{variant.sku},Big,1\n")
+    product.refresh_from_db()
+    variant.refresh_from_db()
+    assert (product.stock, product.description, variant.stock) == (0, "Leather", 1)
+
+
+def test_new_products_never_overwrite_a_concurrently_inserted_slug_or_sku(db, monkeypatch):
+    real_bulk_create = Product.objects.bulk_create
+    racers = []
+
+    def racing_bulk_create(objs, **kwargs):
+        if not racers:
+            # A concurrent writer commits one product with the same slug and one with the same sku.
+            racers.append(Product.objects.create(title="Boot", price="70.00", sku="OTHER-1", stock=3))
+            racers.append(Product.objects.create(title="Sneaker", price="40.00", sku="SNEAKER-1", stock=4))
+        return real_bulk_create(objs, **kwargs)
+
+    monkeypatch.setattr(Product.objects, "bulk_create", racing_bulk_create)
+    report = _import_csv("sku,title,price\nBOOT-1,Boot,80.00\nSNEAKER-1,Sneaker,45.00\n")
+
+    assert (report.products_created, report.products_updated, report.error_count) == (1, 1, 0)
+    boot, other = Product.objects.get(sku="BOOT-1"), Product.objects.get(sku="OTHER-1")
+    assert (other.slug, other.price, boot.slug) == ("boot", Decimal("70.00"), "boot-1")
+    sneaker = Product.objects.get(sku="SNEAKER-1")
+    assert (sneaker.pk, sneaker.price, sneaker.stock) == (racers[1].pk, Decimal("45.00"), 4)
+
+
+def test_moving_a_variant_refreshes_the_product_it_left(db, product, variant):
+    Product.objects.filter(pk=product.pk).refresh_summaries()
+    _import_csv(f"sku,title,price,variant_sku,variant_name\nNEW-1,New,20.00,{variant.sku},Moved\n")
+
+    product.refresh_from_db()
+    assert Variant.objects.get(pk=variant.pk).product.sku == "NEW-1"
+    assert (product.min_price, product.max_price) == (Decimal("99.99"), Decimal("99.99"))
+
+
+def test_imported_categories_match_the_slugs_of_api_created_ones(db):
+    name = "Outdoor Clothing and Accessories for Every Season"
+    category = Category.objects.create(name=name)
+    report = _import_csv(f"sku,title,price,categories\nJACKET-1,Jacket,80.00,{name}\n")
+
+    assert report.categories_created == 0
+    assert list(Product.objects.get(sku="JACKET-1").category.all()) == [category]
+
+
+def test_import_command_and_admin_endpoint(db, tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text(CSV)
+    call_command("import_catalog", str(path))
+    assert Product.objects.count() == 2
+
+    client = APIClient()
+    client.force_authenticate(get_user_model().objects.create_user(email="a@example.com", first_name="A", last_name="B", password="x"))
+    upload = SimpleUploadedFile("catalog.jsonl", b'{"sku": "CAP-1", "title": "Cap", "price": "8.00", "stock": 3}\n')
+    assert client.post("/api/products/import/", {"file": upload}).status_code == 403
+
+    admin = get_user_model().objects.create_user(email="admin@example.com", first_name="A", last_name="B", password="x", is_staff=True)
+    client.force_authenticate(admin)
+    upload.seek(0)
+    response = client.post("/api/products/import/", {"file": upload})
+    assert response.status_code == 200, response.data
+    assert response.data["products_updated"] == 1
+    assert Product.objects.get(sku="CAP-1").price == Decimal("8.00")
@@ -1,4 +1,11 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
 import pytest
+from django.core.exceptions import ValidationError
+
+from Order.stock import reserve_stock, restore_stock
+from Product.models import Category, Variant
 
 
 def test_category_slug_autogenerates(category):
@@ -15,3 +22,59 @@ def test_variant_price_fallback_to_product_price(product, variant):
     assert variant.get_price() == product.price
 
 
+
+
+def _summary(product):
+    product.refresh_from_db()
+    return product.min_price, product.max_price, product.available_stock, product.active_variant_count
+
+
+def test_product_summary_without_variants_uses_the_product(product):
+    assert _summary(product) == (Decimal("99.99"), Decimal("99.99"), 10, 0)
+
+
+def test_product_summary_follows_variant_changes(product, variant):
+    assert _summary(product) == (Decimal("109.99"), Decimal("109.99"), 5, 1)
+    cheap = Variant.objects.create(product=product, name="Size 40", sku="SKU-001-40", stock=2)  # product price
+    assert _summary(product) == (Decimal("99.99"), Decimal("109.99"), 7, 2)
+    product.price = Decimal("80.00")
+    product.save()
+    assert (product.min_price, product.max_price) == (Decimal("80.00"), Decimal("109.99"))
+    cheap.is_active = False
+    cheap.save()
+    assert _summary(product) == (Decimal("109.99"), Decimal("109.99"), 5, 1)
+    variant.delete()
+    assert _summary(product) == (Decimal("80.00"), Decimal("80.00"), 10, 0)
+
+
+def test_product_summary_follows_stock_reservations(product, variant):
+    line = SimpleNamespace(pk=1, product_id=product.pk, variant_id=variant.pk, quantity=2)
+    reserve_stock([line])
+    assert _summary(product)[2] == 3
+    restore_stock([line])
+    assert _summary(product)[2] == 5
+
+
+def _paths(*categories):
+    return [Category.objects.values_list("path", "depth").get(pk=c.pk) for c in categories]
+
+
+def test_category_paths_follow_moves_and_deletes(category):
+    running = Category.objects.create(name="Running", parent=category)
+    trail = Category.objects.create(name="Trail", parent=running)
+    sale = Category.objects.create(name="Sale")
+    root, mid, leaf = (f"/{category.pk.hex}/", f"{running.pk.hex}/", f"{trail.pk.hex}/")
+    assert _paths(category, running, trail) == [(root, 0), (root + mid, 1), (root + mid + leaf, 2)]
+
+    running.parent = sale
+    running.save()
+    moved = f"/{sale.pk.hex}/{mid}"
+    assert _paths(running, trail) == [(moved, 1), (moved + leaf, 2)]
+    assert set(Category.objects.subtree(f"/{sale.pk.hex}/")) == {sale, running, trail}
+
+    sale.parent = trail
+    with pytest.raises(ValidationError):
+        sale.save()
+
+    Category.objects.get(pk=sale.pk).delete()
+    assert _paths(running, trail) == [(f"/{mid}", 0), (f"/{mid}{leaf}", 1)]
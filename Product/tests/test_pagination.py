@@ -0,0 +1,68 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from Product.models import Product
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def products(db):
+    # Repeated prices make sure ties are broken by id rather than skipped.
+    return [
+        Product.objects.create(title=f"Sock {i}", price=f"{5 + i % 4}.00", sku=f"SOCK-{i}", stock=1)
+        for i in range(30)
+    ]
+
+
+def _walk(api_client, url):
+    pages = []
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == 200
+        assert "count" not in response.data
+        pages.append(response.data)
+        url = response.data["next"]
+    return pages
+
+
+@pytest.mark.parametrize("ordering", ["price", "-price", "created_at", "-created_at"])
+def test_cursor_walk_returns_every_product_once_in_order(api_client, products, ordering):
+    pages = _walk(api_client, f"/api/products/?ordering={ordering}&cursor=")
+    ids = [row["id"] for page in pages for row in page["results"]]
+    assert len(pages) == 3
+    assert sorted(ids) == sorted(str(p.pk) for p in products)
+
+    tie_breaker = "-id" if ordering.startswith("-") else "id"
+    assert ids == [str(p.pk) for p in Product.objects.order_by(ordering, tie_breaker)]
+
+
+def test_previous_link_returns_the_prior_page(api_client, products):
+    first = api_client.get("/api/products/?ordering=price&cursor=").data
+    second = api_client.get(first["next"]).data
+    assert first["previous"] is None
+    back = api_client.get(second["previous"]).data
+    assert [r["id"] for r in back["results"]] == [r["id"] for r in first["results"]]
+
+
+def test_cursor_pages_do_not_count(api_client, products):
+    first = api_client.get("/api/products/?cursor=").data
+    with CaptureQueriesContext(connection) as ctx:
+        api_client.get(first["next"])
+    # the catalog version (ETag), then the page
+    assert len(ctx.captured_queries) == 2
+    assert not any("COUNT(" in query["sql"].upper() for query in ctx.captured_queries)
+
+
+def test_page_number_pagination_is_still_the_default(api_client, products):
+    response = api_client.get("/api/products/?page=2")
+    assert response.data["count"] == 30
+
+
+def test_invalid_cursor_is_rejected(api_client, products):
+    assert api_client.get("/api/products/?cursor=not-a-cursor").status_code == 404
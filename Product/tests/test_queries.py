@@ -0,0 +1,89 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from Product.models import Category, Product, ProductImage, Variant
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def make_catalog(db):
+    """Create ``count`` products, each with a category, two images and two variants."""
+    def make(count, prefix="TRAIL"):
+        category = Category.objects.create(name=f"Catalog {prefix}")
+        products = []
+        for idx in range(count):
+            product = Product.objects.create(
+                title=f"Trail Shoe {idx}",
+                description="Grippy trail shoe",
+                price="50.00",
+                sku=f"{prefix}-{idx}",
+                stock=3,
+            )
+            product.category.add(category)
+            for order in range(2):
+                ProductImage.objects.create(product=product, image=f"products/trail-{idx}-{order}.jpg", order=order)
+            Variant.objects.create(product=product, name="Size 40", sku=f"{prefix}-{idx}-40", stock=1)
+            Variant.objects.create(product=product, name="Size 41", sku=f"{prefix}-{idx}-41", stock=0, is_active=False)
+            products.append(product)
+        return products
+    return make
+
+
+def _count_queries(api_client, url):
+    # Count the uncached path, not a response cached by an earlier request.
+    cache.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        response = api_client.get(url)
+    assert response.status_code == 200
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "?search=trail",
+    "?is_active=true&price_min=10&price_max=100",
+    "?ordering=price",
+    "?ordering=-created_at",
+    "?ordering=title",
+    "?title=shoe",
+])
+def test_list_query_count_is_constant(api_client, make_catalog, query, settings):
+    # Sync the search index on every request, so both counts include it.
+    settings.PRODUCT_SEARCH_SYNC_SECONDS = 0
+    make_catalog(2)
+    # Warm-up request: the in-process search backend loads its index lazily.
+    api_client.get(f"/api/products/{query}")
+    small = _count_queries(api_client, f"/api/products/{query}")
+    make_catalog(10, prefix="ROAD")
+    large = _count_queries(api_client, f"/api/products/{query}")
+    assert small == large
+
+
+def test_list_query_count(api_client, make_catalog, django_assert_num_queries):
+    make_catalog(12)
+    # catalog version (ETag), count, then one annotated page of products
+    with django_assert_num_queries(3):
+        response = api_client.get("/api/products/")
+    assert len(response.data["results"]) == 12
+
+
+def test_detail_query_count(api_client, make_catalog, django_assert_num_queries):
+    product = make_catalog(1)[0]
+    # updated_at (ETag), then the product and its prefetches
+    with django_assert_num_queries(5):
+        response = api_client.get(f"/api/products/{product.pk}/")
+    assert response.status_code == 200
+
+
+def test_prefetch_only_active_variants_and_ordered_images(api_client, make_catalog):
+    product = make_catalog(1)[0]
+    response = api_client.get(f"/api/products/{product.pk}/")
+    assert [v["name"] for v in response.data["variants"]] == ["Size 40"]
+    assert [img["order"] for img in response.data["images"]] == [0, 1]
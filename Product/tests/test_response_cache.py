@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import mixins
+from rest_framework.test import APIClient
+
+from Product import response_cache
+from Product.models import Product, ProductImage
+
+
+def _queries(client, url, **extra):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url, **extra)
+    assert response.status_code == 200
+    return response, len(ctx.captured_queries)
+
+
+def test_anonymous_responses_are_cached_per_normalized_query(product, variant, user):
+    client = APIClient()
+    first, _ = _queries(client, "/api/products/?search=running&ordering=price")
+    # Only the ETag version lookup; the body comes from the cache.
+    second, queries = _queries(client, "/api/products/?ordering=price&search=running")
+    assert queries == 1
+    assert second.content == first.content and second["Content-Type"] == first["Content-Type"]
+    assert response_cache.cache_stats()["hits"] == 1
+
+    client.force_authenticate(user)
+    _, queries = _queries(client, "/api/products/?ordering=price&search=running")
+    assert queries > 1
+
+
+def test_responses_are_cached_per_host_and_scheme(product, settings):
+    settings.ALLOWED_HOSTS = ["shop.example", "cdn-origin.example"]
+    ProductImage.objects.create(product=product, image="products/running-shoe.jpg")
+    client = APIClient()
+
+    def primary_image(**extra):
+        return client.get("/api/products/", **extra).json()["results"][0]["primary_image"]
+
+    assert primary_image(HTTP_HOST="shop.example").startswith("http://shop.example/")
+    assert primary_image(HTTP_HOST="cdn-origin.example").startswith("http://cdn-origin.example/")
+    assert primary_image(HTTP_HOST="shop.example", secure=True).startswith("https://shop.example/")
+    assert primary_image(HTTP_HOST="shop.example").startswith("http://shop.example/")
+    assert response_cache.cache_stats()["hits"] == 1
+
+
+def test_catalog_changes_invalidate_only_the_tags_they_touch(product, variant, category):
+    other = Product.objects.create(title="Sandal", price="20.00", sku="SANDAL-1", stock=2)
+    client = APIClient()
+    urls = ["/api/products/", f"/api/products/{product.pk}/", f"/api/products/{other.pk}/", f"/api/variants/{variant.pk}/"]
+    for url in urls:
+        client.get(url)
+
+    variant.stock = 2
+    variant.save()
+    cached = {url: _queries(client, url)[1] <= 1 for url in urls}
+    assert cached == {urls[0]: False, urls[1]: False, urls[2]: True, urls[3]: False}
+    assert client.get(urls[3]).json()["stock"] == 2
+
+    category.name = "Footwear"
+    category.save()
+    assert client.get(urls[1]).json()["category"][0]["name"] == "Footwear"
+    assert _queries(client, urls[2])[1] > 1
+
+
+def test_a_held_lock_serves_the_stale_entry_or_waits_for_the_rebuild(product, monkeypatch):
+    monkeypatch.setattr(response_cache, "_cache_key", lambda request: response_cache.KEY_PREFIX + "test")
+    monkeypatch.setattr(response_cache, "LOCK_WAIT", 0.1)
+    client = APIClient()
+    old = client.get("/api/products/")
+    Product.objects.filter(pk=product.pk).update(title="Renamed")
+    response_cache.invalidate_tags(["products"])
+    cache.add(response_cache.KEY_PREFIX + "test:lock", 1)
+
+    assert client.get("/api/products/").content == old.content
+    cache.delete(response_cache.KEY_PREFIX + "test")
+    assert b"Renamed" in client.get("/api/products/").content
+    assert response_cache.cache_stats() | {"hit_ratio": None} == {"hits": 0, "misses": 2, "stale": 1, "waits": 0, "hit_ratio": None}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_a_cold_key_is_built_by_one_of_many_concurrent_requests(product, monkeypatch):
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        pytest.skip("threads need a shared database")
+    original = mixins.ListModelMixin.list
+
+    def slow_list(self, request, *args, **kwargs):
+        time.sleep(0.3)
+        return original(self, request, *args, **kwargs)
+
+    monkeypatch.setattr(mixins.ListModelMixin, "list", slow_list)
+    barrier = threading.Barrier(6)
+    statuses = []
+
+    def get():
+        barrier.wait()
+        try:
+            statuses.append(APIClient().get("/api/products/").status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=get) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200] * 6
+    stats = response_cache.cache_stats()
+    assert (stats["misses"], stats["waits"]) == (1, 5)
+
+
+def test_cache_stats_endpoint_is_admin_only(product):
+    client = APIClient()
+    client.get("/api/products/")
+    client.get("/api/products/")
+    assert client.get("/api/cache-stats/").status_code in (401, 403)
+    client.force_authenticate(get_user_model().objects.create_user(
+        email="admin@example.com", first_name="A", last_name="B", password="x", is_staff=True,
+    ))
+    data = client.get("/api/cache-stats/").data
+    assert (data["hits"], data["misses"], data["hit_ratio"]) == (1, 1, 0.5)
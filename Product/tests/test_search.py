@@ -0,0 +1,128 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from Product.models import Category, Product, ProductSearchDocument, Variant
+from Product.search import InMemorySearchBackend, tokenize
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def catalog(db, category):
+    jacket = Product.objects.create(title="Rain Jacket", description="Waterproof shell", price="80.00", sku="JKT-1")
+    boots = Product.objects.create(title="Hiking Boots", description="Leather boots for rain", price="120.00", sku="BOOT-1")
+    running = Product.objects.create(title="Running Shoe Pro", description="Fast", price="150.00", sku="RUN-2")
+    running.category.add(category)
+    Variant.objects.create(product=boots, name="Midnight Blue", sku="BOOT-1-BLUE")
+    return {"jacket": jacket, "boots": boots, "running": running}
+
+
+def _ids(response):
+    return [row["id"] for row in response.data["results"]]
+
+
+def test_tokenize_lowercases_and_splits():
+    assert tokenize("Size-42 / BLUE") == ["size", "42", "blue"]
+
+
+def test_search_document_is_maintained(catalog, category):
+    document = ProductSearchDocument.objects.get(product=catalog["boots"])
+    assert "Midnight Blue" in document.body
+    assert category.name in ProductSearchDocument.objects.get(product=catalog["running"]).body
+
+
+def test_title_matches_rank_above_description_matches(api_client, catalog):
+    response = api_client.get("/api/products/?search=rain")
+    assert _ids(response) == [str(catalog["jacket"].pk), str(catalog["boots"].pk)]
+
+
+def test_search_matches_prefixes_variants_and_categories(api_client, catalog, product):
+    assert _ids(api_client.get("/api/products/?search=midn")) == [str(catalog["boots"].pk)]
+    assert str(catalog["running"].pk) in _ids(api_client.get("/api/products/?search=shoes"))
+
+
+def test_all_terms_must_match(api_client, catalog):
+    assert _ids(api_client.get("/api/products/?search=running fast")) == [str(catalog["running"].pk)]
+    assert _ids(api_client.get("/api/products/?search=running leather")) == []
+
+
+def test_explicit_ordering_overrides_relevance(api_client, catalog):
+    response = api_client.get("/api/products/?search=rain&ordering=-price")
+    assert _ids(response) == [str(catalog["boots"].pk), str(catalog["jacket"].pk)]
+
+
+def test_index_follows_renames_and_deletes(api_client, catalog):
+    catalog["jacket"].title = "Storm Parka"
+    catalog["jacket"].save()
+    assert _ids(api_client.get("/api/products/?search=parka")) == [str(catalog["jacket"].pk)]
+    catalog["boots"].delete()
+    assert _ids(api_client.get("/api/products/?search=boots")) == []
+
+
+def test_category_rename_reindexes_its_products(api_client, catalog):
+    category = Category.objects.create(name="Outerwear")
+    catalog["jacket"].category.add(category)
+    category.name = "Layers"
+    category.save()
+    assert _ids(api_client.get("/api/products/?search=layers")) == [str(catalog["jacket"].pk)]
+
+
+def test_autocomplete_endpoint(api_client, catalog):
+    response = api_client.get("/api/products/autocomplete/?q=hik")
+    assert [row["title"] for row in response.data] == ["Hiking Boots"]
+
+
+def test_in_memory_backend_ranking():
+    backend = InMemorySearchBackend()
+    backend._loaded = True
+    backend.index([
+        ProductSearchDocument(product_id=1, title="Red Run", body="cotton"),
+        ProductSearchDocument(product_id=2, title="Blue", body="red running"),
+    ])
+    assert backend.search("red", 10) == [1, 2]
+    assert backend.search("run", 10) == [1, 2]
+    assert backend.autocomplete("red ru", 10) == [1]
+    backend.remove([1])
+    assert backend.search("red", 10) == [2]
+
+
+def test_in_memory_backend_picks_up_writes_from_other_processes(catalog, settings):
+    settings.PRODUCT_SEARCH_SYNC_SECONDS = 0
+    # A second backend stands in for another worker: it never sees this process's index() calls.
+    other = InMemorySearchBackend()
+    assert other.search("parka", 10) == []
+
+    catalog["jacket"].title = "Storm Parka"
+    catalog["jacket"].save()
+    catalog["boots"].delete()
+
+    assert other.search("parka", 10) == [catalog["jacket"].pk]
+    assert other.search("boots", 10) == []
+
+
+def test_truncated_search_results_are_reported(api_client, catalog, settings):
+    # Drop documents of earlier tests' rolled-back products from the shared index.
+    settings.PRODUCT_SEARCH_SYNC_SECONDS = 0
+    settings.PRODUCT_SEARCH_MAX_RESULTS = 1
+    response = api_client.get("/api/products/?search=rain")
+    assert response["X-Search-Truncated"] == "true"
+    assert _ids(response) == [str(catalog["jacket"].pk)]
+
+    settings.PRODUCT_SEARCH_MAX_RESULTS = 2
+    cache.clear()  # the anonymous response is cached
+    assert not api_client.get("/api/products/?search=rain").has_header("X-Search-Truncated")
+
+
+def test_relevance_ordered_search_asks_for_an_ordering_to_use_a_cursor(api_client, catalog, settings):
+    settings.PRODUCT_SEARCH_SYNC_SECONDS = 0
+    response = api_client.get("/api/products/?search=rain&cursor=")
+    assert response.status_code == 400
+    assert "ordering" in str(response.data["cursor"])
+
+    response = api_client.get("/api/products/?search=rain&cursor=&ordering=price")
+    assert response.status_code == 200, response.data
+    assert response.data["results"]
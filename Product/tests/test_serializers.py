@@ -1,5 +1,6 @@
 import pytest
-from Product.serializer import ProductListSerializer, CategorySerializer, VariantSerializer
+from Product.models import Product, ProductImage
+from Product.serializer import ProductListSerializer, ProductDetailSerializer, CategorySerializer, VariantSerializer
 
 
 def test_category_serializer_fields(category):
@@ -7,14 +8,26 @@ def test_category_serializer_fields(category):
     assert set(serializer.data.keys()) >= {"id", "name", "slug", "parent", "description"}
 
 
-def test_product_list_serializer_relations(product, variant):
-    serializer = ProductListSerializer(instance=product)
+def test_product_detail_serializer_relations(product, variant):
+    serializer = ProductDetailSerializer(instance=product)
     data = serializer.data
     assert "images" in data
     assert "variants" in data
     assert isinstance(data["category"], list)
 
 
+def test_product_list_serializer_is_compact(product, variant):
+    ProductImage.objects.create(product=product, image="products/running-shoe.jpg")
+    instance = Product.objects.with_listing_summary().get(pk=product.pk)
+    data = ProductListSerializer(instance=instance).data
+    assert set(data.keys()) == {
+        "id", "title", "slug", "price", "currency", "primary_image", "primary_image_sizes", "min_price", "max_price", "in_stock",
+    }
+    assert data["primary_image"].endswith("products/running-shoe.jpg")
+    assert data["min_price"] == data["max_price"] == "109.99"
+    assert data["in_stock"] is True
+
+
 def test_variant_serializer_fields(variant):
     serializer = VariantSerializer(instance=variant)
     assert set(serializer.data.keys()) >= {"id", "product", "name", "sku", "price", "stock", "is_active"}
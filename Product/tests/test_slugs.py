@@ -0,0 +1,59 @@
+import pytest
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+from Product import slugs
+from Product.models import Category, Product
+from Product.slugs import assign_slugs, next_free_slug
+
+
+def _create(n, title="Trail Runner"):
+    return Product.objects.create(title=title, price="10.00", sku=f"TRAIL-{n}", stock=1)
+
+
+def test_identical_titles_get_numbered_slugs(db):
+    assert [_create(n).slug for n in range(4)] == ["trail-runner", "trail-runner-1", "trail-runner-2", "trail-runner-3"]
+    assert _create(10, "Trail Runner 2").slug == "trail-runner-2-1"
+    assert _create(11, "Trail").slug == "trail"
+
+
+def test_slug_allocation_is_one_query_whatever_the_number_of_duplicates(db):
+    _create(0)
+    assert next_free_slug(Product, "trail-runner") == "trail-runner-1"
+    for n in range(1, 30):
+        _create(n)
+    with CaptureQueriesContext(connection) as ctx:
+        assert next_free_slug(Product, "trail-runner") == "trail-runner-30"
+    assert len(ctx.captured_queries) == 1
+
+
+def test_save_retries_when_a_concurrent_writer_took_the_slug(db, monkeypatch):
+    _create(0)
+    proposals = iter(["trail-runner", "trail-runner-1"])
+    monkeypatch.setattr(slugs, "next_free_slug", lambda model, base, field="slug": next(proposals))
+    assert _create(1).slug == "trail-runner-1"
+
+
+def test_other_integrity_errors_are_not_retried(db):
+    _create(0)
+    product = Product(title="Another Title", price="10.00", sku="TRAIL-0", stock=1)  # duplicate sku
+    with pytest.raises(IntegrityError):
+        product.save()
+    assert product.slug == ""
+
+
+def test_category_slugs_fit_the_field(db):
+    name = "Outdoor " * 12
+    first, second = Category.objects.create(name=name[:100]), Category.objects.create(name=name[:100])
+    assert len(second.slug) <= Category._meta.get_field("slug").max_length
+    assert second.slug == f"{first.slug}-1"
+
+
+def test_assign_slugs_numbers_a_batch_after_existing_rows(db):
+    _create(0)
+    _create(1)
+    batch = [Product(title=title, price="1.00", sku=f"BULK-{n}") for n, title in enumerate(["Trail Runner", "Trail Runner", "Sandal", "Sandal"])]
+    with CaptureQueriesContext(connection) as ctx:
+        assign_slugs(batch, lambda product: product.title)
+    assert len(ctx.captured_queries) == 1
+    assert [product.slug for product in batch] == ["trail-runner-2", "trail-runner-3", "sandal", "sandal-1"]
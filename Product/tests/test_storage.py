@@ -0,0 +1,130 @@
+import hashlib
+import io
+
+import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from Product import images, storage
+from Product.models import Product, ProductImage
+from Product.storage import derivative_files
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_DERIVATIVE_WORKERS = 0
+    return tmp_path
+
+
+def _jpeg(color="green"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (600, 400), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def other_product(category):
+    return Product.objects.create(title="Trail Shoe", description="Grippy", price="79.00", sku="SKU-002")
+
+
+def _upload(product, data, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        image = ProductImage.objects.create(product=product, image=SimpleUploadedFile("supplier.jpg", data))
+    image.refresh_from_db()
+    return image
+
+
+def test_identical_uploads_share_one_file_and_its_derivatives(
+    product, other_product, media, monkeypatch, django_capture_on_commit_callbacks,
+):
+    data = _jpeg()
+    first = _upload(product, data, django_capture_on_commit_callbacks)
+    digest = hashlib.sha256(data).hexdigest()
+    assert first.image.name == f"products/{digest[:2]}/{digest}.jpg"
+
+    monkeypatch.setattr(images, "render_derivatives", lambda data: pytest.fail("rendered again"))
+    second = _upload(other_product, data, django_capture_on_commit_callbacks)
+
+    assert second.image.name == first.image.name
+    assert second.derivatives == first.derivatives
+    assert len([path for path in (media / "products").rglob("*.jpg")]) == 1 + len(images.DERIVATIVES)
+
+
+def test_files_are_deleted_with_their_last_reference(
+    product, other_product, media, monkeypatch, django_capture_on_commit_callbacks,
+):
+    data = _jpeg()
+    first = _upload(product, data, django_capture_on_commit_callbacks)
+    second = _upload(other_product, data, django_capture_on_commit_callbacks)
+    files = [first.image.name, *derivative_files(first.derivatives)]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert all((media / name).exists() for name in files)
+
+    # The second upload reused the file: within its grace period no worker deletes it,
+    # whatever its cache holds.
+    cache.clear()
+    with django_capture_on_commit_callbacks(execute=True):
+        second.delete()
+    assert all((media / name).exists() for name in files)
+
+    second = _upload(other_product, data, django_capture_on_commit_callbacks)
+    monkeypatch.setattr(storage, "REUSE_GRACE", 0)
+    with django_capture_on_commit_callbacks(execute=True):
+        second.delete()
+    assert not any((media / name).exists() for name in files)
+
+
+def test_originals_with_the_same_pixels_do_not_share_derivatives(
+    product, other_product, media, django_capture_on_commit_callbacks,
+):
+    plain = io.BytesIO()
+    Image.new("RGB", (600, 400), "green").save(plain, format="PNG")
+    tagged = io.BytesIO()
+    metadata = PngInfo()
+    metadata.add_text("Source", "supplier")
+    Image.new("RGB", (600, 400), "green").save(tagged, format="PNG", pnginfo=metadata)
+    first = _upload(product, plain.getvalue(), django_capture_on_commit_callbacks)
+    second = _upload(other_product, tagged.getvalue(), django_capture_on_commit_callbacks)
+    assert first.image.name != second.image.name
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+
+    kept = derivative_files(second.derivatives)
+    assert kept and all((media / name).exists() for name in kept)
+    assert not any((media / name).exists() for name in derivative_files(first.derivatives))
+
+
+def test_hash_named_files_are_served_immutable(client, product, django_capture_on_commit_callbacks):
+    image = _upload(product, _jpeg(), django_capture_on_commit_callbacks)
+
+    response = client.get(image.image.url)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/jpeg"
+    assert "immutable" in response["Cache-Control"] and "max-age=31536000" in response["Cache-Control"]
+    assert b"".join(response.streaming_content) == image.image.read()
+
+    response = client.get(image.image.url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == 304
+    assert "immutable" in response["Cache-Control"]
+    assert client.get("/media/products/ab/" + "0" * 64 + ".jpg").status_code == 404
+
+    derivative = image.derivatives["card"]["jpeg"]
+    response = client.get(f"/media/{derivative}")
+    assert response.status_code == 200 and "immutable" in response["Cache-Control"]
+
+
+def test_prune_image_files_deletes_unreferenced_files(product, media, django_capture_on_commit_callbacks):
+    image = _upload(product, _jpeg(), django_capture_on_commit_callbacks)
+    orphan = ProductImage._meta.get_field("image").storage.save("products/orphan.jpg", SimpleUploadedFile("o.jpg", _jpeg("red")))
+
+    call_command("prune_image_files", "--min-age-hours", "0")
+
+    assert not (media / orphan).exists()
+    assert (media / image.image.name).exists()
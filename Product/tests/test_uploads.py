@@ -0,0 +1,115 @@
+import base64
+import io
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import SkipFile
+from PIL import Image
+from rest_framework.test import APIClient
+
+from Product.models import ProductImage
+from Product.serializer import ProductImageBase64Serializer
+from Product.uploads import IMAGE_MAX_SIZE, ImageUploadHandler, decode_base64_image
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_DERIVATIVE_WORKERS = 0
+
+
+@pytest.fixture
+def admin_client(db):
+    client = APIClient()
+    client.force_authenticate(get_user_model().objects.create_user(
+        email="admin@example.com", first_name="A", last_name="B", password="x", is_staff=True,
+    ))
+    return client
+
+
+def _png(size=(40, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "blue").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _product_url(product):
+    return f"http://testserver/api/products/{product.pk}/"
+
+
+def test_handler_skips_a_file_once_it_passes_the_cap():
+    handler = ImageUploadHandler(request=type("Request", (), {})())
+    handler.new_file("image", "huge.png", "image/png", None)
+    chunk = _png()[:12] + b"\0" * (64 * 1024 - 12)
+    handler.receive_data_chunk(chunk, 0)
+
+    with pytest.raises(SkipFile):
+        handler.receive_data_chunk(chunk, IMAGE_MAX_SIZE - 10)
+    assert handler.request.upload_errors == {"image": ["huge.png: Image file too large (max 5 MB)."]}
+
+
+def test_upload_rejects_oversized_and_disguised_files(admin_client, product):
+    oversized = SimpleUploadedFile("big.png", _png() + b"\0" * IMAGE_MAX_SIZE, content_type="image/png")
+    response = admin_client.post("/api/products-images/", {"product": _product_url(product), "image": oversized})
+    assert response.status_code == 400
+    assert "too large" in response.json()["image"][0]
+
+    disguised = SimpleUploadedFile("notes.png", b"#!/bin/sh\necho hello\n", content_type="image/png")
+    response = admin_client.post("/api/products-images/", {"product": _product_url(product), "image": disguised})
+    assert response.status_code == 400
+    assert "Unsupported image type" in response.json()["image"][0]
+    assert not ProductImage.objects.exists()
+
+
+def test_upload_accepts_an_image(admin_client, product):
+    upload = SimpleUploadedFile("shoe.png", _png(), content_type="application/octet-stream")
+    response = admin_client.post("/api/products-images/", {"product": _product_url(product), "image": upload})
+
+    assert response.status_code == 201
+    assert ProductImage.objects.get(product=product).image.name.endswith(".png")
+
+
+def test_bulk_upload_appends_images_in_order(admin_client, product):
+    ProductImage.objects.create(product=product, image="products/existing.png", order=3)
+    files = [SimpleUploadedFile(f"shot-{n}.png", _png()) for n in range(3)]
+    response = admin_client.post("/api/products-images/bulk/", {
+        "product": _product_url(product), "images": files, "alt_text": ["front", "side"],
+    })
+
+    assert response.status_code == 201
+    assert [row["order"] for row in response.json()] == [4, 5, 6]
+    assert [row["alt_text"] for row in response.json()] == ["front", "side", ""]
+    assert product.images.count() == 4
+
+
+def test_bulk_upload_saves_nothing_if_one_file_is_rejected(admin_client, product):
+    files = [SimpleUploadedFile("good.png", _png()), SimpleUploadedFile("bad.png", b"GIF89a not allowed here")]
+    response = admin_client.post("/api/products-images/bulk/", {"product": _product_url(product), "images": files})
+
+    assert response.status_code == 400
+    assert "bad.png" in response.json()["images"][0]
+    assert not product.images.exists()
+
+
+def test_decode_base64_image_checks_size_before_decoding():
+    upload = decode_base64_image("data:image/png;base64," + base64.b64encode(_png()).decode())
+    assert upload.name.endswith(".png") and upload.content_type == "image/png"
+    assert upload.read() == _png()
+
+    with pytest.raises(ValidationError, match="too large"):
+        # Not even valid base64: rejected on its length alone.
+        decode_base64_image("!" * (IMAGE_MAX_SIZE // 3 * 4 + 8))
+    with pytest.raises(ValidationError, match="Invalid base64"):
+        decode_base64_image("data:image/png;base64,iVBO!!!!")
+
+
+def test_base64_serializer_saves_the_image(product):
+    data = {"product": product.pk, "image": base64.b64encode(_png()).decode(), "alt_text": "side"}
+    serializer = ProductImageBase64Serializer(data=data)
+
+    assert serializer.is_valid(), serializer.errors
+    image = serializer.save()
+    assert image.image.name.endswith(".png")
+    assert Image.open(image.image.path).size == (40, 30)
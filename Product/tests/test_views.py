@@ -20,3 +20,71 @@ def test_search_products_by_title(api_client, product):
     assert any('Running' in t for t in titles)
 
 
+
+
+def test_filter_products_by_stock_and_effective_price(api_client, product, variant):
+    from Product.models import Product
+
+    sold_out = Product.objects.create(title="Sold Out", price="15.00", sku="SOLD-1", stock=0)
+
+    def titles(query):
+        response = api_client.get(f'/api/products/?{query}')
+        assert response.status_code == 200
+        return {item['title'] for item in response.data['results']}
+
+    assert titles('in_stock=true') == {'Running Shoe'}
+    assert titles('in_stock=false') == {'Sold Out'}
+    # The shoe's only variant overrides the price to 109.99.
+    assert titles('effective_price_min=100') == {'Running Shoe'}
+    assert titles('effective_price_max=100') == {'Sold Out'}
+    assert sold_out.in_stock is False
+
+
+def test_filter_products_by_category_slug_or_id(api_client, product, category):
+    from Product.models import Category, Product
+
+    Product.objects.create(title="Uncategorized", price="5.00", sku="UNCAT-1", stock=1)
+    Category.objects.create(name="Bags")
+    for value in (category.slug, str(category.pk)):
+        response = api_client.get(f'/api/products/?category={value}')
+        assert [item['title'] for item in response.data['results']] == ['Running Shoe']
+    assert api_client.get('/api/products/?category=bags').data['results'] == []
+
+
+def test_catalog_queries_are_index_backed(db):
+    from django.core.management import call_command
+
+    call_command('explain_catalog_queries', seed=300)
+
+
+def test_category_tree_endpoint_and_subtree_filter(api_client, product, category):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from Product.models import Category, Product
+
+    trail = Category.objects.create(name="Trail", parent=Category.objects.create(name="Running", parent=category))
+    boot = Product.objects.create(title="Trail Boot", price="150.00", sku="BOOT-1", stock=3)
+    boot.category.add(trail)
+    Product.objects.create(title="Tote", price="15.00", sku="TOTE-1", stock=3).category.add(Category.objects.create(name="Bags"))
+
+    tree = api_client.get('/api/categories/tree/').data
+    assert {node['name'] for node in tree} == {'Shoes', 'Bags'}
+    shoes = next(node for node in tree if node['name'] == 'Shoes')
+    assert shoes['children'][0]['name'] == 'Running'
+    assert shoes['children'][0]['children'][0]['slug'] == trail.slug
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert api_client.get('/api/categories/tree/').status_code == 200
+    assert len(ctx.captured_queries) == 0
+
+    def titles(value):
+        return {item['title'] for item in api_client.get(f'/api/products/?category_tree={value}').data['results']}
+
+    assert titles(category.slug) == {'Running Shoe', 'Trail Boot'}
+    assert titles(str(trail.pk)) == {'Trail Boot'}
+    assert titles('no-such-category') == set()
+
+    trail.parent = None
+    trail.save()
+    assert titles(category.slug) == {'Running Shoe'}
+    assert {node['name'] for node in api_client.get('/api/categories/tree/').data} == {'Shoes', 'Bags', 'Trail'}
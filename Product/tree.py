@@ -0,0 +1,88 @@
+"""
+Cached category tree.
+
+The tree is built from one query ordered by materialized path and kept in the
+Django cache until a category changes (Product.signals invalidates it). The
+entry also carries the categories' version for their ETags
+(Product.conditional), so revalidating a category resource needs no query.
+
+Invalidation only reaches the cache of the process that made the change when
+the cache is per process (LocMemCache), so every CATEGORY_TREE_CHECK_SECONDS
+a read also compares the cached version with the category change log.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import CatalogChange, Category
+
+CATEGORY_TREE_KEY = "catalog:category-tree"
+_checked_at = 0.0  # time.monotonic() of this process's last version check
+
+
+def category_version():
+    """
+    ``(token, changed_at)`` of the category change log. The token counts the
+    entries as well as naming the newest, so an entry that commits below the
+    newest one already seen still changes it.
+    """
+    log = CatalogChange.objects.filter(entity=CatalogChange.Entity.CATEGORY).aggregate(
+        newest=Max("seq"), entries=Count("seq"), last_changed=Max("changed_at"),
+    )
+    return f"{log['newest'] or 0}.{log['entries']}", log["last_changed"]
+
+
+def build_category_tree():
+    """
+    Return ``{"roots": [...], "paths": {id: path}, "slugs": {slug: id}, "version": (token, changed_at)}``
+    where every node of ``roots`` is ``{"id", "name", "slug", "description", "depth", "children"}``
+    and ``version`` is category_version().
+    """
+    roots, nodes, paths, slugs = [], {}, {}, {}
+    version = category_version()
+    # Ordering by path puts every parent before its children.
+    for category in Category.objects.order_by("path").values("id", "name", "slug", "description", "parent_id", "path", "depth"):
+        node = {
+            "id": str(category["id"]),
+            "name": category["name"],
+            "slug": category["slug"],
+            "description": category["description"],
+            "depth": category["depth"],
+            "children": [],
+        }
+        parent = nodes.get(str(category["parent_id"])) if category["parent_id"] else None
+        (parent["children"] if parent else roots).append(node)
+        nodes[node["id"]] = node
+        paths[node["id"]] = category["path"]
+        slugs[node["slug"]] = node["id"]
+    return {"roots": roots, "paths": paths, "slugs": slugs, "version": version}
+
+
+def get_category_tree():
+    global _checked_at
+    tree = cache.get(CATEGORY_TREE_KEY)
+    now = time.monotonic()
+    if tree is not None and now - _checked_at >= getattr(settings, "CATEGORY_TREE_CHECK_SECONDS", 1):
+        _checked_at = now
+        if category_version()[0] != tree["version"][0]:
+            tree = None
+    if tree is None:
+        tree = build_category_tree()
+        cache.set(CATEGORY_TREE_KEY, tree, None)
+        _checked_at = now
+    return tree
+
+
+def invalidate_category_tree():
+    cache.delete(CATEGORY_TREE_KEY)
+    transaction.on_commit(lambda: cache.delete(CATEGORY_TREE_KEY))
+
+
+def category_path(value):
+    """Materialized path of the category with id or slug ``value``, or None"""
+    tree = get_category_tree()
+    category_id = value if value in tree["paths"] else tree["slugs"].get(value)
+    return tree["paths"].get(category_id)
@@ -0,0 +1,142 @@
+"""
+Size-bounded product image uploads.
+
+ImageUploadHandler goes first in the upload handler chain of the image
+endpoints. It counts the bytes of each file and sniffs its type from the
+first bytes as they stream in. A file goes over IMAGE_MAX_SIZE, or is not
+JPEG/PNG/WebP? Then it is skipped at once: the rest of it is read and
+discarded instead of being buffered in memory or spooled to disk by the
+handlers behind it. Rejections are kept in ``request.upload_errors`` for the
+view to report.
+
+Base64ImageField is the JSON counterpart. Its size is known from the length
+of the encoded string, so an oversized image is rejected before decoding.
+Otherwise it is decoded BASE64_CHUNK characters at a time into a temporary
+file, never as one decoded copy in memory.
+"""
+import base64
+import binascii
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+from rest_framework import serializers
+
+IMAGE_MAX_SIZE = 5 * 1024 * 1024
+IMAGE_TYPES = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+# Files per request on the bulk endpoint.
+MAX_FILES = 20
+SNIFF_BYTES = 12
+# A multiple of 4, so every chunk decodes on its own.
+BASE64_CHUNK = 64 * 1024
+
+TOO_LARGE = "Image file too large (max 5 MB)."
+UNSUPPORTED = "Unsupported image type. Use JPEG/PNG/WEBP"
+
+
+def sniff_image_type(header):
+    """The MIME type of an image from its first SNIFF_BYTES bytes, or None"""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def validate_image_file(image):
+    """Size and sniffed type of an uploaded image; the client's Content-Type is not trusted"""
+    if image.size > IMAGE_MAX_SIZE:
+        raise ValidationError(TOO_LARGE)
+    image.seek(0)
+    header = image.read(SNIFF_BYTES)
+    image.seek(0)
+    if sniff_image_type(header) is None:
+        raise ValidationError(UNSUPPORTED)
+    return image
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Skips files over IMAGE_MAX_SIZE or of another type while they are uploaded"""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.files = 0
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.header = b""
+        self.files += 1
+        if self.files > MAX_FILES:
+            self._error(field_name, f"At most {MAX_FILES} files per request.")
+            raise StopUpload
+        if self.content_length is not None and self.content_length > IMAGE_MAX_SIZE:
+            self._reject(TOO_LARGE)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > IMAGE_MAX_SIZE:
+            self._reject(TOO_LARGE)
+        if len(self.header) < SNIFF_BYTES:
+            self.header = (self.header + raw_data)[:SNIFF_BYTES]
+            if len(self.header) == SNIFF_BYTES and sniff_image_type(self.header) is None:
+                self._reject(UNSUPPORTED)
+        return raw_data
+
+    def file_complete(self, file_size):
+        # Shorter than SNIFF_BYTES: left to the serializer, which rejects it.
+        return None
+
+    def _error(self, field_name, message):
+        errors = self.request.__dict__.setdefault("upload_errors", {})
+        errors.setdefault(field_name, []).append(message)
+
+    def _reject(self, message):
+        self._error(self.field_name, f"{self.file_name}: {message}")
+        raise SkipFile
+
+
+def decode_base64_image(data):
+    """A temporary file with the image in ``data`` (base64, optionally a data URI)"""
+    start = data.find(";base64,", 0, 256)
+    start = start + len(";base64,") if start >= 0 else 0
+    encoded = len(data) - start
+    if encoded % 4:
+        raise ValidationError("Invalid base64 image.")
+    size = encoded // 4 * 3 - (data.endswith("==") + data.endswith("="))
+    if size > IMAGE_MAX_SIZE:
+        raise ValidationError(TOO_LARGE)
+
+    upload = TemporaryUploadedFile("image", None, size, None)
+    try:
+        content_type = None
+        for offset in range(start, len(data), BASE64_CHUNK):
+            chunk = base64.b64decode(data[offset:offset + BASE64_CHUNK], validate=True)
+            if content_type is None:
+                content_type = sniff_image_type(chunk[:SNIFF_BYTES])
+                if content_type is None:
+                    raise ValidationError(UNSUPPORTED)
+            upload.write(chunk)
+    except binascii.Error:
+        upload.close()
+        raise ValidationError("Invalid base64 image.")
+    except ValidationError:
+        upload.close()
+        raise
+    if content_type is None:
+        upload.close()
+        raise ValidationError(UNSUPPORTED)
+    upload.seek(0)
+    upload.name = f"{uuid.uuid4().hex}.{IMAGE_TYPES[content_type]}"
+    upload.content_type = content_type
+    return upload
+
+
+class Base64ImageField(serializers.ImageField):
+    """An image sent as a base64 string, decoded with decode_base64_image()"""
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail("invalid")
+        return super().to_internal_value(decode_base64_image(data))
@@ -2,7 +2,9 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path, include
 from rest_framework import routers
-from Product.views import ProductViewSet, CategoryViewSet, VariantViewSet, ProductImageViewSet
+from Product.views import (
+    ProductViewSet, CategoryViewSet, VariantViewSet, ProductImageViewSet, catalog_changes, response_cache_stats,
+)
 
 router = routers.DefaultRouter()
 router.register(r"products", ProductViewSet)
@@ -10,7 +12,10 @@ router.register(r"categories", CategoryViewSet)
 router.register(r"variants", VariantViewSet)
 router.register(r"products-images", ProductImageViewSet)
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path("changes/", catalog_changes, name="catalog-changes"),
+    path("cache-stats/", response_cache_stats, name="response-cache-stats"),
+]
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
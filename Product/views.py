@@ -1,27 +1,120 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Prefetch
+from django.http import FileResponse, Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework import status, viewsets
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
 from rest_framework.parsers import FormParser, MultiPartParser
-from Product.models import Product, Category, ProductImage, Variant
+from rest_framework.permissions import IsAdminUser
+from Ecomerce_Application.pagination import OptInKeysetPagination
+from Product.models import CatalogChange, Product, Category, ProductImage, Variant
 from User.permissions import IsAdminOrReadOnly
-from .serializer import ProductListSerializer, CategorySerializer, ProductImageSerializer, VariantSerializer
+from . import importer
+from .conditional import (
+    CATEGORY_CACHE_CONTROL, PRODUCT_CACHE_CONTROL, catalog_version, category_version, conditional,
+    product_version, variant_version,
+)
+from .exports import export_products
+from .filters import ProductFilter, ProductSearchFilter
+from .response_cache import cache_stats, cached_response, tagged
+from .search import get_search_backend
+from .storage import CONTENT_ADDRESSED, product_image_storage
+from .tree import get_category_tree
+from .uploads import ImageUploadHandler
+from .serializer import ProductListSerializer, ProductDetailSerializer, CategorySerializer, ProductImageSerializer, VariantSerializer
 
 
 class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.prefetch_related("images", "variants", "category").all()
-    serializer_class = ProductListSerializer
+    queryset = Product.objects.prefetch_related(
+        Prefetch("images", queryset=ProductImage.objects.order_by("order", "id")),
+        Prefetch("variants", queryset=Variant.objects.filter(is_active=True).order_by("name", "id")),
+        "category",
+    )
+    serializer_class = ProductDetailSerializer
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    search_fields = ("title","sku", "description", "category__name")
+    filter_backends = [DjangoFilterBackend, OrderingFilter, ProductSearchFilter]
+    filterset_class = ProductFilter
     ordering_fields = ("price", "created_at","title")
+    ordering = ("-created_at",)
+    pagination_class = OptInKeysetPagination
     parser_classes = (MultiPartParser, FormParser)
 
     def get_queryset(self):
-        queryset = Product.objects.all()
-        title = self.request.query_params.get('title')
-        if title:
-            queryset = queryset.filter(title__icontains=title)
-        return queryset
+        if self.action == "list":
+            # The compact list representation is computed entirely from annotations.
+            return Product.objects.with_listing_summary()
+        # Start from the class queryset so the prefetches above are kept; the
+        # detail serializer nests images, variants and categories.
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return ProductListSerializer
+        return ProductDetailSerializer
+
+    @conditional(catalog_version, "catalog", PRODUCT_CACHE_CONTROL)
+    @cached_response(tagged("products"))
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if getattr(request, "search_truncated", False):
+            # count and the page links only cover the PRODUCT_SEARCH_MAX_RESULTS best matches.
+            response["X-Search-Truncated"] = "true"
+        return response
+
+    @conditional(product_version, "product", PRODUCT_CACHE_CONTROL)
+    @cached_response(tagged("categories", per_object="product"))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=["get"])
+    @cached_response(tagged("products"))
+    def autocomplete(self, request):
+        """Title suggestions for a search box: ``?q=run`` matches "Running Shoe"."""
+        limit = 10
+        product_ids = get_search_backend().autocomplete(request.query_params.get("q", ""), limit * 2)
+        products = {
+            product.pk: product
+            for product in Product.objects.filter(pk__in=product_ids, is_active=True).only("id", "title", "slug")
+        }
+        suggestions = [
+            {"id": product.pk, "title": product.title, "slug": product.slug}
+            for product in (products.get(pk) for pk in product_ids) if product is not None
+        ]
+        return Response(suggestions[:limit])
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser], pagination_class=None)
+    def export(self, request):
+        """
+        Admin feed export of every product with its variants, categories and
+        image URLs, streamed as NDJSON or CSV (see Product.exports).
+        """
+        return export_products(request)
+
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_catalog(self, request):
+        """
+        Admin bulk import: a multipart ``file`` (CSV or JSONL, see Product.importer)
+        upserted by sku in chunks. ``format`` defaults to the file extension.
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"file": ["No file was submitted."]}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get("format") or os.path.splitext(upload.name)[1].lstrip(".").lower()
+        if file_format not in importer.FORMATS:
+            return Response(
+                {"format": [f"Unsupported format; use one of {', '.join(importer.FORMATS)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        report = importer.import_catalog(upload, file_format)
+        return Response(report.as_dict())
 
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
@@ -29,13 +122,156 @@ class CategoryViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminOrReadOnly]
     lookup_field = "slug"
 
+    @conditional(category_version, "categories", CATEGORY_CACHE_CONTROL)
+    @cached_response(tagged("categories"))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(category_version, "categories", CATEGORY_CACHE_CONTROL)
+    @cached_response(tagged("categories"))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=["get"])
+    @conditional(category_version, "categories", CATEGORY_CACHE_CONTROL)
+    def tree(self, request):
+        """The whole category hierarchy as nested nodes, served from the cache."""
+        return Response(get_category_tree()["roots"])
+
 class ProductImageViewSet(viewsets.ModelViewSet):
     queryset = ProductImage.objects.all()
     serializer_class = ProductImageSerializer
     permission_classes =  [IsAdminOrReadOnly]
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Before anything reads the body, so oversized files are never buffered.
+        request.upload_handlers.insert(0, ImageUploadHandler(request))
+        return super().initialize_request(request, *args, **kwargs)
+
+    def _upload_errors(self, request):
+        request.data  # parse the body
+        errors = getattr(request, "upload_errors", None)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return None
+
+    def create(self, request, *args, **kwargs):
+        return self._upload_errors(request) or super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self._upload_errors(request) or super().update(request, *args, **kwargs)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Upload up to Product.uploads.MAX_FILES multipart ``images`` for one
+        ``product``, with optional ``alt_text`` values in the same order.
+        All are validated before any is saved. They are appended after the
+        product's existing images.
+        """
+        rejected = self._upload_errors(request)
+        if rejected:
+            return rejected
+        files = request.FILES.getlist("images")
+        if not files:
+            return Response({"images": ["No file was submitted."]}, status=status.HTTP_400_BAD_REQUEST)
+        alt_texts = request.data.getlist("alt_text")
+        pending = [
+            self.get_serializer(data={
+                "product": request.data.get("product"),
+                "image": upload,
+                "alt_text": alt_texts[n] if n < len(alt_texts) else "",
+            })
+            for n, upload in enumerate(files)
+        ]
+        errors = {upload.name: serializer.errors for upload, serializer in zip(files, pending) if not serializer.is_valid()}
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            product = pending[0].validated_data["product"]
+            # Lock the product so concurrent uploads get distinct orders.
+            Product.objects.select_for_update().filter(pk=product.pk).first()
+            last = product.images.aggregate(last=Max("order"))["last"]
+            first = 0 if last is None else last + 1
+            for n, serializer in enumerate(pending):
+                serializer.save(order=first + n)
+        return Response([serializer.data for serializer in pending], status=status.HTTP_201_CREATED)
+
 class VariantViewSet(viewsets.ModelViewSet):
     queryset = Variant.objects.all()
     serializer_class = VariantSerializer
     permission_classes =  [IsAdminOrReadOnly]
 
+    @conditional(catalog_version, "catalog", PRODUCT_CACHE_CONTROL)
+    @cached_response(tagged("variants"))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(variant_version, "variant", PRODUCT_CACHE_CONTROL)
+    @cached_response(tagged(per_object="variant"))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+CHANGES_PAGE_SIZE = 1000
+
+
+@api_view(["GET"])
+def catalog_changes(request):
+    """
+    Catalog changes after ``?since=<seq>`` (0 for all) in sequence order, at
+    most ``?limit=`` per response. Consumers store ``next`` and poll again
+    with it as ``since``; ``has_more`` means the next page is ready now.
+    """
+    try:
+        since = int(request.query_params.get("since", 0))
+        limit = min(int(request.query_params.get("limit", CHANGES_PAGE_SIZE)), CHANGES_PAGE_SIZE)
+        if since < 0 or limit < 1:
+            raise ValueError
+    except ValueError:
+        return Response({"error": "since and limit must be non-negative integers"}, status=status.HTTP_400_BAD_REQUEST)
+    settle = getattr(settings, "CATALOG_CHANGES_SETTLE_SECONDS", 2)
+    changes = list(
+        CatalogChange.objects.since(since, settle)
+        .values("seq", "entity", "action", "object_id", "product_id", "data", "changed_at")[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    return Response({
+        "changes": changes,
+        "next": changes[-1]["seq"] if changes else since,
+        "has_more": has_more,
+    })
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def response_cache_stats(request):
+    """Hit/miss counters of the anonymous catalog response cache (Product.response_cache)"""
+    return Response(cache_stats())
+
+
+# A content-addressed name never gets other content.
+IMAGE_FILE_CACHE_CONTROL = {"public": True, "max_age": 365 * 24 * 60 * 60, "immutable": True}
+
+
+@require_safe
+def product_image_file(request, path):
+    """
+    A content-addressed product image or derivative (Product.storage), served
+    to be cached for good; its ETag is its file name.
+    """
+    if CONTENT_ADDRESSED.fullmatch(path) is None:
+        raise Http404
+    etag = f'"{os.path.basename(path)}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        try:
+            file = product_image_storage.open(path, "rb")
+        except FileNotFoundError:
+            raise Http404
+        response = FileResponse(file, content_type=mimetypes.guess_type(path)[0] or "application/octet-stream")
+        response["ETag"] = etag
+    patch_cache_control(response, **IMAGE_FILE_CACHE_CONTROL)
+    return response
@@ -0,0 +1,96 @@
+"""
+Concurrent add-to-cart: the old get_or_create + read-modify-write path vs.
+AddToCartSerializer's single fetch and conditional F() increment. Every thread
+adds the same lines, with and without a variant, so the final quantities
+also show lost updates and duplicated lines.
+
+Needs a database shared between threads (MySQL, or a file-backed SQLite).
+Run with: pytest benchmarks/bench_add_to_cart.py -s
+"""
+import os
+import threading
+import time
+
+import pytest
+from django.db import connection, transaction
+
+from Cart.models import Cart, CartItem
+from Cart.serializers import AddToCartSerializer
+from Product.models import Product, Variant
+
+THREADS = int(os.getenv("BENCH_THREADS", "8"))
+ADDS = int(os.getenv("BENCH_ADDS", "50"))
+LINES = int(os.getenv("BENCH_LINES", "5"))
+
+
+@transaction.atomic
+def _legacy_add(cart, product_id, variant_id):
+    """The add-to-cart path before the single-fetch rewrite, kept here for comparison."""
+    Product.objects.get(id=product_id, is_active=True)
+    product = Product.objects.get(id=product_id)
+    variant = None
+    if variant_id:
+        Variant.objects.get(id=variant_id, is_active=True)
+        variant = Variant.objects.get(id=variant_id)
+        assert variant.product == product and variant.stock >= 1
+    product = Product.objects.get(id=product_id)
+    if variant_id:
+        variant = Variant.objects.get(id=variant_id)
+    item, created = CartItem.objects.get_or_create(cart=cart, product=product, variant=variant, defaults={"quantity": 1})
+    if not created:
+        item.quantity += 1
+        item.save()
+
+
+@transaction.atomic
+def _serializer_add(cart, product_id, variant_id):
+    serializer = AddToCartSerializer(data={"product_id": product_id, "variant_id": variant_id, "quantity": 1})
+    serializer.is_valid(raise_exception=True)
+    serializer.save(cart=cart)
+
+
+def _run(label, add, cart, lines):
+    CartItem.objects.filter(cart=cart).delete()
+    barrier = threading.Barrier(THREADS)
+    errors = []
+
+    def worker():
+        barrier.wait()
+        try:
+            for idx in range(ADDS):
+                product_id, variant_id = lines[idx % len(lines)]
+                add(cart, product_id, variant_id)
+        except Exception as exc:  # reported below
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stored = sum(CartItem.objects.filter(cart=cart).values_list("quantity", flat=True))
+    print(
+        f"{label:10} {THREADS * ADDS / elapsed:8.1f} adds/s "
+        f"{stored:6d}/{THREADS * ADDS} quantity kept {len(errors):4d} errors"
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bench_add_to_cart(user):
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        pytest.skip("threads need a shared database")
+    cart = Cart.objects.create(user=user)
+    lines = []
+    for idx in range(LINES):
+        product = Product.objects.create(title=f"Item {idx}", price="3.00", sku=f"ITEM-{idx}", stock=10**6)
+        # Every other line has no variant: those rely on the cartitem_unique_line constraint.
+        variant = Variant.objects.create(product=product, name="Default", sku=f"ITEM-{idx}-D", stock=10**6) if idx % 2 else None
+        lines.append((product.pk, variant.pk if variant else None))
+
+    print(f"\nthreads={THREADS} adds/thread={ADDS} lines={LINES}")
+    _run("legacy", _legacy_add, cart, lines)
+    _run("serializer", _serializer_add, cart, lines)
@@ -0,0 +1,83 @@
+"""
+Checkout of a 50-line cart: the old per-line OrderItem.objects.create loop vs.
+CreateOrderSerializer's bulk path.
+
+Run with: pytest benchmarks/bench_checkout.py -s
+"""
+import os
+import time
+from decimal import Decimal
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from Cart.models import Cart, CartItem
+from Order.models import Order, OrderItem
+from Order.serializers import CreateOrderSerializer
+from Product.models import Product, Variant
+
+LINES = int(os.getenv("BENCH_LINES", "50"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "20"))
+
+
+def _fill_cart(cart, products):
+    CartItem.objects.bulk_create([
+        CartItem(cart=cart, product=product, variant=variant, quantity=1) for product, variant in products
+    ])
+
+
+@transaction.atomic
+def _legacy_checkout(user, address):
+    """The checkout path before the bulk rewrite, kept here for comparison."""
+    cart = Cart.objects.get(user=user)
+    order = Order.objects.create(
+        user=user, shipping_address=address, billing_address=address, subtotal=0, total_amount=0,
+    )
+    for cart_item in cart.items.all():
+        OrderItem.objects.create(
+            order=order, product=cart_item.product, variant=cart_item.variant,
+            quantity=cart_item.quantity, unit_price=cart_item.unit_price,
+        )
+    order.calculate_totals()
+    order.save()
+    cart.clear()
+    return order
+
+
+def _bulk_checkout(request, address):
+    serializer = CreateOrderSerializer(
+        data={"shipping_address_id": address.pk, "billing_address_id": address.pk},
+        context={"request": request},
+    )
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+def _run(label, checkout, cart, products):
+    total_ms, queries = 0.0, 0
+    for _ in range(ROUNDS):
+        _fill_cart(cart, products)
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            checkout()
+        total_ms += (time.perf_counter() - started) * 1000
+        queries = len(ctx.captured_queries)
+    print(f"{label:8} {total_ms / ROUNDS:8.2f} ms/checkout {queries:5d} queries")
+
+
+@pytest.mark.django_db
+def test_bench_checkout(user, address):
+    products = []
+    for idx in range(LINES):
+        product = Product.objects.create(title=f"Item {idx}", price="3.00", sku=f"ITEM-{idx}", stock=10**6)
+        variant = Variant.objects.create(product=product, name="Default", sku=f"ITEM-{idx}-D", stock=10**6, price=Decimal("2.50")) if idx % 2 else None
+        products.append((product, variant))
+    cart = Cart.objects.create(user=user)
+    request = APIRequestFactory().post("/api/orders/orders/")
+    request.user = user
+
+    print(f"\nlines={LINES} rounds={ROUNDS}")
+    _run("legacy", lambda: _legacy_checkout(user, address), cart, products)
+    _run("bulk", lambda: _bulk_checkout(request, address), cart, products)
@@ -0,0 +1,69 @@
+"""
+Streaming product export: throughput and memory over a large catalog, compared
+with paging through /api/products/ 12 rows at a time (timed over the first
+BENCH_PAGED rows only).
+
+Run with: pytest benchmarks/bench_exports.py -s
+(BENCH_EXPORT_ROWS=1000000 by default; seeding takes a while on SQLite.)
+"""
+import os
+import resource
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from Product.models import Category, Product, Variant
+
+ROWS = int(os.getenv("BENCH_EXPORT_ROWS", "1000000"))
+PAGED = int(os.getenv("BENCH_PAGED", "2400"))
+SEED_BATCH = 10000
+
+
+def _seed():
+    categories = Category.objects.bulk_create([Category(name=f"Category {n}", slug=f"category-{n}") for n in range(20)])
+    Through = Product.category.through
+    for start in range(0, ROWS, SEED_BATCH):
+        products = Product.objects.bulk_create([
+            Product(title=f"Product {n}", slug=f"product-{n}", description="Lorem ipsum " * 10,
+                    price="25.00", sku=f"SKU-{n}", stock=n % 4)
+            for n in range(start, min(start + SEED_BATCH, ROWS))
+        ])
+        Through.objects.bulk_create([Through(product_id=p.pk, category_id=categories[n % 20].pk) for n, p in enumerate(products)])
+        Variant.objects.bulk_create([Variant(product=p, name="One size", sku=f"{p.sku}-1", stock=1) for p in products[::4]])
+
+
+def _max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@pytest.mark.django_db
+def test_bench_product_export():
+    _seed()
+    client = APIClient()
+    client.force_authenticate(get_user_model().objects.create_user(
+        email="bench@example.com", first_name="B", last_name="B", password="x", is_staff=True,
+    ))
+
+    rss_before = _max_rss_mb()
+    started = time.perf_counter()
+    response = client.get("/api/products/export/")
+    total_bytes = rows = 0
+    for chunk in response.streaming_content:
+        total_bytes += len(chunk)
+        rows += chunk.count(b"\n")
+    export_s = time.perf_counter() - started
+    rss_after = _max_rss_mb()
+    assert rows == ROWS
+
+    started = time.perf_counter()
+    url = "/api/products/?cursor="
+    for _ in range(PAGED // 12):
+        url = client.get(url).data["next"]
+    paged_s = (time.perf_counter() - started) * ROWS / PAGED
+
+    print()
+    print(f"rows={ROWS} bytes={total_bytes}")
+    print(f"streaming export : {export_s:8.1f} s  {ROWS / export_s:10.0f} rows/s  max RSS +{rss_after - rss_before:.0f} MB")
+    print(f"paged list (est.): {paged_s:8.1f} s  {ROWS / paged_s:10.0f} rows/s  ({PAGED} rows timed)")
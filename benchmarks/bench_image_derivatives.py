@@ -0,0 +1,41 @@
+"""
+Image derivative rendering: images per second with 1, 2, 4 and cpu_count
+threads, to size IMAGE_DERIVATIVE_WORKERS. Each image is a BENCH_IMAGE_SIZE
+JPEG photo-like original rendered to every size in every format.
+
+Run with: pytest benchmarks/bench_image_derivatives.py -s
+"""
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from Product.images import DERIVATIVES, MODERN_FORMATS, render_derivatives
+
+IMAGES = int(os.getenv("BENCH_IMAGES", "32"))
+SIZE = int(os.getenv("BENCH_IMAGE_SIZE", "3000"))
+
+
+def _original():
+    # Noise compresses (and decodes) like a photo, unlike a flat colour.
+    image = Image.effect_noise((SIZE, SIZE * 2 // 3), 64).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def test_bench_image_derivatives():
+    data = _original()
+    print(f"\n{IMAGES} images of {len(data) // 1024} KB, sizes={list(DERIVATIVES)}, formats=jpeg+{list(MODERN_FORMATS)}")
+    baseline = None
+    for threads in sorted({1, 2, 4, os.cpu_count() or 1}):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(render_derivatives, [data] * IMAGES))
+        elapsed = time.perf_counter() - started
+        assert len(results) == IMAGES
+        rate = IMAGES / elapsed
+        baseline = baseline or rate
+        print(f"{threads:>3} threads: {elapsed:7.2f} s  {rate:7.2f} images/s  x{rate / baseline:.2f}")
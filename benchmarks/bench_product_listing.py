@@ -0,0 +1,70 @@
+"""
+Catalog listing page: full nested representation vs. compact annotated rows.
+
+Run with: pytest benchmarks/bench_product_listing.py -s
+"""
+import os
+import time
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from Product.models import Category, Product, ProductImage, Variant
+from Product.serializer import ProductDetailSerializer, ProductListSerializer
+from Product.views import ProductViewSet
+
+PRODUCTS = int(os.getenv("BENCH_PRODUCTS", "240"))
+PAGE_SIZE = 12
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "20"))
+
+
+def _seed():
+    categories = [Category.objects.create(name=f"Category {i}", description="x" * 200) for i in range(3)]
+    products = Product.objects.bulk_create([
+        Product(title=f"Product {i}", slug=f"product-{i}", description="Lorem ipsum " * 40,
+                price="25.00", sku=f"SKU-{i}", stock=i % 4)
+        for i in range(PRODUCTS)
+    ])
+    Product.category.through.objects.bulk_create([
+        Product.category.through(product_id=p.pk, category_id=c.pk) for p in products for c in categories
+    ])
+    ProductImage.objects.bulk_create([
+        ProductImage(product=p, image=f"products/2025/01/01/product-{p.sku}-{n}.jpg", order=n)
+        for p in products for n in range(4)
+    ])
+    Variant.objects.bulk_create([
+        Variant(product=p, name=f"Size {n}", sku=f"{p.sku}-{n}", price="20.00" if n else None, stock=n)
+        for p in products for n in range(5)
+    ])
+    # bulk_create skips the signals that maintain the summary columns.
+    Product.objects.refresh_summaries()
+
+
+def _measure(serializer_class, queryset, request):
+    pages = range(0, PRODUCTS, PAGE_SIZE)
+    total_bytes = 0
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for offset in pages:
+            page = list(queryset.order_by("-created_at", "id")[offset:offset + PAGE_SIZE])
+            data = serializer_class(page, many=True, context={"request": request}).data
+            total_bytes += len(JSONRenderer().render(data))
+    count = ROUNDS * len(pages)
+    return total_bytes / count, (time.perf_counter() - started) * 1000 / count
+
+
+@pytest.mark.django_db
+def test_bench_product_listing_page():
+    _seed()
+    request = Request(APIRequestFactory().get("/api/products/"))
+
+    before_bytes, before_ms = _measure(ProductDetailSerializer, ProductViewSet.queryset, request)
+    after_bytes, after_ms = _measure(ProductListSerializer, Product.objects.with_listing_summary(), request)
+
+    print()
+    print(f"products={PRODUCTS} page_size={PAGE_SIZE} rounds={ROUNDS}")
+    print(f"nested detail rows : {before_bytes:10.0f} bytes/page {before_ms:8.2f} ms/page")
+    print(f"compact list rows  : {after_bytes:10.0f} bytes/page {after_ms:8.2f} ms/page")
+    print(f"ratio              : {before_bytes / after_bytes:10.1f}x bytes  {before_ms / after_ms:8.1f}x time")
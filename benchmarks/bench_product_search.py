@@ -0,0 +1,81 @@
+"""
+Product search on a generated catalog: DRF SearchFilter icontains scans vs.
+the search backend.
+
+Run with: pytest benchmarks/bench_product_search.py -s
+(BENCH_PRODUCTS defaults to 100000).
+"""
+import os
+import random
+import time
+
+import pytest
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from Product.models import Category, Product
+from Product.search import get_search_backend, index_products
+
+PRODUCTS = int(os.getenv("BENCH_PRODUCTS", "100000"))
+QUERIES = ["trail", "wool sock", "jack", "blue running shoe", "leather", "kestrel", "xyzzy"]
+WORDS = (
+    "trail running shoe boot jacket wool sock leather blue red green black merino "
+    "waterproof light heavy summer winter classic pro ultra street road hiking"
+).split()
+
+SYLLABLES = "ka lo mi ne ru sa ti vo ze qua bri den fal gor hex jun".split()
+
+
+class _LegacyView:
+    search_fields = ("title", "sku", "description", "category__name")
+
+
+def _seed():
+    rng = random.Random(42)
+    # A long tail of model names next to a small set of very common words.
+    models = [f"{rng.choice(SYLLABLES)}{rng.choice(SYLLABLES)}" for _ in range(5000)] + ["kestrel"]
+    categories = [Category.objects.create(name=name) for name in ("Footwear", "Outerwear", "Accessories")]
+    for start in range(0, PRODUCTS, 5000):
+        batch = Product.objects.bulk_create([
+            Product(
+                title=" ".join([rng.choice(models)] + [rng.choice(WORDS) for _ in range(2)]).title(),
+                slug=f"product-{i}",
+                description=" ".join(rng.choice(WORDS) for _ in range(20)),
+                price="10.00",
+                sku=f"SKU-{i}",
+            )
+            for i in range(start, min(start + 5000, PRODUCTS))
+        ])
+        Product.category.through.objects.bulk_create([
+            Product.category.through(product_id=p.pk, category_id=categories[n % 3].pk) for n, p in enumerate(batch)
+        ])
+        index_products([p.pk for p in batch])
+
+
+def _time(fn, rounds=3):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return (time.perf_counter() - started) * 1000 / rounds, result
+
+
+@pytest.mark.django_db
+def test_bench_product_search():
+    started = time.perf_counter()
+    _seed()
+    print(f"\nseeded {PRODUCTS} products in {time.perf_counter() - started:.1f}s")
+
+    backend = get_search_backend()
+    load_ms, _ = _time(lambda: backend.search("warmup", 1), rounds=1)
+    print(f"backend={type(backend).__name__} first query (index load) {load_ms:.0f} ms")
+
+    factory = APIRequestFactory()
+    for query in QUERIES:
+        request = Request(factory.get("/api/products/", {"search": query}))
+        legacy_ms, legacy_count = _time(
+            lambda: SearchFilter().filter_queryset(request, Product.objects.all(), _LegacyView()).count()
+        )
+        search_ms, ids = _time(lambda: backend.search(query, 1000))
+        print(f"{query!r:22} icontains {legacy_ms:9.1f} ms ({legacy_count:6d} hits)   "
+              f"index {search_ms:8.1f} ms ({len(ids):4d} ranked)")
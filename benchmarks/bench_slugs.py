@@ -0,0 +1,55 @@
+"""
+Creating many products with the same title: the old exists() probing loop
+(one query per taken suffix) vs. Product.slugs (one aggregate query).
+The legacy loop is quadratic, so it only runs for the first BENCH_LEGACY rows.
+
+Run with: pytest benchmarks/bench_slugs.py -s
+"""
+import os
+import time
+
+import pytest
+from django.db import connection
+from django.utils.text import slugify
+
+from Product.models import Product
+
+PRODUCTS = int(os.getenv("BENCH_PRODUCTS", "10000"))
+LEGACY = int(os.getenv("BENCH_LEGACY", "500"))
+TITLE = "Classic Cotton T-Shirt"
+
+
+def _legacy_create(**fields):
+    """Product creation with the slug loop Product.save() used before Product.slugs."""
+    base = slugify(fields["title"])[:200]
+    slug = base
+    idx = 1
+    while Product.objects.filter(slug=slug).exists():
+        slug = f"{base}-{idx}"
+        idx += 1
+    return Product.objects.create(slug=slug, **fields)
+
+
+def _run(label, create, count, prefix):
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    with connection.execute_wrapper(count_queries):
+        for n in range(count):
+            create(title=TITLE, price="9.99", sku=f"{prefix}-{n}", stock=1)
+    elapsed = time.perf_counter() - started
+    print(f"{label:10} {count:6d} products {elapsed * 1000 / count:8.3f} ms/product {queries / count:8.1f} queries/product")
+
+
+@pytest.mark.django_db
+def test_bench_identical_titles():
+    print(f"\nproducts={PRODUCTS} legacy={LEGACY}")
+    _run("legacy", _legacy_create, LEGACY, "LEGACY")
+    Product.objects.all().delete()
+    _run("allocator", Product.objects.create, PRODUCTS, "NEW")
+    assert Product.objects.values("slug").distinct().count() == PRODUCTS
@@ -1,12 +1,23 @@
+import uuid
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from Product.models import Category, Product, Variant
+from User.models import Address
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
 
 
 @pytest.fixture
 def user(db):
     User = get_user_model()
-    return User.objects.create_user(email="test@example.com", password="password123")
+    return User.objects.create_user(email="test@example.com", first_name="Test", last_name="User", password="password123")
 
 
 @pytest.fixture
@@ -33,3 +44,6 @@ def variant(db, product):
     return Variant.objects.create(product=product, name="Size 42 / Blue", sku="SKU-001-42B", price="109.99", stock=5)
 
 
+@pytest.fixture
+def address(db, user):
+    return Address.objects.create(id=uuid.uuid4(), user=user, line1="1 Main St", city="Addis Ababa", postalcode="1000", country="ET")